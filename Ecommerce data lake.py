@@ -8,16 +8,42 @@ lineage tracking, and analytics using real e-commerce product data.
 import streamlit as st
 import pandas as pd
 import numpy as np
-import json
-import random
-import time
-import hashlib
 import datetime
+import functools
 import io
 from pathlib import Path
 import plotly.express as px
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+
+from lake import ZONES, LakeStore, analytics, charts, safe_table_name
+from lake.catalog import CATALOG_DB, PAGE_SIZE as CATALOG_PAGE_SIZE, Catalog
+from lake.dag import DEFAULT_WORKERS as DAG_WORKERS
+from lake.dag import Pipeline, unpromoted_raw_tables
+from lake.dtypes import optimize_dtypes
+from lake.excel_cache import ExcelCache
+from lake.fingerprint import file_checksum, frame_fingerprint
+from lake.history import HISTORY_DIR, PAGE_SIZE as HISTORY_PAGE_SIZE, HistoryLog
+from lake.ingest import DEFAULT_CHUNK_ROWS, stream_csv
+from lake.incremental import dataset_name as incremental_dataset
+from lake.incremental import target_name as incremental_target
+from lake.jobs import ACTIVE, HANDLERS, JOBS_DB, JobQueue, JobRunner
+from lake.lineage import LINEAGE_DB, PAGE_SIZE as LINEAGE_PAGE_SIZE, LineageGraph, sankey_links
+from lake.metrics import Meter, stage_history, stage_record
+from lake.presets import query_presets as query_presets_for
+from lake.processing import process_flipkart_data
+from lake.records import make_catalog_entry, make_lineage_event, record_job
+from lake.query_cache import QueryCache, is_cacheable
+from lake.sql import SqlEngine
+from lake.table_cache import TableCache
+from lake.transforms import NEXT_ZONE
+from lake.worker import DEFAULT_MEMORY_MB, DEFAULT_TIMEOUT_S, QueryPool
+
+# Copy-on-write (the default from pandas 3): frames derived from another one
+# (column subsets, ``assign``, ``reset_index``, shallow copies) share its
+# column buffers until one of them is modified, so promotions and pipeline
+# stages do not duplicate the columns they leave unchanged, and sessions can
+# be handed shallow copies of cached tables (lake/table_cache.py).
+pd.set_option("mode.copy_on_write", True)
 
 # ─────────────────────────────────────────────────────────────────────────────
 # PAGE CONFIG
@@ -178,106 +204,130 @@ code, .stCode {
 # ─────────────────────────────────────────────────────────────────────────────
 # SESSION STATE INITIALIZATION
 # ─────────────────────────────────────────────────────────────────────────────
-if "lake" not in st.session_state:
-    st.session_state.lake = {
-        "raw": {},        # Raw Zone
-        "bronze": {},     # Bronze Zone (cleaned)
-        "silver": {},     # Silver Zone (transformed)
-        "gold": {},       # Gold Zone (aggregated/curated)
-        "catalog": [],    # Data catalog entries
-        "lineage": [],    # Data lineage events
-        "jobs": [],       # ETL job history
-        "ingestion_log": [],
-    }
-
-if "query_history" not in st.session_state:
-    st.session_state.query_history = []
-
-if "source_data_loaded" not in st.session_state:
-    st.session_state.source_data_loaded = False
+@st.cache_resource
+def get_store():
+    """Process-wide handle on the Parquet zone directories (raw/bronze/silver/gold)"""
+    return LakeStore()
+
+@st.cache_resource
+def get_excel_cache():
+    """Content-addressed Excel → Parquet conversion cache shared by all sessions"""
+    return ExcelCache(get_store().root / "_cache" / "excel")
+
+@st.cache_resource
+def get_sql_engine():
+    """DuckDB engine with one view per lake table, shared by all sessions"""
+    return SqlEngine(get_store())
+
+@st.cache_resource
+def get_query_cache():
+    """Query Engine results keyed by normalized query + table versions, shared by all sessions"""
+    return QueryCache()
+
+@st.cache_resource
+def get_query_pool():
+    """Worker processes that run Query Engine queries outside the server process"""
+    return QueryPool(get_store().root)
+
+@st.cache_resource
+def get_job_runner():
+    """Background ETL runner over the persistent job queue; outlives every session.
+    Records each finished job's tables in the catalog, lineage and job log itself,
+    so jobs that finish while no session is open are recorded too."""
+    store = get_store()
+    return JobRunner(
+        store, JobQueue(store.root / JOBS_DB), HANDLERS,
+        on_finished=functools.partial(
+            record_job, store=store, catalog=get_catalog(), lineage=get_lineage(), job_log=get_history("jobs"),
+        ),
+    )
 
-if "source_dataframe" not in st.session_state:
-    st.session_state.source_dataframe = None
+@st.cache_resource
+def get_catalog():
+    """Data catalog in the lake root, shared by all sessions"""
+    return Catalog(get_store().root / CATALOG_DB)
+
+@st.cache_resource
+def get_lineage():
+    """Lineage graph in the lake root, shared by all sessions"""
+    return LineageGraph(get_store().root / LINEAGE_DB)
+
+@st.cache_resource
+def get_table_cache():
+    """Stored tables loaded once and shared by all sessions, which hold only handles on them"""
+    return TableCache(get_store())
+
+@st.cache_resource
+def get_history(kind):
+    """Append-only history log in the lake root (``jobs``, ``ingestion`` or
+    ``queries``), shared by all sessions; keeps only its newest records in memory"""
+    return HistoryLog(get_store().root / HISTORY_DIR / f"{kind}.jsonl")
+
+store = get_store()
+job_runner = get_job_runner()
+catalog = get_catalog()
+lineage_graph = get_lineage()
+table_cache = get_table_cache()
+job_log = get_history("jobs")              # ETL job history
+ingestion_log = get_history("ingestion")
+query_history = get_history("queries")
+
+if "source_table" not in st.session_state:
+    # Raw table backing the Analytics dashboard; defaults to the newest stored one
+    existing_raw = store.list_tables("raw")
+    st.session_state.source_table = existing_raw[-1] if existing_raw else None
+
+st.session_state.source_data_loaded = (
+    st.session_state.source_table is not None and store.exists("raw", st.session_state.source_table)
+)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
 # DATA LOADING FUNCTIONS
 # ─────────────────────────────────────────────────────────────────────────────
-def process_flipkart_data(df):
-    """Clean and process the Flipkart dataset"""
-    # Basic cleaning
-    if 'Unnamed: 0' in df.columns:
-        df = df.drop(columns=['Unnamed: 0'])
-    
-    # Parse prices (remove ₹ and commas) if they're strings
-    if 'actual_price' in df.columns and df['actual_price'].dtype == 'object':
-        df['actual_price_clean'] = df['actual_price'].str.replace('₹', '').str.replace(',', '')
-        df['actual_price_clean'] = pd.to_numeric(df['actual_price_clean'], errors='coerce')
-    elif 'actual_price' in df.columns:
-        df['actual_price_clean'] = df['actual_price']
-        
-    if 'selling_price' in df.columns and df['selling_price'].dtype == 'object':
-        df['selling_price_clean'] = df['selling_price'].str.replace('₹', '').str.replace(',', '')
-        df['selling_price_clean'] = pd.to_numeric(df['selling_price_clean'], errors='coerce')
-    elif 'selling_price' in df.columns:
-        df['selling_price_clean'] = df['selling_price']
-    
-    # Parse discount percentage
-    if 'discount' in df.columns and df['discount'].dtype == 'object':
-        df['discount_pct'] = df['discount'].str.replace('%', '')
-        df['discount_pct'] = pd.to_numeric(df['discount_pct'], errors='coerce')
-    elif 'discount' in df.columns:
-        df['discount_pct'] = df['discount']
-    
-    # Handle missing ratings
-    if 'average_rating' in df.columns:
-        df['average_rating'] = df['average_rating'].fillna(0)
-    
-    # Create price difference
-    if 'actual_price_clean' in df.columns and 'selling_price_clean' in df.columns:
-        df['price_savings'] = df['actual_price_clean'] - df['selling_price_clean']
-    
-    # Clean dates
-    if 'crawled_at' in df.columns:
-        df['crawled_at'] = pd.to_datetime(df['crawled_at'], errors='coerce')
-    
-    return df
-
-def make_catalog_entry(name, zone, schema, rows, source):
-    return {
-        "table_name": name,
-        "zone": zone,
-        "schema": schema,
-        "row_count": rows,
-        "source": source,
-        "created_at": datetime.datetime.now().isoformat(),
-        "checksum": hashlib.md5(name.encode()).hexdigest()[:12],
-        "format": "Parquet",
-        "owner": "data-eng-team",
-        "tags": [zone.lower(), source.lower(), "ecommerce"],
-    }
-
-def make_lineage_event(src, dst, operation, rows):
-    return {
-        "source": src,
-        "destination": dst,
-        "operation": operation,
-        "rows_processed": rows,
-        "timestamp": datetime.datetime.now().isoformat(),
-        "duration_ms": random.randint(120, 8000),
-        "status": "SUCCESS",
-    }
-
-def make_job(name, zone, rows, duration):
-    return {
-        "job_name": name,
-        "zone": zone,
-        "rows": rows,
-        "duration_ms": duration,
-        "started_at": datetime.datetime.now().isoformat(),
-        "status": random.choice(["SUCCESS", "SUCCESS", "SUCCESS", "WARNING"]),
-        "spark_nodes": random.randint(2, 8),
-    }
+STREAMING_THRESHOLD_MB = 200   # CSVs above this size default to chunked streaming
+PREVIEW_ROWS = 1000
+
+@st.cache_resource
+def backfill_catalog():
+    """Catalog the stored tables that have no entry yet (written before the
+    catalog existed); once per server"""
+    tables = [(zone.upper(), name) for zone in ZONES for name in store.list_tables(zone)]
+    for zone, name in catalog.missing(tables):
+        manifest = store.info(zone.lower(), name)
+        catalog.put(make_catalog_entry(
+            name, zone, [tuple(item) for item in manifest["schema"]], manifest["rows"],
+            manifest.get("source") or "lake-scan", manifest["checksum"], stats=manifest.get("stats"),
+            source_checksum=manifest.get("source_checksum"),
+        ))
+    # Raw entries cataloged before source checksums were: duplicate uploads are looked up by them
+    for zone, name in catalog.missing([t for t in tables if t[0] == "RAW"], key="source_checksum"):
+        catalog.put({**catalog.get(zone, name), "source_checksum": store.info("raw", name).get("source_checksum")})
+    return len(tables)
+
+backfill_catalog()
+
+def raw_table_with(**checksums):
+    """Raw table already holding content with these checksums (looked up in
+    the catalog's index rather than in every raw manifest), else None"""
+    name = catalog.find("RAW", **checksums)
+    return name if name and store.exists("raw", name) else None
+
+def schema_frame(schema, stats, rows):
+    """Schema table with the column statistics recorded when the table was written"""
+    stats = stats or {}
+    def stat(col, key):
+        return stats.get(col, {}).get(key)
+    return pd.DataFrame({
+        "Column": [c for c, _ in schema],
+        "Dtype": [t for _, t in schema],
+        "Null%": [round(100 * stat(c, "null_count") / rows, 1) if rows and stat(c, "null_count") is not None else None for c, _ in schema],
+        "~Unique": [stat(c, "distinct_approx") for c, _ in schema],
+        "Min": [None if stat(c, "min") is None else str(stat(c, "min")) for c, _ in schema],
+        "Max": [None if stat(c, "max") is None else str(stat(c, "max")) for c, _ in schema],
+    })
+
+SANKEY_MAX_EDGES = 300   # whole-lake Sankey: the heaviest compacted edges only
 
 def zone_color(z):
     return {"raw": "#9b59b6", "bronze": "#cd7f32", "silver": "#a8b8c8", "gold": "#ffd700"}.get(z, "#aaa")
@@ -285,6 +335,179 @@ def zone_color(z):
 def zone_icon(z):
     return {"raw": "🌊", "bronze": "🥉", "silver": "🥈", "gold": "🥇"}.get(z, "📦")
 
+def table_fingerprint(zone, name):
+    """Version key of a stored table: its content checksum, or its write version as a fallback"""
+    manifest = store.info(zone, name)
+    return manifest.get("checksum") or f"v{manifest['version']}:{manifest['updated_at']}"
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def table_preview(zone, name, fingerprint, n=10):
+    return store.head(zone, name, n)
+
+def csv_export(zone, name):
+    """Deferred CSV export for st.download_button; runs only when the download is requested"""
+    def export():
+        with table_cache.acquire(zone, name) as handle:
+            return handle.frame.to_csv(index=False)
+    return export
+
+def source_frame():
+    """The session's source table, from the shared table cache. The session keeps
+    only its handle, swapped for a new one when the table changes or is rewritten."""
+    handle = st.session_state.get("source_handle")
+    if handle is None or handle.name != st.session_state.source_table or handle.stale():
+        if handle is not None:
+            handle.release()
+        handle = st.session_state.source_handle = table_cache.acquire("raw", st.session_state.source_table)
+    return handle.frame, handle.nbytes
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# QUERY EXECUTION
+# ─────────────────────────────────────────────────────────────────────────────
+# Queries run in worker processes (see lake/worker.py). A run dict carries the
+# query, its cache key/dependencies and, while executing, the worker handle.
+QUERY_INLINE_WAIT_S = 2.0
+QUERY_STATUS_LABELS = {"timeout": "TIMEOUT", "memory": "KILLED (memory)", "cancelled": "CANCELLED"}
+
+def record_query(run, status, time_ms, result=None, cache_status="OFF", saved_ms=0, peak_mb=None):
+    """Append a Query History row and keep the outcome for display"""
+    query_history.append({
+        "query": run["query"][:80], "dataset": run["dataset"],
+        "rows": (len(result) if hasattr(result, "__len__") else 1) if status == "OK" else 0,
+        "time_ms": time_ms,
+        "peak_mb": round(peak_mb, 1) if peak_mb else None,
+        "cache": cache_status,
+        "saved_ms": saved_ms,
+        "status": status,
+    })
+    st.session_state.query_result = {
+        "status": status, "result": result, "time_ms": time_ms,
+        "cache": cache_status, "saved_ms": saved_ms,
+    }
+
+def finish_query(run):
+    """Record a query whose worker finished, and cache its result"""
+    handle = run["handle"]
+    cache_status = "MISS" if run["cacheable"] else "OFF"
+    if handle.status == "ok":
+        status = "OK"
+        if run["cacheable"]:
+            get_query_cache().put(run["cache_key"], run["dependencies"], handle.result, handle.elapsed_ms)
+    elif handle.status == "error":
+        status = f"ERROR: {handle.error}"
+    else:
+        status = f"{QUERY_STATUS_LABELS[handle.status]}: {handle.error}"
+    record_query(run, status, handle.elapsed_ms, result=handle.result, cache_status=cache_status, peak_mb=handle.peak_rss_mb)
+
+@st.fragment(run_every=0.5)
+def query_progress():
+    """Live status of the running query, with a cancel button"""
+    run = st.session_state.get("running_query")
+    if run is None:
+        return
+    handle = run["handle"]
+    if handle.done:
+        st.session_state.running_query = None
+        finish_query(run)
+        st.rerun()
+    if handle.status == "queued":
+        st.info("⏳ Queued — all query workers are busy")
+    else:
+        st.info(
+            f"⏳ Running in a worker process · {handle.elapsed_ms / 1000:.1f}s of {handle.timeout_s:g}s · "
+            f"{handle.rss_mb:,.0f} MB of {handle.memory_mb:,} MB"
+        )
+    if st.button("⏹ Cancel Query", key="cancel_query"):
+        get_query_pool().cancel(handle)
+        handle.wait(1.0)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# CACHED ANALYTICS COMPUTATIONS
+# ─────────────────────────────────────────────────────────────────────────────
+# Keyed by (table, fingerprint): reruns with an unchanged dataset are cache
+# hits, a re-ingested or re-promoted table gets a new fingerprint. Each
+# function reads only the columns it needs.
+ANALYTICS_CACHE_ENTRIES = 64
+
+@st.cache_data(max_entries=ANALYTICS_CACHE_ENTRIES, show_spinner=False)
+def analytics_kpis(zone, name, fingerprint):
+    return analytics.kpis(store, zone, name)
+
+@st.cache_data(max_entries=ANALYTICS_CACHE_ENTRIES, show_spinner=False)
+def analytics_category_counts(zone, name, fingerprint, cat_col):
+    return analytics.category_counts(store, zone, name, cat_col)
+
+@st.cache_data(max_entries=ANALYTICS_CACHE_ENTRIES, show_spinner=False)
+def analytics_price_histogram(zone, name, fingerprint, exact=False):
+    """Bins of the selling prices below the 95th percentile, for the price histogram"""
+    return analytics.price_histogram(store, zone, name, exact=exact)
+
+@st.cache_data(max_entries=ANALYTICS_CACHE_ENTRIES, show_spinner=False)
+def analytics_price_percentiles(zone, name, fingerprint, qs, exact=False):
+    return analytics.price_percentiles(store, zone, name, qs, exact)
+
+@st.cache_data(max_entries=ANALYTICS_CACHE_ENTRIES, show_spinner=False)
+def analytics_gold_summary(zone, name, fingerprint, cat_col, exact=False):
+    return analytics.category_summary(store, zone, name, cat_col, exact)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# BACKGROUND JOBS
+# ─────────────────────────────────────────────────────────────────────────────
+# Promotions and pipelines run on the job runner's threads (lake/jobs.py),
+# which record each finished job in the catalog, lineage and job log.
+def show_history(log, key):
+    """One page of a history log as a table, newest first, with a page picker once it has several"""
+    pages = max(1, -(-len(log) // HISTORY_PAGE_SIZE))
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, step=1,
+                           key=key) if pages > 1 else 1
+    st.dataframe(pd.DataFrame(log.page(page - 1)), use_container_width=True, hide_index=True)
+
+def job_rows(jobs):
+    return pd.DataFrame([{
+        "id": job["id"],
+        "job": job["label"],
+        "status": job["status"].upper(),
+        "progress": f"{job['progress']:.0%}",
+        "message": job["error"] or job["message"] or "",
+        "submitted_at": job["submitted_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+    } for job in jobs])
+
+def stage_trends(limit=200):
+    """Measured stages of the last ``limit`` finished jobs, oldest first (see lake/metrics.py)"""
+    history = pd.DataFrame(stage_history(job_runner.queue.list(limit=limit, statuses=("succeeded",))))
+    if not history.empty:
+        history["finished_at"] = pd.to_datetime(history["finished_at"])
+    return history
+
+def show_chart(fig):
+    """Render a Plotly figure with every trace capped at ``charts.MAX_POINTS``
+    points, so the payload sent to the browser does not grow with the data"""
+    st.plotly_chart(charts.limit_figure(fig), use_container_width=True)
+
+def trend_layout(fig, height):
+    fig.update_layout(
+        paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)",
+        font=dict(color="#8899cc", family="JetBrains Mono"),
+        margin=dict(t=10, b=0, l=0, r=0), height=height,
+        xaxis=dict(gridcolor="#1a2a44"), yaxis=dict(gridcolor="#1a2a44"),
+        legend=dict(orientation="h", y=-0.25),
+    )
+    return fig
+
+@st.fragment(run_every=1.0)
+def job_status_panel():
+    """Live count of queued/running jobs; reruns the app once they have all finished"""
+    counts = job_runner.queue.counts()
+    running, queued = counts.get("running", 0), counts.get("queued", 0)
+    if not running and not queued:
+        st.rerun()
+    st.caption(f"⚙️ Jobs: {running} running · {queued} queued")
+
 
 # ─────────────────────────────────────────────────────────────────────────────
 # SIDEBAR
@@ -302,31 +525,46 @@ with st.sidebar:
 
     st.divider()
     st.markdown("**LAKE STORAGE**")
-    total_tables = sum(len(v) for v in st.session_state.lake.values() if isinstance(v, dict))
-    raw_size = len(st.session_state.lake["raw"])
-    bronze_size = len(st.session_state.lake["bronze"])
-    silver_size = len(st.session_state.lake["silver"])
-    gold_size = len(st.session_state.lake["gold"])
+    zone_tables = {z: store.list_tables(z) for z in ZONES}
+    total_tables = sum(len(v) for v in zone_tables.values())
+    raw_size = len(zone_tables["raw"])
+    bronze_size = len(zone_tables["bronze"])
+    silver_size = len(zone_tables["silver"])
+    gold_size = len(zone_tables["gold"])
+
+    # Bytes on disk per zone; files shared by reference tables count once
+    footprint = store.footprint()
 
-    def mini_bar(label, val, total, color):
+    def mini_bar(label, val, total, color, usage):
         pct = int((val / max(total, 1)) * 100)
+        size = f' · {usage["unique_bytes"] / 1024 / 1024:,.1f} MB' if usage["tables"] else ""
         st.markdown(
             f'<div style="margin:4px 0"><span style="color:#666;font-size:0.72rem;font-family:monospace">'
             f'{label}</span><div style="background:#111;border-radius:3px;height:6px;margin-top:2px">'
             f'<div style="width:{pct}%;background:{color};height:6px;border-radius:3px"></div></div>'
-            f'<span style="color:{color};font-size:0.7rem;font-family:monospace">{val} datasets</span></div>',
+            f'<span style="color:{color};font-size:0.7rem;font-family:monospace">{val} datasets{size}</span></div>',
             unsafe_allow_html=True
         )
 
     max_any = max(raw_size, bronze_size, silver_size, gold_size, 1)
-    mini_bar("🌊 RAW", raw_size, max_any, "#9b59b6")
-    mini_bar("🥉 BRONZE", bronze_size, max_any, "#cd7f32")
-    mini_bar("🥈 SILVER", silver_size, max_any, "#a8b8c8")
-    mini_bar("🥇 GOLD", gold_size, max_any, "#ffd700")
+    mini_bar("🌊 RAW", raw_size, max_any, "#9b59b6", footprint["raw"])
+    mini_bar("🥉 BRONZE", bronze_size, max_any, "#cd7f32", footprint["bronze"])
+    mini_bar("🥈 SILVER", silver_size, max_any, "#a8b8c8", footprint["silver"])
+    mini_bar("🥇 GOLD", gold_size, max_any, "#ffd700", footprint["gold"])
+    stored_mb = sum(u["stored_bytes"] for u in footprint.values()) / 1024 / 1024
+    unique_mb = sum(u["unique_bytes"] for u in footprint.values()) / 1024 / 1024
+    if stored_mb > unique_mb:
+        st.caption(f"💾 {unique_mb:,.1f} MB on disk · {stored_mb - unique_mb:,.1f} MB shared by reference tables")
 
     st.divider()
     st.caption(f"🔄 Last sync: {datetime.datetime.now().strftime('%H:%M:%S')}")
-    st.caption(f"✅ Jobs run: {len(st.session_state.lake['jobs'])}")
+    st.caption(f"✅ Jobs run: {len(job_log):,}")
+    table_stats = table_cache.stats()
+    if table_stats["entries"]:
+        st.caption(f"🧠 Shared tables: {table_stats['entries']} · {table_stats['size_mb']:,.1f} MB "
+                   f"· {table_stats['handles']} session handles")
+    if any(job_runner.queue.counts().get(status) for status in ACTIVE):
+        job_status_panel()
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -339,9 +577,9 @@ if section == "🏠 Overview":
     # KPI Row
     c1, c2, c3, c4, c5 = st.columns(5)
     c1.metric("Total Datasets", total_tables, "+1 today")
-    c2.metric("ETL Jobs Run", len(st.session_state.lake["jobs"]), f"+{len(st.session_state.lake['jobs'])}")
-    c3.metric("Catalog Entries", len(st.session_state.lake["catalog"]), "")
-    c4.metric("Lineage Events", len(st.session_state.lake["lineage"]), "")
+    c2.metric("ETL Jobs Run", f"{len(job_log):,}", f"+{len(job_log):,}")
+    c3.metric("Catalog Entries", f"{catalog.count():,}", "")
+    c4.metric("Lineage Events", f"{lineage_graph.count():,}", "")
     c5.metric("Lake Health", "98.7%", "+0.5%")
 
     st.divider()
@@ -449,26 +687,41 @@ if section == "🏠 Overview":
             xaxis=dict(gridcolor="#1a2a44"),
             yaxis=dict(gridcolor="#1a2a44"),
         )
-        st.plotly_chart(fig, use_container_width=True)
+        show_chart(fig)
 
     with col_r:
         st.markdown("### ⚡ Recent Activity")
-        if st.session_state.lake["jobs"]:
-            recent = st.session_state.lake["jobs"][-8:][::-1]
-            for j in recent:
-                col = "#3dffa0" if j["status"] == "SUCCESS" else "#ffb83d"
+        if len(job_log):
+            for j in job_log.recent(8):
+                col = {"SUCCESS": "#3dffa0", "FAILED": "#ff5f5f"}.get(j["status"], "#ffb83d")
+                throughput = f' · {j["rows_per_sec"]:,} rows/s' if j.get("rows_per_sec") else ""
                 st.markdown(
                     f'<div style="background:#0f1d36;border:1px solid #1e3060;border-radius:6px;'
                     f'padding:6px 10px;margin:4px 0;font-family:JetBrains Mono,monospace;font-size:0.72rem;'
                     f'display:flex;justify-content:space-between">'
                     f'<span style="color:{col}">● {j["job_name"]}</span>'
-                    f'<span style="color:#446688">{j["zone"].upper()} · {j["rows"]:,} rows · {j["duration_ms"]}ms</span>'
+                    f'<span style="color:#446688">{j["zone"].upper()} · {j["rows"]:,} rows · {j["duration_ms"]:,}ms{throughput}</span>'
                     f'</div>',
                     unsafe_allow_html=True
                 )
         else:
             st.info("No jobs run yet. Upload your Excel file in the Data Ingestion tab.")
 
+    trends = stage_trends()
+    if not trends.empty:
+        st.markdown("### 📈 Throughput Trend")
+        latest = trends.groupby("stage").tail(1)
+        t1, t2, t3, t4 = st.columns(4)
+        t1.metric("Measured Stage Runs", len(trends))
+        t2.metric("Median Throughput", f"{trends['rows_per_sec'].median():,.0f} rows/s")
+        t3.metric("Rows Processed", f"{trends['rows_in'].fillna(0).sum():,.0f}")
+        t4.metric("Peak Memory", f"{trends['peak_rss_mb'].max():,.0f} MB",
+                  f"latest {latest['peak_rss_mb'].max():,.0f} MB", delta_color="off")
+        fig_trend = px.line(trends, x="finished_at", y="rows_per_sec", color="zone", markers=True,
+                            color_discrete_map={z: zone_color(z) for z in ZONES},
+                            labels={"finished_at": "", "rows_per_sec": "rows/sec"})
+        show_chart(trend_layout(fig_trend, 220))
+
 
 # ─────────────────────────────────────────────────────────────────────────────
 # ── SECTION 2: DATA INGESTION ────────────────────────────────────────────────
@@ -490,20 +743,49 @@ elif section == "📥 Data Ingestion":
         
         if uploaded_file is not None:
             try:
-                # Read the file
-                if uploaded_file.name.endswith('.csv'):
+                # Content checksum of the upload, hashed once per uploaded file
+                upload_checksums = st.session_state.setdefault("upload_checksums", {})
+                if uploaded_file.file_id not in upload_checksums:
+                    upload_checksums[uploaded_file.file_id] = file_checksum(uploaded_file)
+                upload_checksum = upload_checksums[uploaded_file.file_id]
+                duplicate_of = raw_table_with(source_checksum=upload_checksum)
+
+                is_csv = uploaded_file.name.endswith('.csv')
+                streaming = False
+                if is_csv:
+                    size_mb = uploaded_file.size / 1024 / 1024
+                    ingest_mode = st.radio(
+                        "Ingest mode", ["In-memory", "Streaming (chunked)"], horizontal=True,
+                        index=1 if size_mb > STREAMING_THRESHOLD_MB else 0,
+                        help="Streaming reads, cleans and stores the CSV chunk by chunk, "
+                             "so memory stays bounded for multi-GB exports."
+                    )
+                    streaming = ingest_mode.startswith("Streaming")
+
+                # Read the file (only a sample when streaming)
+                if streaming:
+                    df_raw = pd.read_csv(uploaded_file, nrows=PREVIEW_ROWS)
+                    uploaded_file.seek(0)
+                    st.success(f"✅ File opened for streaming: **{uploaded_file.name}** ({size_mb:,.1f} MB × {len(df_raw.columns)} columns)")
+                elif is_csv:
                     df_raw = pd.read_csv(uploaded_file)
+                    st.success(f"✅ File loaded: **{uploaded_file.name}** ({len(df_raw):,} rows × {len(df_raw.columns)} columns)")
                 else:
-                    df_raw = pd.read_excel(uploaded_file)
-                
-                st.success(f"✅ File loaded: **{uploaded_file.name}** ({len(df_raw):,} rows × {len(df_raw.columns)} columns)")
+                    df_raw, cache_hit = get_excel_cache().read(uploaded_file.getvalue(), key=upload_checksum)
+                    st.success(
+                        f"✅ File loaded: **{uploaded_file.name}** ({len(df_raw):,} rows × {len(df_raw.columns)} columns)"
+                        + ("  ·  ⚡ served from conversion cache" if cache_hit else "")
+                    )
                 
+                if duplicate_of:
+                    st.info(f"♻️ Identical content is already in the Raw Zone as `raw/{duplicate_of}` — ingesting will link to it instead of storing a second copy.")
+
                 # Show preview
                 st.markdown("**Preview (first 10 rows):**")
                 st.dataframe(df_raw.head(10), use_container_width=True)
                 
                 # Show schema
-                with st.expander("📋 View Schema"):
+                with st.expander("📋 View Schema" + (f" (first {PREVIEW_ROWS:,} rows)" if streaming else "")):
                     schema_df = pd.DataFrame({
                         "Column": df_raw.columns,
                         "Type": df_raw.dtypes.astype(str).values,
@@ -517,53 +799,87 @@ elif section == "📥 Data Ingestion":
                 with col1:
                     dataset_name = st.text_input(
                         "Dataset name (optional)", 
-                        value=uploaded_file.name.replace('.xlsx', '').replace('.csv', '').replace(' ', '_')
+                        value=safe_table_name(uploaded_file.name.replace('.xlsx', '').replace('.csv', ''))
                     )
+                if streaming:
+                    with col2:
+                        chunk_rows = st.number_input(
+                            "Rows per chunk", min_value=10_000, max_value=5_000_000,
+                            value=DEFAULT_CHUNK_ROWS, step=50_000
+                        )
                 
                 if st.button("⬇️ INGEST INTO RAW ZONE", use_container_width=True, type="primary"):
                     with st.spinner("Processing and ingesting data..."):
-                        time.sleep(0.5)
-                        
-                        # Process the data
-                        df_processed = process_flipkart_data(df_raw.copy())
-                        
                         ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-                        final_name = f"{dataset_name}_{ts}"
-                        
-                        # Store in Raw Zone
-                        st.session_state.lake["raw"][final_name] = df_processed
-                        st.session_state.source_dataframe = df_processed
-                        st.session_state.source_data_loaded = True
-                        
-                        # Catalog entry
-                        entry = make_catalog_entry(
-                            final_name, "RAW", 
-                            list(df_processed.dtypes.astype(str).items()), 
-                            len(df_processed), 
-                            f"file-upload-{uploaded_file.name}"
-                        )
-                        st.session_state.lake["catalog"].append(entry)
-                        
-                        # Lineage
-                        lineage = make_lineage_event(uploaded_file.name, f"raw/{final_name}", "INGEST", len(df_processed))
-                        st.session_state.lake["lineage"].append(lineage)
-                        
-                        # Job log
-                        job = make_job(f"ingest_{dataset_name}", "raw", len(df_processed), random.randint(800, 2000))
-                        st.session_state.lake["jobs"].append(job)
+                        final_name = f"{safe_table_name(dataset_name)}_{ts}"
+
+                        # Measured from here: cleaning, dtype compaction and writing the Raw Zone table
+                        with Meter() as meter:
+                            if duplicate_of:
+                                # Same file bytes already ingested — link, don't store again
+                                final_name = duplicate_of
+                            elif streaming:
+                                # Clean and append chunk by chunk straight into the Raw Zone
+                                progress = st.progress(0.0, "Starting stream...")
+
+                                def report_progress(rows, rows_per_sec, fraction):
+                                    progress.progress(fraction or 0.0, f"{rows:,} rows ingested · {rows_per_sec:,.0f} rows/sec")
+
+                                manifest = stream_csv(
+                                    uploaded_file, store, final_name, process_flipkart_data,
+                                    chunk_rows=int(chunk_rows), total_bytes=uploaded_file.size,
+                                    on_progress=report_progress,
+                                    source=uploaded_file.name, source_checksum=upload_checksum,
+                                )
+                            else:
+                                # Process the data and compact its dtypes
+                                meter.rows_in = len(df_raw)
+                                df_processed, memory_report = optimize_dtypes(process_flipkart_data(df_raw))
+
+                                # Same rows already stored (e.g. CSV and Excel export of one crawl)?
+                                checksum = frame_fingerprint(df_processed)
+                                duplicate_of = raw_table_with(checksum=checksum)
+                                if duplicate_of:
+                                    final_name = duplicate_of
+                                else:
+                                    # Store in Raw Zone
+                                    manifest = store.write(
+                                        "raw", final_name, df_processed, checksum=checksum, memory=memory_report,
+                                        source=uploaded_file.name, source_checksum=upload_checksum,
+                                    )
+                            meter.rows_out = store.info("raw", final_name)["rows"]
+                            if meter.rows_in is None:
+                                meter.rows_in = meter.rows_out   # streamed: every CSV row went through
+                        st.session_state.source_table = final_name
+                        n_rows = meter.rows_out
+                        stage = stage_record("ingest", "raw", final_name, uploaded_file.name, meter)
+
+                        if duplicate_of:
+                            lineage = make_lineage_event(uploaded_file.name, f"raw/{duplicate_of}", "LINK", n_rows, stage["duration_ms"])
+                            lineage_graph.record(lineage)
+                        else:
+                            # Kept in the job queue so measurements outlive the session, and
+                            # recorded in the catalog, lineage and job log as a finished job
+                            job_id = job_runner.queue.record(
+                                "ingest", f"Ingest {uploaded_file.name}", {"kind": "ingestion", "stages": [stage]},
+                                stage["metrics"]["started_at"], name=final_name,
+                            )
+                            record_job(job_runner.queue.get(job_id), store, catalog, lineage_graph, job_log)
                         
                         # Ingestion log
                         log_entry = {
                             "dataset": final_name, 
-                            "rows": len(df_processed), 
+                            "rows": n_rows, 
                             "time": datetime.datetime.now().isoformat(),
-                            "source": uploaded_file.name
+                            "source": uploaded_file.name,
+                            "duplicate": bool(duplicate_of),
                         }
-                        st.session_state.lake["ingestion_log"].append(log_entry)
-                        
-                    st.success(f"✅ Successfully ingested **{final_name}** with **{len(df_processed):,} rows** into Raw Zone!")
-                    st.balloons()
-                    time.sleep(1)
+                        ingestion_log.append(log_entry)
+
+                    if duplicate_of:
+                        st.toast(f"♻️ Already ingested — linked to existing **{final_name}** ({n_rows:,} rows), nothing stored twice.")
+                    else:
+                        st.toast(f"✅ Successfully ingested **{final_name}** with **{n_rows:,} rows** into Raw Zone!")
                     st.rerun()
                     
             except Exception as e:
@@ -581,15 +897,31 @@ elif section == "📥 Data Ingestion":
               - Stock status, Seller info
             """)
 
+        # Excel conversion cache stats
+        cache_stats = get_excel_cache().stats()
+        st.divider()
+        st.markdown("**⚡ Excel Conversion Cache**")
+        e1, e2, e3, e4 = st.columns(4)
+        e1.metric("Hits", f"{cache_stats['hits']:,}", f"{cache_stats['hit_rate']:.0%} hit rate")
+        e2.metric("Misses", f"{cache_stats['misses']:,}")
+        e3.metric("Cached Workbooks", cache_stats["entries"], f"{cache_stats['evictions']} evicted", delta_color="off")
+        e4.metric("Cache Size", f"{cache_stats['size_mb']:.1f} MB", f"limit {cache_stats['max_mb']:.0f} MB", delta_color="off")
+
     with tab2:
-        if st.session_state.source_data_loaded and st.session_state.source_dataframe is not None:
-            st.success("✅ Data successfully loaded!")
-            df = st.session_state.source_dataframe
+        if st.session_state.source_data_loaded:
+            st.success(f"✅ Data successfully loaded! (`raw/{st.session_state.source_table}`)")
+            df, nbytes = source_frame()
             
             col1, col2, col3 = st.columns(3)
             col1.metric("Total Rows", f"{len(df):,}")
             col2.metric("Total Columns", f"{len(df.columns)}")
-            col3.metric("Memory Usage", f"{df.memory_usage(deep=True).sum() / 1024 / 1024:.2f} MB")
+            memory_report = store.info("raw", st.session_state.source_table).get("memory") or {}
+            col3.metric(
+                "Memory Usage", f"{nbytes / 1024 / 1024:.2f} MB",
+                f"-{memory_report['memory_before_mb'] - memory_report['memory_after_mb']:.2f} MB after dtype compaction"
+                if memory_report else None,
+                delta_color="inverse",
+            )
             
             st.markdown("**Data Preview:**")
             st.dataframe(df.head(20), use_container_width=True)
@@ -598,11 +930,10 @@ elif section == "📥 Data Ingestion":
             st.info("No data loaded yet. Upload a file in the first tab.")
 
     # Ingestion log
-    if st.session_state.lake["ingestion_log"]:
+    if len(ingestion_log):
         st.divider()
         st.markdown("### 📋 Ingestion Log")
-        log_df = pd.DataFrame(st.session_state.lake["ingestion_log"])
-        st.dataframe(log_df, use_container_width=True, hide_index=True)
+        show_history(ingestion_log, "ingestion_page")
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -612,13 +943,23 @@ elif section == "🏗️ Lake Zones":
     st.markdown("# 🏗️ Lake Zones")
     st.markdown("Browse datasets across all four zones and trigger zone promotions (ETL transformations).")
 
+    incremental_mode = st.toggle(
+        "Incremental promotion", key="incremental_promotion",
+        help="Merge only new and changed rows (by crawled_at watermark and pid/product_id) "
+             "into one stable table per dataset instead of writing a full timestamped copy",
+    )
+
     zone_tabs = st.tabs(["🌊 RAW", "🥉 BRONZE", "🥈 SILVER", "🥇 GOLD"])
     zones = ["raw", "bronze", "silver", "gold"]
     zone_labels = ["RAW", "BRONZE", "SILVER", "GOLD"]
+    active_promotions = {
+        (job["params"]["zone"], job["params"]["name"]): job
+        for job in job_runner.queue.list(limit=1000, statuses=ACTIVE) if job["kind"] == "promote"
+    }
 
     for tab, zone, label in zip(zone_tabs, zones, zone_labels):
         with tab:
-            data = st.session_state.lake[zone]
+            data = zone_tables[zone]
             if not data:
                 st.info(f"No datasets in {label} zone yet.")
                 if zone == "raw":
@@ -627,103 +968,45 @@ elif section == "🏗️ Lake Zones":
 
             st.markdown(f"**{len(data)} dataset(s) in {label} zone**")
 
-            for name, df in data.items():
+            for name in data:
+                # Everything shown here comes from the manifest or per-version caches;
+                # the table itself is only loaded for a promotion or a download.
+                manifest = store.info(zone, name)
+                fingerprint = table_fingerprint(zone, name)
                 color = zone_color(zone)
-                with st.expander(f"{zone_icon(zone)}  {name}   ·   {len(df):,} rows × {len(df.columns)} cols"):
+                with st.expander(f"{zone_icon(zone)}  {name}   ·   {manifest['rows']:,} rows × {len(manifest['schema'])} cols"):
+                    stats = store.stats(zone, name)
+                    manifest = store.info(zone, name)
                     c1, c2, c3 = st.columns(3)
-                    c1.markdown(f"**Rows:** `{len(df):,}`")
-                    c2.markdown(f"**Columns:** `{len(df.columns)}`")
-                    c3.markdown(f"**Memory:** `{df.memory_usage(deep=True).sum() / 1024:.1f} KB`")
+                    c1.markdown(f"**Rows:** `{manifest['rows']:,}`")
+                    c2.markdown(f"**Columns:** `{len(manifest['schema'])}`")
+                    c3.markdown(f"**Memory:** `{manifest['memory_bytes'] / 1024:.1f} KB`")
+                    if manifest.get("reference"):
+                        st.caption(f"🔗 Unchanged from `{manifest['reference']}`: shares its files instead of storing a copy")
 
-                    st.dataframe(df.head(10), use_container_width=True)
+                    st.dataframe(table_preview(zone, name, fingerprint), use_container_width=True)
 
                     # Schema
-                    schema_df = pd.DataFrame({
-                        "Column": df.columns,
-                        "Dtype": df.dtypes.astype(str).values,
-                        "Null%": (df.isnull().mean() * 100).round(1).values,
-                        "Unique": [df[c].nunique() for c in df.columns],
-                    })
-                    st.dataframe(schema_df, use_container_width=True, hide_index=True)
-
-                    # Promote button
-                    next_zones = {"raw": "bronze", "bronze": "silver", "silver": "gold"}
-                    if zone in next_zones:
-                        nz = next_zones[zone]
+                    st.dataframe(schema_frame(manifest["schema"], stats, manifest["rows"]), use_container_width=True, hide_index=True)
+
+                    # Promote button — the promotion itself runs as a background job
+                    if zone in NEXT_ZONE:
+                        nz = NEXT_ZONE[zone]
+                        pending = active_promotions.get((zone, name))
+                        if pending:
+                            st.caption(f"⏳ Promotion to {nz.upper()} {pending['status']} (job #{pending['id']})")
+                        if incremental_mode:
+                            target = incremental_target(zone, name)
+                            st.caption(f"Merges new and changed rows into `{nz}/{target}`")
                         if st.button(f"⬆️ Promote to {nz.upper()}", key=f"promote_{zone}_{name}"):
-                            with st.spinner(f"Transforming to {nz}..."):
-                                time.sleep(0.7)
-                                df_t = df.copy()
-                                
-                                # Zone-specific transformations
-                                if nz == "bronze":
-                                    # Clean nulls, duplicates
-                                    original_len = len(df_t)
-                                    id_col = None
-                                    for col in ['pid', 'product_id', 'id', '_id']:
-                                        if col in df_t.columns:
-                                            id_col = col
-                                            break
-                                    
-                                    if id_col:
-                                        df_t = df_t.dropna(subset=[id_col])
-                                        df_t = df_t.drop_duplicates(subset=[id_col])
-                                    else:
-                                        df_t = df_t.drop_duplicates()
-                                    
-                                    cleaned = original_len - len(df_t)
-                                    
-                                elif nz == "silver":
-                                    # Add business metrics
-                                    if 'actual_price_clean' in df_t.columns and 'selling_price_clean' in df_t.columns:
-                                        df_t['discount_pct_calc'] = ((df_t['actual_price_clean'] - df_t['selling_price_clean']) / df_t['actual_price_clean'] * 100).round(2)
-                                    if 'average_rating' in df_t.columns:
-                                        df_t['rating_category'] = pd.cut(
-                                            df_t['average_rating'], 
-                                            bins=[0, 2, 3, 4, 5], 
-                                            labels=['Poor', 'Fair', 'Good', 'Excellent']
-                                        )
-                                    
-                                elif nz == "gold":
-                                    # Aggregate by category
-                                    cat_col = None
-                                    for col in ['category', 'product_category', 'main_category']:
-                                        if col in df_t.columns:
-                                            cat_col = col
-                                            break
-                                    
-                                    if cat_col and 'selling_price_clean' in df_t.columns:
-                                        agg_dict = {'selling_price_clean': ['count', 'mean', 'median', 'min', 'max']}
-                                        if 'average_rating' in df_t.columns:
-                                            agg_dict['average_rating'] = 'mean'
-                                        if 'discount_pct_calc' in df_t.columns:
-                                            agg_dict['discount_pct_calc'] = 'mean'
-                                        
-                                        df_t = df_t.groupby(cat_col).agg(agg_dict).round(2)
-                                        df_t.columns = ['_'.join(col).strip('_') for col in df_t.columns.values]
-                                        df_t = df_t.reset_index()
-                                    else:
-                                        df_t = df_t.describe().reset_index()
-
-                                new_name = name.replace(f"{zone}_", "")
-                                ts = datetime.datetime.now().strftime("%H%M%S")
-                                dest_name = f"{nz}_{new_name}_{ts}"
-                                st.session_state.lake[nz][dest_name] = df_t
-
-                                entry = make_catalog_entry(dest_name, nz.upper(), list(df_t.dtypes.astype(str).items()), len(df_t), f"{zone}-promotion")
-                                st.session_state.lake["catalog"].append(entry)
-                                lineage = make_lineage_event(f"{zone}/{name}", f"{nz}/{dest_name}", "PROMOTE", len(df_t))
-                                st.session_state.lake["lineage"].append(lineage)
-                                job = make_job(f"promote_{zone}_to_{nz}", nz, len(df_t), random.randint(500, 3000))
-                                st.session_state.lake["jobs"].append(job)
-                            st.success(f"✅ Promoted to {nz.upper()} as `{dest_name}` ({len(df_t):,} rows)")
+                            label = f"Promote {zone}/{name} → {nz}" + (f" (merge into {target})" if incremental_mode else "")
+                            job_id = job_runner.submit("promote", label, zone=zone, name=name, incremental=incremental_mode)
+                            st.toast(f"⏳ Promotion of `{name}` to {nz.upper()} queued as job #{job_id}")
                             st.rerun()
 
-                    # Download
-                    csv_buf = io.StringIO()
-                    df.to_csv(csv_buf, index=False)
+                    # Download — the CSV is only generated once the button is clicked
                     st.download_button(
-                        f"💾 Download CSV", csv_buf.getvalue(),
+                        f"💾 Download CSV", csv_export(zone, name),
                         file_name=f"{name}.csv", mime="text/csv",
                         key=f"dl_{zone}_{name}"
                     )
@@ -738,65 +1021,123 @@ elif section == "🔍 Query Engine":
 
     # Gather all datasets
     all_datasets = {}
-    for zone in ["raw", "bronze", "silver", "gold"]:
-        for name, df in st.session_state.lake[zone].items():
-            all_datasets[f"{zone_icon(zone)} {zone}/{name}"] = (zone, name, df)
+    for zone in ZONES:
+        for name in zone_tables[zone]:
+            all_datasets[f"{zone_icon(zone)} {zone}/{name}"] = (zone, name)
 
     if not all_datasets:
         st.warning("⚠️ No datasets available. Upload data first.")
     else:
+        get_query_pool()   # workers start importing while the query is being written
         col1, col2 = st.columns([1, 2])
         with col1:
             selected = st.selectbox("Select Dataset", list(all_datasets.keys()))
-            zone, name, df = all_datasets[selected]
-            st.markdown(f"**Shape:** `{df.shape[0]:,} rows × {df.shape[1]} cols`")
+            zone, name = all_datasets[selected]
+            # Shape, columns and ranges come from the manifest; data is read on execute
+            manifest = store.info(zone, name)
+            col_stats = store.stats(zone, name)
+            columns = [c for c, _ in manifest["schema"]]
+            st.markdown(f"**Shape:** `{manifest['rows']:,} rows × {len(columns)} cols`")
 
             st.markdown("**Columns:**")
-            for col_name, dtype in df.dtypes.items():
+            for col_name, dtype in manifest["schema"]:
+                cs = col_stats.get(col_name, {})
+                value_range = f" [{cs['min']} … {cs['max']}]" if cs.get("min") is not None else ""
                 st.markdown(
                     f'<span style="font-family:JetBrains Mono,monospace;font-size:0.75rem;'
                     f'color:#7ab0ee">{col_name}</span> '
-                    f'<span style="font-family:JetBrains Mono,monospace;font-size:0.68rem;color:#446688">{dtype}</span>',
+                    f'<span style="font-family:JetBrains Mono,monospace;font-size:0.68rem;color:#446688">{dtype}{value_range}</span>',
                     unsafe_allow_html=True
                 )
 
         with col2:
-            st.markdown("**Query (pandas expression)**")
-            st.caption("Use `df` to reference the selected dataset.")
+            query_mode = st.radio("Mode", ["pandas", "SQL"], horizontal=True, key="query_mode")
+            sql_mode = query_mode == "SQL"
+            if sql_mode:
+                st.markdown("**Query (SQL)**")
+                st.caption(
+                    "Reference any table as `zone.name`; promoted tables are also reachable without their "
+                    "zone prefix and timestamp (newest promotion). Only the columns and row groups a query "
+                    "needs are read from the Parquet files."
+                )
+                with st.expander("📚 SQL tables"):
+                    st.dataframe(
+                        pd.DataFrame(list(get_sql_engine().tables().items()), columns=["SQL name", "Table"]),
+                        use_container_width=True, hide_index=True,
+                    )
+            else:
+                st.markdown("**Query (pandas expression)**")
+                st.caption(
+                    "Use `df` to reference the selected dataset, `scan(columns=, filters=[(col, op, value)])` "
+                    "to read only matching parts (skipped by their min/max), or `stats` for the column statistics."
+                )
 
             # Build query presets based on available columns
-            query_presets = {"Top 10 rows": "df.head(10)", "Statistical summary": "df.describe()"}
-            
-            if any(col in df.columns for col in ['category', 'product_category', 'main_category']):
-                cat_col = next((col for col in ['category', 'product_category', 'main_category'] if col in df.columns), None)
-                query_presets["Products by category"] = f"df.groupby('{cat_col}').size().reset_index(name='count').sort_values('count', ascending=False)"
-            
-            if 'brand' in df.columns and 'selling_price_clean' in df.columns:
-                query_presets["Top brands"] = "df.groupby('brand')['selling_price_clean'].mean().sort_values(ascending=False).head(10).reset_index()"
-            
-            if 'discount_pct_calc' in df.columns:
-                query_presets["High discount products"] = "df.nlargest(20, 'discount_pct_calc')[['title', 'brand', 'discount_pct_calc', 'selling_price_clean'] if 'title' in df.columns else df.columns[:5]]"
-            
-            if 'average_rating' in df.columns:
-                query_presets["Rating distribution"] = "df['average_rating'].value_counts().sort_index().reset_index()"
+            query_presets = query_presets_for(
+                zone, name, columns, sql_mode, raw_name=zone_tables["raw"][-1] if zone_tables["raw"] else None,
+            )
 
             preset = st.selectbox("Quick Queries", ["Custom..."] + list(query_presets.keys()))
-            default_query = query_presets.get(preset, "df.head(10)") if preset != "Custom..." else "df.head(10)"
+            default_query = query_presets.get(preset, query_presets["Top 10 rows"]) if preset != "Custom..." else query_presets["Top 10 rows"]
 
             query = st.text_area("Query", default_query, height=80)
 
-            if st.button("▶ Execute Query", use_container_width=True):
-                t0 = time.time()
+            with st.expander("⚙️ Execution limits"):
+                l1, l2 = st.columns(2)
+                timeout_s = l1.number_input("Timeout (s)", min_value=1, max_value=3600, value=int(DEFAULT_TIMEOUT_S), key="query_timeout_s")
+                memory_mb = l2.number_input("Memory limit (MB)", min_value=256, max_value=65536, value=DEFAULT_MEMORY_MB, step=256, key="query_memory_mb")
+
+            running = st.session_state.get("running_query")
+            if st.button("▶ Execute Query", use_container_width=True, disabled=running is not None):
+                query_cache = get_query_cache()
+                # Cached results are tied to the versions of the tables the query reads
                 try:
-                    result = eval(query, {"df": df, "pd": pd, "np": np})
-                    elapsed = int((time.time() - t0) * 1000)
-                    st.session_state.query_history.append({
-                        "query": query[:80], "dataset": name,
-                        "rows": len(result) if hasattr(result, "__len__") else 1,
-                        "time_ms": elapsed,
-                        "status": "OK"
-                    })
-                    st.success(f"✅ Query executed in **{elapsed}ms**")
+                    if sql_mode:
+                        cache_key = query_cache.key(query, "sql")
+                        dependencies = get_sql_engine().dependencies(query)
+                    else:
+                        cache_key = query_cache.key(query, "pandas", f"{zone}/{name}")
+                        dependencies = ((zone, name, manifest["version"]),)
+                except Exception:
+                    cache_key, dependencies = None, ()
+                run = {
+                    "query": query, "dataset": "SQL" if sql_mode else name,
+                    "cache_key": cache_key, "dependencies": dependencies,
+                    "cacheable": bool(dependencies) and is_cacheable(query),
+                }
+                cached = query_cache.get(cache_key, dependencies) if run["cacheable"] else None
+                if cached is not None:
+                    result, saved_ms = cached
+                    record_query(run, "OK", 0, result=result, cache_status="HIT", saved_ms=saved_ms)
+                else:
+                    st.session_state.query_result = None
+                    extra = None if sql_mode else {"stats": schema_frame(manifest["schema"], col_stats, manifest["rows"])}
+                    run["handle"] = get_query_pool().submit(
+                        "sql" if sql_mode else "pandas", query, zone, name, extra,
+                        timeout_s=timeout_s, memory_mb=memory_mb,
+                    )
+                    # Quick queries are rendered on this run; longer ones get a live status with a cancel button
+                    if run["handle"].wait(QUERY_INLINE_WAIT_S):
+                        finish_query(run)
+                    else:
+                        st.session_state.running_query = run
+
+            if st.session_state.get("running_query") is not None:
+                query_progress()
+
+            outcome = st.session_state.get("query_result")
+            if outcome is not None:
+                result = outcome["result"]
+                if outcome["status"] != "OK":
+                    if outcome["status"].startswith("ERROR"):
+                        st.error(f"❌ Query error: {outcome['status'][len('ERROR: '):]}")
+                    else:
+                        st.warning(f"⛔ {outcome['status']}")
+                else:
+                    if outcome["cache"] == "HIT":
+                        st.success(f"✅ Served from result cache in **{outcome['time_ms']}ms** (saved ~{outcome['saved_ms']:,}ms)")
+                    else:
+                        st.success(f"✅ Query executed in **{outcome['time_ms']}ms**")
                     if isinstance(result, pd.DataFrame):
                         st.dataframe(result, use_container_width=True)
                         # Plot if numeric
@@ -817,25 +1158,23 @@ elif section == "🔍 Query Engine":
                                 yaxis=dict(gridcolor="#1a2a44"),
                                 height=280,
                             )
-                            st.plotly_chart(fig, use_container_width=True)
+                            show_chart(fig)
                     elif isinstance(result, pd.Series):
                         st.dataframe(result.reset_index(), use_container_width=True)
                     else:
                         st.write(result)
-                except Exception as e:
-                    elapsed = int((time.time() - t0) * 1000)
-                    st.session_state.query_history.append({
-                        "query": query[:80], "dataset": name, "rows": 0,
-                        "time_ms": elapsed, "status": f"ERROR: {str(e)}"
-                    })
-                    st.error(f"❌ Query error: {str(e)}")
 
         # Query history
-        if st.session_state.query_history:
+        if len(query_history):
             st.divider()
             st.markdown("### 🕒 Query History")
-            hist_df = pd.DataFrame(st.session_state.query_history[::-1])
-            st.dataframe(hist_df, use_container_width=True, hide_index=True)
+            qc_stats = get_query_cache().stats()
+            h1, h2, h3, h4 = st.columns(4)
+            h1.metric("Cache Hits", f"{qc_stats['hits']:,}", f"{qc_stats['hit_rate']:.0%} hit rate")
+            h2.metric("Time Saved", f"{qc_stats['saved_ms'] / 1000:,.1f} s")
+            h3.metric("Cached Results", qc_stats["entries"], f"{qc_stats['invalidations']} invalidated · {qc_stats['evictions']} evicted", delta_color="off")
+            h4.metric("Cache Size", f"{qc_stats['size_mb']:.1f} MB", f"limit {qc_stats['max_mb']:.0f} MB", delta_color="off")
+            show_history(query_history, "query_history_page")
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -845,25 +1184,38 @@ elif section == "📋 Data Catalog":
     st.markdown("# 📋 Data Catalog")
     st.markdown("Searchable metadata registry for all datasets in the lake.")
 
-    if not st.session_state.lake["catalog"]:
+    if not catalog.count():
         st.info("Catalog is empty. Upload and ingest some data first.")
     else:
-        # Search & filter
-        col1, col2 = st.columns([2, 1])
+        # Search & filter (indexed, see lake/catalog.py)
+        facets = catalog.facets()
+        col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
         with col1:
-            search = st.text_input("🔍 Search catalog", placeholder="table name, zone, source...")
+            search = st.text_input("🔍 Search catalog", placeholder="table name, zone, source, column...")
         with col2:
             zone_filter = st.selectbox("Filter by zone", ["ALL", "RAW", "BRONZE", "SILVER", "GOLD"])
+        with col3:
+            tag_filter = st.selectbox("Tag", ["ALL"] + facets["tag"])
+        with col4:
+            column_filter = st.selectbox("Has column", ["ALL"] + facets["column"])
+
+        filters = dict(
+            text=search,
+            zone=None if zone_filter == "ALL" else zone_filter,
+            tag=None if tag_filter == "ALL" else tag_filter,
+            column=None if column_filter == "ALL" else column_filter,
+        )
+        total = catalog.search(**filters, page_size=0)[1]
+        pages = max(1, -(-total // CATALOG_PAGE_SIZE))
+        if st.session_state.get("catalog_page", 1) > pages:   # the filters narrowed the results
+            st.session_state.catalog_page = 1
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, step=1,
+                               key="catalog_page") if pages > 1 else 1
+        entries, total = catalog.search(**filters, page=page - 1)
 
-        entries = st.session_state.lake["catalog"]
-        if search:
-            entries = [e for e in entries if search.lower() in json.dumps(e).lower()]
-        if zone_filter != "ALL":
-            entries = [e for e in entries if e.get("zone") == zone_filter]
-
-        st.markdown(f"**{len(entries)} entries found**")
+        st.markdown(f"**{total:,} entries found**" + (f"  ·  page {page} of {pages}" if pages > 1 else ""))
 
-        for entry in entries[:30]:
+        for entry in entries:
             with st.expander(
                 f"{zone_icon(entry.get('zone','raw').lower())}  **{entry['table_name']}**   "
                 f"·  {entry.get('zone','')}  ·  {entry.get('row_count',0):,} rows"
@@ -875,6 +1227,13 @@ elif section == "📋 Data Catalog":
                 c4.markdown(f"**Owner**\n\n`{entry.get('owner','')}`")
 
                 st.markdown(f"**Checksum:** `{entry.get('checksum','')}`  ·  **Created:** `{entry.get('created_at','')[:19]}`")
+                memory = entry.get("memory")
+                if memory:
+                    saved = 1 - memory["memory_after_mb"] / max(memory["memory_before_mb"], 1e-9)
+                    st.markdown(
+                        f"**Memory:** `{memory['memory_before_mb']:.2f} MB` → `{memory['memory_after_mb']:.2f} MB` "
+                        f"({saved:.0%} saved by dtype compaction)"
+                    )
 
                 tags = entry.get("tags", [])
                 tag_html = " ".join([
@@ -886,7 +1245,7 @@ elif section == "📋 Data Catalog":
 
                 schema_items = entry.get("schema", [])
                 if schema_items and len(schema_items) > 0:
-                    schema_df = pd.DataFrame(schema_items, columns=["Column", "Dtype"])
+                    schema_df = schema_frame(schema_items, entry.get("stats"), entry.get("row_count"))
                     st.dataframe(schema_df.head(20), use_container_width=True, hide_index=True)
 
 
@@ -894,46 +1253,56 @@ elif section == "🔗 Data Lineage":
     st.markdown("# 🔗 Data Lineage")
     st.markdown("Track how data flows and transforms across lake zones.")
 
-    if not st.session_state.lake["lineage"]:
+    summary = lineage_graph.summary()
+    if not summary["events"]:
         st.info("No lineage events recorded yet. Ingest and promote some data.")
     else:
-        lineage = st.session_state.lake["lineage"]
-        lineage_df = pd.DataFrame(lineage)
-        st.dataframe(lineage_df, use_container_width=True, hide_index=True)
+        # Event log, newest first, one page at a time
+        pages = max(1, -(-lineage_graph.retained() // LINEAGE_PAGE_SIZE))
+        page = st.number_input(f"Event page (of {pages})", min_value=1, max_value=pages, value=1, step=1,
+                               key="lineage_page") if pages > 1 else 1
+        events, _ = lineage_graph.events(page=page - 1)
+        st.dataframe(events, use_container_width=True, hide_index=True)
 
         st.divider()
 
-        # Sankey diagram
+        # Sankey diagram over compacted edges (one per source, destination and operation)
         st.markdown("### 🌊 Data Flow Diagram (Sankey)")
-
-        all_nodes = list(set(lineage_df["source"].tolist() + lineage_df["destination"].tolist()))
-        node_idx = {n: i for i, n in enumerate(all_nodes)}
-
-        sankey_colors = []
-        for n in all_nodes:
-            if "raw/" in n or n.endswith('.xlsx') or n.endswith('.csv'):
-                sankey_colors.append("#9b59b6")
-            elif "bronze/" in n:
-                sankey_colors.append("#cd7f32")
-            elif "silver/" in n:
-                sankey_colors.append("#a8b8c8")
-            elif "gold/" in n:
-                sankey_colors.append("#ffd700")
-            else:
-                sankey_colors.append("#3dffa0")
+        focus = st.selectbox("Focus on dataset", ["Whole lake"] + lineage_graph.nodes(), key="lineage_focus")
+        if focus == "Whole lake":
+            edges = lineage_graph.edges(limit=SANKEY_MAX_EDGES)
+            upstream = downstream = None
+        else:
+            upstream, downstream = lineage_graph.upstream(focus), lineage_graph.downstream(focus)
+            edges = lineage_graph.edges(nodes={focus, *upstream["node"], *downstream["node"]})
+
+        all_nodes, link_sources, link_targets, link_values = sankey_links(edges)
+        labels = pd.Series(all_nodes, dtype=object)
+        sankey_colors = np.select(
+            [
+                labels.str.contains("raw/", regex=False) | labels.str.endswith((".xlsx", ".csv")),
+                labels.str.contains("bronze/", regex=False),
+                labels.str.contains("silver/", regex=False),
+                labels.str.contains("gold/", regex=False),
+            ],
+            ["#9b59b6", "#cd7f32", "#a8b8c8", "#ffd700"],
+            default="#3dffa0",
+        )
 
         fig_sankey = go.Figure(go.Sankey(
             node=dict(
                 pad=15, thickness=15,
                 line=dict(color="#1e3060", width=0.5),
-                label=[n[:35] + ("..." if len(n) > 35 else "") for n in all_nodes],
+                label=labels.where(labels.str.len() <= 35, labels.str[:35] + "..."),
                 color=sankey_colors,
             ),
             link=dict(
-                source=[node_idx[r["source"]] for _, r in lineage_df.iterrows()],
-                target=[node_idx[r["destination"]] for _, r in lineage_df.iterrows()],
-                value=[max(r["rows_processed"], 1) for _, r in lineage_df.iterrows()],
-                color=["rgba(92,224,255,0.15)"] * len(lineage_df),
+                source=link_sources,
+                target=link_targets,
+                value=link_values,
+                customdata=edges["events"],
+                hovertemplate="%{value:,} rows in %{customdata:,} event(s)<extra></extra>",
+                color="rgba(92,224,255,0.15)",
             )
         ))
         fig_sankey.update_layout(
@@ -942,122 +1311,196 @@ elif section == "🔗 Data Lineage":
             margin=dict(t=10, b=10, l=10, r=10),
             height=400,
         )
-        st.plotly_chart(fig_sankey, use_container_width=True)
+        show_chart(fig_sankey)
+        if focus == "Whole lake" and len(edges) == SANKEY_MAX_EDGES:
+            st.caption(f"Showing the {SANKEY_MAX_EDGES} heaviest flows; focus on a dataset to see all of its lineage.")
+
+        if focus != "Whole lake":
+            st.markdown("### 🎯 Impact Analysis")
+            i1, i2, i3 = st.columns(3)
+            i1.markdown(f"**⬆️ Upstream** ({len(upstream)})")
+            i1.dataframe(upstream, use_container_width=True, hide_index=True)
+            i2.markdown(f"**⬇️ Downstream** ({len(downstream)})")
+            i2.dataframe(downstream, use_container_width=True, hide_index=True)
+            gold = lineage_graph.impact(focus, "gold")
+            i3.markdown(f"**🥇 Gold tables depending on it** ({len(gold)})")
+            i3.dataframe(gold, use_container_width=True, hide_index=True)
 
         col1, col2, col3 = st.columns(3)
-        col1.metric("Total Events", len(lineage))
-        col2.metric("Total Rows Moved", f"{lineage_df['rows_processed'].sum():,}")
-        col3.metric("Avg Duration (ms)", f"{lineage_df['duration_ms'].mean():.0f}")
+        col1.metric("Total Events", f"{summary['events']:,}")
+        col2.metric("Total Rows Moved", f"{summary['rows_processed']:,}")
+        col3.metric("Avg Duration (ms)", f"{summary['avg_duration_ms']:.0f}")
 
 
 elif section == "⚡ ETL Pipeline":
     st.markdown("# ⚡ ETL Pipeline")
     st.markdown("Monitor and trigger transformation jobs across all zones.")
 
-    raw_datasets = list(st.session_state.lake["raw"].keys())
+    raw_datasets = zone_tables["raw"]
 
     if not raw_datasets:
         st.warning("⚠️ No raw datasets available. Upload data first.")
     else:
         st.markdown("### 🚀 Run Full Pipeline")
-        selected_raw = st.selectbox("Select Raw Dataset", raw_datasets)
-        
-        pipe_cols = st.columns(4)
-        steps = [
-            ("🌊→🥉 Clean", "bronze", "Parse & validate"),
-            ("🥉→🥈 Enrich", "silver", "Add metrics"),
-            ("🥈→🥇 Aggregate", "gold", "Compute KPIs"),
-            ("🥇 Publish", "gold", "BI-ready"),
-        ]
-
-        for col, (step_label, zone, desc) in zip(pipe_cols, steps):
+        pipeline = Pipeline()
+        pipe_cols = st.columns(len(pipeline.order))
+        for col, stage_name in zip(pipe_cols, pipeline.order):
+            stage = pipeline.stages[stage_name]
+            after = ", ".join(stage["after"]) or "raw"
             col.markdown(
                 f'<div style="background:#0f1d36;border:1px solid #1e3060;border-radius:8px;'
                 f'padding:12px;text-align:center;font-family:JetBrains Mono,monospace;font-size:0.75rem">'
-                f'<div style="color:{zone_color(zone)};font-weight:700">{step_label}</div>'
-                f'<div style="color:#446688;margin-top:4px">{desc}</div>'
+                f'<div style="color:{zone_color(stage["zone"])};font-weight:700">{stage["label"]}</div>'
+                f'<div style="color:#446688;margin-top:4px">after: {after}</div>'
                 f'</div>',
                 unsafe_allow_html=True
             )
 
-        if st.button("▶▶ RUN FULL PIPELINE", use_container_width=True, type="primary"):
-            df_src = st.session_state.lake["raw"][selected_raw]
-            ts = datetime.datetime.now().strftime("%H%M%S")
-            progress = st.progress(0, "Initializing...")
-            status_box = st.empty()
-
-            # Find ID column
-            id_col = None
-            for col in ['pid', 'product_id', 'id', '_id']:
-                if col in df_src.columns:
-                    id_col = col
-                    break
-
-            pipeline_stages = [
-                ("Bronze: Clean & Validate", "bronze", lambda d: d.dropna(subset=[id_col]).drop_duplicates(subset=[id_col]) if id_col else d.drop_duplicates()),
-                ("Silver: Enrich & Transform", "silver", lambda d: (
-                    d.assign(
-                        discount_pct_calc=((d['actual_price_clean'] - d['selling_price_clean']) / d['actual_price_clean'] * 100).round(2)
-                    ) if 'actual_price_clean' in d.columns and 'selling_price_clean' in d.columns else d
-                )),
-                ("Gold: Aggregate KPIs", "gold", lambda d: d.describe().reset_index()),
-            ]
-
-            current_df = df_src
-            for i, (stage_name, zone, transform_fn) in enumerate(pipeline_stages):
-                status_box.info(f"⚙️ Running: **{stage_name}**...")
-                time.sleep(0.8)
-                try:
-                    current_df = transform_fn(current_df)
-                except Exception:
-                    current_df = current_df.head(100)
-
-                dest_name = f"{zone}_{selected_raw}_{ts}"
-                st.session_state.lake[zone][dest_name] = current_df
-                entry = make_catalog_entry(dest_name, zone.upper(), list(current_df.dtypes.astype(str).items()), len(current_df), "etl-pipeline")
-                st.session_state.lake["catalog"].append(entry)
-                lin = make_lineage_event(f"pipeline_stage_{i}", f"{zone}/{dest_name}", stage_name, len(current_df))
-                st.session_state.lake["lineage"].append(lin)
-                job = make_job(stage_name, zone, len(current_df), random.randint(600, 4000))
-                st.session_state.lake["jobs"].append(job)
-                progress.progress((i + 1) / len(pipeline_stages), f"Completed: {stage_name}")
-
-            status_box.success("✅ Full pipeline completed successfully!")
-            st.balloons()
-            time.sleep(1)
+        st.markdown("")
+        run_col, workers_col = st.columns([3, 1])
+        selected_raw = run_col.selectbox("Select Raw Dataset", raw_datasets)
+        dag_workers = workers_col.number_input(
+            "Worker processes", min_value=1, max_value=64,
+            value=DAG_WORKERS, step=1, key="dag_workers",
+            help="Independent datasets and branches run in parallel on this many processes",
+        )
+        unpromoted = unpromoted_raw_tables(store)
+
+        b1, b2, b3 = st.columns(3)
+        if b1.button("▶▶ RUN FULL PIPELINE", use_container_width=True, type="primary"):
+            # Runs in the background; submit as many as needed, they queue
+            job_id = job_runner.submit("pipeline", f"Full pipeline: raw/{selected_raw}",
+                                       raw_name=selected_raw, workers=int(dag_workers))
+            st.toast(f"🚀 Pipeline for `{selected_raw}` queued as job #{job_id}")
+            st.rerun()
+        if b2.button(f"⏩ PROMOTE ALL UN-PROMOTED RAW TABLES ({len(unpromoted)})",
+                     use_container_width=True, disabled=not unpromoted):
+            job_id = job_runner.submit("batch", f"Batch pipeline: {len(unpromoted)} raw table(s)",
+                                       workers=int(dag_workers))
+            st.toast(f"🚀 Batch run over {len(unpromoted)} raw table(s) queued as job #{job_id}")
+            st.rerun()
+        if b3.button("🔁 RUN INCREMENTAL PIPELINE", use_container_width=True,
+                     help=f"Merge only new and changed rows of raw/{selected_raw} into "
+                          f"bronze/silver/gold tables of dataset '{incremental_dataset('raw', selected_raw)}'"):
+            job_id = job_runner.submit("incremental", f"Incremental pipeline: raw/{selected_raw}", raw_name=selected_raw)
+            st.toast(f"🔁 Incremental run for `{selected_raw}` queued as job #{job_id}")
             st.rerun()
 
     st.divider()
     st.markdown("### 📋 Job History")
-    if st.session_state.lake["jobs"]:
-        jobs_df = pd.DataFrame(st.session_state.lake["jobs"][::-1])
-        st.dataframe(jobs_df, use_container_width=True, hide_index=True)
-    else:
-        st.info("No ETL jobs have run yet.")
+
+    @st.fragment(run_every=1.0 if any(job_runner.queue.counts().get(status) for status in ACTIVE) else None)
+    def job_history():
+        jobs = job_runner.queue.list(limit=50)
+        if not jobs:
+            st.info("No ETL jobs have run yet.")
+            return
+        counts = job_runner.queue.counts()
+        j1, j2, j3, j4 = st.columns(4)
+        j1.metric("Queued", counts.get("queued", 0))
+        j2.metric("Running", counts.get("running", 0))
+        j3.metric("Succeeded", counts.get("succeeded", 0))
+        j4.metric("Failed", counts.get("failed", 0))
+        st.dataframe(job_rows(jobs), use_container_width=True, hide_index=True)
+
+    job_history()
+
+    scheduled = next((job for job in job_runner.queue.list(limit=50, statuses=("succeeded",))
+                      if (job["result"] or {}).get("schedule")), None)
+    if scheduled:
+        schedule = scheduled["result"]["schedule"]
+        st.markdown(f"### 🗓️ Schedule of job #{scheduled['id']} · {scheduled['label']}")
+        s1, s2, s3, s4 = st.columns(4)
+        s1.metric("Wall Time", f"{schedule['makespan_ms'] / 1000:.2f} s",
+                  f"+{schedule['startup_ms'] / 1000:.2f} s worker startup", delta_color="off")
+        s2.metric("Critical Path", f"{schedule['critical_path_ms'] / 1000:.2f} s")
+        s3.metric("Worker Utilization", f"{schedule['utilization']:.0%}", f"{schedule['workers']} workers", delta_color="off")
+        s4.metric("Parallel Speedup", f"{schedule['speedup']:.2f}×")
+        st.caption("Critical path: " + " → ".join(
+            f"{step['dataset']}/{step['stage']} ({step['duration_ms']:,} ms)" for step in schedule["critical_path"]
+        ))
+
+        runs = pd.DataFrame(scheduled["result"]["stages"])
+        runs["lane"] = runs["worker"].map({pid: f"worker {i + 1}" for i, pid in enumerate(runs["worker"].dropna().unique())})
+        fig_gantt = go.Figure()
+        for step, group in runs[runs["status"] == "succeeded"].groupby("step", sort=False):
+            fig_gantt.add_trace(go.Bar(
+                y=group["lane"], x=group["duration_ms"], base=group["start_ms"], orientation="h", name=step,
+                text=group["dataset"], hovertemplate="%{text}<br>%{base:,} ms + %{x:,} ms<extra>" + step + "</extra>",
+            ))
+        fig_gantt.update_layout(
+            barmode="overlay", paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)",
+            font=dict(color="#8899cc", family="JetBrains Mono"),
+            margin=dict(t=10, b=0, l=0, r=0), height=80 + 40 * schedule["workers"],
+            xaxis=dict(gridcolor="#1a2a44", title="ms since start"),
+            yaxis=dict(gridcolor="#1a2a44", autorange="reversed"),
+        )
+        show_chart(fig_gantt)
+
+        stage_util = pd.DataFrame(schedule["stages"])
+        stage_util["utilization"] = (stage_util["utilization"] * 100).round(1).astype(str) + "%"
+        st.dataframe(stage_util, use_container_width=True, hide_index=True)
+
+    if len(job_log):
+        st.markdown("**Stage runs**")
+        show_history(job_log, "stage_runs_page")
+
+    trends = stage_trends()
+    if not trends.empty:
+        st.markdown("### 📈 Stage Performance Trends")
+        metric = st.radio(
+            "Measure", ["wall_ms", "cpu_ms", "rows_per_sec", "peak_rss_mb"], horizontal=True, key="trend_metric",
+            format_func={"wall_ms": "Wall time (ms)", "cpu_ms": "CPU time (ms)",
+                         "rows_per_sec": "Rows/sec", "peak_rss_mb": "Peak RSS (MB)"}.get,
+        )
+        fig_trend = px.line(trends, x="finished_at", y=metric, color="stage", markers=True,
+                            hover_data=["job", "rows_in", "rows_out"], labels={"finished_at": ""})
+        show_chart(trend_layout(fig_trend, 320))
+        summary = trends.groupby("stage").agg(
+            runs=("job", "size"),
+            median_wall_ms=("wall_ms", "median"),
+            p95_wall_ms=("wall_ms", lambda s: s.quantile(0.95)),
+            median_cpu_ms=("cpu_ms", "median"),
+            median_rows_per_sec=("rows_per_sec", "median"),
+            max_peak_rss_mb=("peak_rss_mb", "max"),
+            last_run=("finished_at", "max"),
+        ).round(1).reset_index()
+        st.dataframe(summary, use_container_width=True, hide_index=True)
+        st.caption("CPU time and memory are per process: DAG stages are measured in their own worker, "
+                   "promotions and ingestions in the server process alongside anything else it runs.")
 
 
 elif section == "📊 Analytics":
     st.markdown("# 📊 Analytics Dashboard")
     st.markdown("Business intelligence views powered by your data.")
 
-    if not st.session_state.source_data_loaded or st.session_state.source_dataframe is None:
+    if not st.session_state.source_data_loaded:
         st.warning("⚠️ No data loaded yet. Go to **Data Ingestion** to upload your dataset.")
     else:
-        df = st.session_state.source_dataframe
+        source = st.session_state.source_table
+        fingerprint = table_fingerprint("raw", source)
+        columns = [c for c, _ in store.info("raw", source)["schema"]]
+        kpis = analytics_kpis("raw", source, fingerprint)
+        exact = st.toggle(
+            "🎯 Exact percentiles", value=False,
+            help="Medians and percentiles come from quantile sketches kept with the table: instant, "
+                 "and within 1% of the exact value for positive columns such as prices. "
+                 "Exact mode reads and sorts the column instead.",
+        )
         
         # KPIs
         st.markdown("### 🔑 Key Performance Indicators")
         k1, k2, k3, k4, k5 = st.columns(5)
-        k1.metric("Total Products", f"{len(df):,}")
+        k1.metric("Total Products", f"{kpis['rows']:,}")
         
-        if 'average_rating' in df.columns:
-            k2.metric("Avg Rating", f"{df['average_rating'].mean():.2f} ⭐")
-        if 'discount_pct' in df.columns:
-            k3.metric("Avg Discount", f"{df['discount_pct'].mean():.1f}%")
-        if 'selling_price_clean' in df.columns:
-            k4.metric("Avg Price", f"₹{df['selling_price_clean'].mean():,.0f}" if 'actual_price' in str(df.columns) and '₹' in str(df['actual_price'].iloc[0]) else f"${df['selling_price_clean'].mean():,.2f}")
-        if 'out_of_stock' in df.columns:
-            k5.metric("Out of Stock", f"{df['out_of_stock'].sum():,}")
+        if 'avg_rating' in kpis:
+            k2.metric("Avg Rating", f"{kpis['avg_rating']:.2f} ⭐")
+        if 'avg_discount' in kpis:
+            k3.metric("Avg Discount", f"{kpis['avg_discount']:.1f}%")
+        if 'avg_price' in kpis:
+            k4.metric("Avg Price", f"₹{kpis['avg_price']:,.0f}" if kpis['rupees'] else f"${kpis['avg_price']:,.2f}")
+        if 'out_of_stock' in kpis:
+            k5.metric("Out of Stock", f"{kpis['out_of_stock']:,}")
 
         st.divider()
 
@@ -1067,15 +1510,14 @@ elif section == "📊 Analytics":
         # Find category column
         cat_col = None
         for col in ['category', 'product_category', 'main_category']:
-            if col in df.columns:
+            if col in columns:
                 cat_col = col
                 break
 
         with col1:
             if cat_col:
                 st.markdown(f"#### 📦 Products by {cat_col.title()}")
-                cat_counts = df[cat_col].value_counts().head(10).reset_index()
-                cat_counts.columns = [cat_col, 'count']
+                cat_counts = analytics_category_counts("raw", source, fingerprint, cat_col)
                 fig_cat = px.bar(cat_counts, x='count', y=cat_col, orientation='h',
                                  color='count', color_continuous_scale=["#1a3a7a", "#5ce0ff"])
                 fig_cat.update_layout(
@@ -1086,14 +1528,16 @@ elif section == "📊 Analytics":
                     xaxis=dict(gridcolor="#1a2a44"),
                     yaxis=dict(gridcolor="#1a2a44"),
                 )
-                st.plotly_chart(fig_cat, use_container_width=True)
+                show_chart(fig_cat)
 
         with col2:
-            if 'selling_price_clean' in df.columns:
+            if 'selling_price_clean' in columns:
                 st.markdown("#### 💰 Price Distribution")
-                fig_price = px.histogram(df[df['selling_price_clean'] < df['selling_price_clean'].quantile(0.95)], 
-                                        x='selling_price_clean', nbins=50,
-                                        color_discrete_sequence=["#5ce0ff"])
+                bins = analytics_price_histogram("raw", source, fingerprint, exact)
+                fig_price = go.Figure(go.Bar(
+                    x=(bins["start"] + bins["end"]) / 2, y=bins["count"], width=bins["end"] - bins["start"],
+                    marker_color="#5ce0ff", marker_line_width=0,
+                ))
                 fig_price.update_layout(
                     paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)",
                     font=dict(color="#8899cc", family="JetBrains Mono"),
@@ -1102,18 +1546,25 @@ elif section == "📊 Analytics":
                     yaxis=dict(gridcolor="#1a2a44", title="Count"),
                     bargap=0.05,
                 )
-                st.plotly_chart(fig_price, use_container_width=True)
+                show_chart(fig_price)
+                st.caption("Prices below the 95th percentile" + ("" if exact else " (sketch, ±1%)"))
+
+        if 'selling_price_clean' in columns:
+            st.markdown("#### 📐 Price Percentiles")
+            extra = st.number_input("Percentile", min_value=0.0, max_value=100.0, value=50.0, step=0.5,
+                                    key="analytics_percentile")
+            qs = tuple(sorted(set(analytics.PRICE_PERCENTILES) | {round(extra / 100, 4)}))
+            percentiles = analytics_price_percentiles("raw", source, fingerprint, qs, exact)
+            rupees = kpis.get('rupees')
+            cols = st.columns(len(qs))
+            for col, (q, value) in zip(cols, percentiles.items()):
+                col.metric(f"p{q * 100:g}", f"₹{value:,.0f}" if rupees else f"${value:,.2f}")
 
         # Summary table
         st.divider()
-        if cat_col and 'selling_price_clean' in df.columns:
+        if cat_col and 'selling_price_clean' in columns:
             st.markdown("#### 📋 Category Summary (Gold Layer)")
-            gold_summary = df.groupby(cat_col).agg({
-                cat_col: 'count',
-                'selling_price_clean': ['mean', 'median', 'min', 'max'],
-            }).round(2)
-            gold_summary.columns = ['product_count', 'avg_price', 'median_price', 'min_price', 'max_price']
-            gold_summary = gold_summary.reset_index().sort_values('product_count', ascending=False).head(20)
+            gold_summary = analytics_gold_summary("raw", source, fingerprint, cat_col, exact)
             
             st.dataframe(gold_summary, use_container_width=True, hide_index=True)
 
@@ -0,0 +1,5 @@
+"""
+Performance benchmarks for the data lake. Run from the repository root,
+e.g. ``python -m benchmarks.run`` (the whole suite, results as JSON) or
+``python -m benchmarks.bench_process``.
+"""
@@ -0,0 +1,103 @@
+"""
+process_flipkart_data Benchmark
+===============================
+Compares the vectorized ``lake.processing.process_flipkart_data`` with
+the previous chained ``.str.replace`` implementation on synthetic data.
+
+    python -m benchmarks.bench_process                 # 1M and 10M rows
+    python -m benchmarks.bench_process --rows 100000   # quick run
+
+10M rows need roughly 8 GB of RAM for both variants.
+"""
+
+import argparse
+import gc
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.datagen import make_flipkart_frame
+from lake.processing import CRAWLED_AT_FORMAT, process_flipkart_data
+
+
+def legacy_process_flipkart_data(df):
+    """The pre-vectorization implementation, kept verbatim as the baseline"""
+    if 'Unnamed: 0' in df.columns:
+        df = df.drop(columns=['Unnamed: 0'])
+
+    if 'actual_price' in df.columns and df['actual_price'].dtype == 'object':
+        df['actual_price_clean'] = df['actual_price'].str.replace('₹', '').str.replace(',', '')
+        df['actual_price_clean'] = pd.to_numeric(df['actual_price_clean'], errors='coerce')
+    elif 'actual_price' in df.columns:
+        df['actual_price_clean'] = df['actual_price']
+
+    if 'selling_price' in df.columns and df['selling_price'].dtype == 'object':
+        df['selling_price_clean'] = df['selling_price'].str.replace('₹', '').str.replace(',', '')
+        df['selling_price_clean'] = pd.to_numeric(df['selling_price_clean'], errors='coerce')
+    elif 'selling_price' in df.columns:
+        df['selling_price_clean'] = df['selling_price']
+
+    if 'discount' in df.columns and df['discount'].dtype == 'object':
+        df['discount_pct'] = df['discount'].str.replace('%', '')
+        df['discount_pct'] = pd.to_numeric(df['discount_pct'], errors='coerce')
+    elif 'discount' in df.columns:
+        df['discount_pct'] = df['discount']
+
+    if 'average_rating' in df.columns:
+        df['average_rating'] = df['average_rating'].fillna(0)
+
+    if 'actual_price_clean' in df.columns and 'selling_price_clean' in df.columns:
+        df['price_savings'] = df['actual_price_clean'] - df['selling_price_clean']
+
+    if 'crawled_at' in df.columns:
+        df['crawled_at'] = pd.to_datetime(df['crawled_at'], errors='coerce')
+
+    return df
+
+
+def _time(fn, raw, repeat):
+    best = float("inf")
+    out = None
+    for _ in range(repeat):
+        frame = raw.copy()
+        gc.collect()
+        t0 = time.perf_counter()
+        out = fn(frame)
+        best = min(best, time.perf_counter() - t0)
+        del frame
+    return best, out
+
+
+def _check(new, old, raw):
+    """The new parser must agree with the old one wherever the old one parsed
+    a price, and parse every crawl stamp as the crawler's day-first format"""
+    for col in ("actual_price_clean", "selling_price_clean"):
+        a = new[col].to_numpy(dtype=float)
+        b = pd.to_numeric(old[col], errors="coerce").to_numpy(dtype=float)
+        both = ~np.isnan(b)
+        assert np.allclose(a[both], b[both]), col
+    # The old parser lets pandas infer the stamps' format, which may read them
+    # month-first: compare with the fixed expected parse instead
+    expected = pd.to_datetime(raw["crawled_at"], format=CRAWLED_AT_FORMAT, errors="coerce")
+    assert new["crawled_at"].equals(expected.rename(new["crawled_at"].name)), "crawled_at"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>12} {'legacy s':>10} {'new s':>10} {'legacy rows/s':>15} {'new rows/s':>15} {'speedup':>8}")
+    for rows in args.rows:
+        raw = make_flipkart_frame(rows)
+        t_old, old = _time(legacy_process_flipkart_data, raw, args.repeat)
+        t_new, new = _time(process_flipkart_data, raw, args.repeat)
+        _check(new, old, raw)
+        print(f"{rows:>12,} {t_old:>10.2f} {t_new:>10.2f} {rows / t_old:>15,.0f} {rows / t_new:>15,.0f} {t_old / t_new:>7.1f}x")
+        del raw, old, new
+
+
+if __name__ == "__main__":
+    main()
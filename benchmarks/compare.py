@@ -0,0 +1,66 @@
+"""
+Benchmark Comparison
+====================
+Compares two result files of ``benchmarks.run`` benchmark by benchmark
+(matched on rows and name) and flags the ones that got slower than
+``--threshold`` times the baseline.
+
+    python -m benchmarks.compare bench_main.json bench_branch.json
+    python -m benchmarks.compare old.json new.json --threshold 1.1
+
+Exits with status 1 when there is a regression, so it can gate CI.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# Timings this short are mostly noise; they are compared but never flagged
+MIN_FLAG_MS = 20
+
+
+def compare(baseline, current, threshold=1.2):
+    """One row per benchmark present in both result files"""
+    before = {(r["rows"], r["name"]): r for r in baseline["results"]}
+    rows = []
+    for result in current["results"]:
+        old = before.get((result["rows"], result["name"]))
+        if old is None:
+            continue
+        ratio = result["best_ms"] / max(old["best_ms"], 1)
+        rows.append({
+            "rows": result["rows"], "group": result["group"], "name": result["name"],
+            "baseline_ms": old["best_ms"], "current_ms": result["best_ms"], "ratio": round(ratio, 3),
+            "regression": ratio > threshold and result["best_ms"] >= MIN_FLAG_MS,
+        })
+    return rows
+
+
+def print_comparison(rows, baseline, current):
+    print(f"\nbaseline {baseline.get('version')} ({baseline.get('created_at', '')[:19]})  →  "
+          f"current {current.get('version')} ({current.get('created_at', '')[:19]})")
+    print(f"{'rows':>12}  {'benchmark':<52} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for row in rows:
+        flag = "  ⚠ regression" if row["regression"] else ""
+        print(f"{row['rows']:>12,}  {row['group'] + '/' + row['name']:<52} {row['baseline_ms']:>8,}ms "
+              f"{row['current_ms']:>8,}ms {row['ratio']:>6.2f}x{flag}")
+    regressions = sum(row["regression"] for row in rows)
+    print(f"\n{len(rows)} benchmarks compared, {regressions} regression(s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=1.2, help="slowdown ratio flagged as a regression")
+    args = parser.parse_args()
+    baseline = json.loads(Path(args.baseline).read_text())
+    current = json.loads(Path(args.current).read_text())
+    rows = compare(baseline, current, args.threshold)
+    print_comparison(rows, baseline, current)
+    sys.exit(1 if any(row["regression"] for row in rows) else 0)
+
+
+if __name__ == "__main__":
+    main()
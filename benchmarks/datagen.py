@@ -0,0 +1,76 @@
+"""
+Synthetic Flipkart Data
+=======================
+Deterministic generator for Flipkart-shaped product exports: ₹-formatted
+prices, ``NN% off`` discounts, ratings, categories, brands, titles and
+``crawled_at`` stamps in the crawler's format. Strings are drawn from
+pre-formatted pools so that 10M rows generate in seconds.
+
+The same ``rows`` and ``seed`` always give the same frame, so benchmark
+results of different versions are comparable.
+"""
+
+import numpy as np
+import pandas as pd
+
+CATEGORIES = ["Clothing and Accessories", "Footwear", "Bags, Wallets & Belts",
+              "Toys", "Home & Furniture", "Jewellery", "Sports", "Electronics"]
+SUB_CATEGORIES = ["Topwear", "Bottomwear", "Winter Wear", "Innerwear", "Kids",
+                  "Blazers", "Fabrics", "Sleepwear", "Western Wear", "Accessories"]
+BRANDS = [f"Brand{i:03d}" for i in range(400)]
+SELLERS = [f"Seller{i:04d}" for i in range(2000)]
+ADJECTIVES = ["Printed", "Solid", "Striped", "Checkered", "Slim Fit", "Regular Fit",
+              "Casual", "Formal", "Cotton", "Woven", "Embroidered", "Self Design"]
+PRODUCTS = ["Men Round Neck T-Shirt", "Women Kurta", "Men Casual Shirt", "Women Top",
+            "Men Jeans", "Women Leggings", "Boys Track Pants", "Girls Dress",
+            "Men Sneakers", "Women Sandals", "Backpack", "Wallet", "Watch", "Sweatshirt"]
+
+
+def _pool_take(pool, idx):
+    return np.asarray(pool, dtype=object)[idx]
+
+
+def _product_ids(rows, rng, duplicate_rate):
+    """``PID`` strings, unique except ``duplicate_rate`` of rows that repeat an
+    earlier product (the same product crawled twice)"""
+    ids = np.arange(rows)
+    repeat = np.flatnonzero(rng.random(rows) < duplicate_rate)
+    repeat = repeat[repeat > 0]
+    ids[repeat] = rng.integers(0, repeat)
+    return ("PID" + pd.Series(ids).astype(str).str.zfill(9)).to_numpy(dtype=object)
+
+
+def make_flipkart_frame(rows, seed=42, missing_rate=0.02, duplicate_rate=0.01):
+    """Return a raw (unprocessed) Flipkart-like DataFrame with ``rows`` rows"""
+    rng = np.random.default_rng(seed)
+    actual = rng.integers(199, 20_000, rows)
+    discount = rng.integers(0, 81, rows)
+    selling = np.maximum(1, (actual * (100 - discount) // 100))
+
+    price_pool = [f"₹{v:,}" for v in range(20_000)]
+    discount_pool = [f"{v}% off" for v in range(101)]
+    stamps = pd.date_range("2021-02-01", periods=5_000, freq="7min")
+    stamp_pool = stamps.strftime("%d/%m/%Y, %H:%M:%S").tolist()
+    title_pool = [f"{adjective} {product}" for adjective in ADJECTIVES for product in PRODUCTS]
+
+    df = pd.DataFrame({
+        "Unnamed: 0": np.arange(rows),
+        "pid": _product_ids(rows, rng, duplicate_rate),
+        "title": _pool_take(title_pool, rng.integers(0, len(title_pool), rows)),
+        "brand": _pool_take(BRANDS, rng.integers(0, len(BRANDS), rows)),
+        "category": _pool_take(CATEGORIES, rng.integers(0, len(CATEGORIES), rows)),
+        "sub_category": _pool_take(SUB_CATEGORIES, rng.integers(0, len(SUB_CATEGORIES), rows)),
+        "actual_price": _pool_take(price_pool, actual),
+        "selling_price": _pool_take(price_pool, selling),
+        "discount": _pool_take(discount_pool, discount),
+        "average_rating": np.round(rng.uniform(1, 5, rows), 1),
+        "out_of_stock": rng.random(rows) < 0.1,
+        "seller": _pool_take(SELLERS, rng.integers(0, len(SELLERS), rows)),
+        "crawled_at": _pool_take(stamp_pool, rng.integers(0, len(stamp_pool), rows)),
+    })
+
+    # Sprinkle missing values the way real crawls have them
+    for col in ("actual_price", "discount", "average_rating", "seller"):
+        mask = rng.random(rows) < missing_rate
+        df.loc[mask, col] = None if df[col].dtype == object else np.nan
+    return df
@@ -0,0 +1,251 @@
+"""
+Benchmark Suite
+===============
+Times the data lake's hot paths on deterministic synthetic Flipkart data
+(benchmarks/datagen.py) and writes the results as JSON, so runs of
+different versions can be compared (benchmarks/compare.py):
+
+- ingestion: ``process_flipkart_data``, ``optimize_dtypes``, the Raw Zone write
+- each zone promotion (raw → bronze → silver → gold), read to write
+- the gold aggregations on an in-memory silver frame, and the category
+  KPIs on the stored silver table (row groups, in parallel)
+- every Query Engine preset on the silver table, SQL and pandas, run the
+  way a query worker runs them
+- the Analytics dashboard computations on the raw table, with percentiles
+  from the quantile sketches and exact
+
+Every benchmark is measured with ``lake.metrics.Meter`` (wall and CPU time,
+peak RSS, rows/sec); the best of ``--repeat`` runs is reported next to the
+median.
+
+    python -m benchmarks.run                                # 10k, 1M and 10M rows
+    python -m benchmarks.run --rows 10000 --out bench.json  # quick run
+    python -m benchmarks.run --rows 1000000 --compare bench_main.json
+
+10M rows need roughly 8 GB of RAM.
+"""
+
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import duckdb
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from benchmarks.compare import compare, print_comparison
+from benchmarks.datagen import make_flipkart_frame
+from lake import LakeStore, analytics
+from lake.dtypes import optimize_dtypes
+from lake.jobs import promote_table
+from lake.metrics import Meter
+from lake.presets import query_presets
+from lake.processing import process_flipkart_data
+from lake.transforms import CATEGORY_COLUMNS, aggregate_by_category, aggregate_category_table, find_column, summarize
+from lake.worker import OK, run_query
+
+DEFAULT_ROWS = [10_000, 1_000_000, 10_000_000]
+SCHEMA_VERSION = 1
+
+
+def _version():
+    """``git describe`` of the tree being measured, or None outside a checkout"""
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"], cwd=Path(__file__).resolve().parent,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _environment():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "pyarrow": pa.__version__,
+        "duckdb": duckdb.__version__,
+    }
+
+
+class Suite:
+    """Runs benchmarks and collects their results"""
+
+    def __init__(self, rows, repeat, verbose=True):
+        self.rows = rows
+        self.repeat = repeat
+        self.verbose = verbose
+        self.results = []
+
+    def measure(self, group, name, fn, rows_in=None, repeat=None):
+        """Time ``fn()`` ``repeat`` times; ``fn`` returns its output row count (or None).
+        Returns the last run's return value."""
+        runs, value = [], None
+        for _ in range(repeat or self.repeat):
+            gc.collect()
+            with Meter(rows_in=rows_in) as meter:
+                value = fn()
+                meter.rows_out = value if isinstance(value, (int, np.integer)) else None
+            runs.append(meter.metrics())
+        best = min(runs, key=lambda m: m["wall_ms"])
+        result = {
+            "rows": self.rows, "group": group, "name": name, "runs": len(runs),
+            "best_ms": best["wall_ms"], "median_ms": statistics.median(m["wall_ms"] for m in runs),
+            "cpu_ms": best["cpu_ms"], "rows_in": best["rows_in"], "rows_out": best["rows_out"],
+            "rows_per_sec": best["rows_per_sec"],
+            "peak_rss_mb": max(m["peak_rss_mb"] for m in runs),
+            "rss_growth_mb": max(m["rss_growth_mb"] for m in runs),
+        }
+        self.results.append(result)
+        if self.verbose:
+            rate = f"{result['rows_per_sec']:>14,} rows/s" if result["rows_per_sec"] else " " * 21
+            print(f"{self.rows:>12,}  {group:<10} {name:<42} {result['best_ms']:>9,} ms {rate} "
+                  f"{result['peak_rss_mb']:>8,.0f} MB", flush=True)
+        return value
+
+
+def _promote(store, zone, name):
+    stage = promote_table(store, lambda fraction, message=None: None, zone, name)["stages"][0]
+    return stage["zone"], stage["table"], stage["rows"]
+
+
+def run_size(rows, repeat, seed, root, verbose=True):
+    """All benchmarks for one data size against a fresh store under ``root``"""
+    suite = Suite(rows, repeat, verbose)
+    store = LakeStore(root)
+    raw = make_flipkart_frame(rows, seed=seed)
+
+    # Ingestion; ``out`` keeps the last run's frame for the next step
+    out = {}
+
+    def process():
+        out["frame"] = process_flipkart_data(raw.copy())
+        return len(out["frame"])
+
+    def compact():
+        out["frame"], _ = optimize_dtypes(processed)
+        return len(out["frame"])
+
+    suite.measure("ingest", "process_flipkart_data", process, rows)
+    del raw
+    processed = out.pop("frame")
+    suite.measure("ingest", "optimize_dtypes", compact, rows)
+    del processed
+    compacted = out.pop("frame")
+    suite.measure("ingest", "write_raw", lambda: store.write("raw", "bench", compacted)["rows"], rows)
+    del compacted
+
+    # Zone promotions, each reading the table the previous one wrote
+    zone, name = "raw", "bench"
+    for to_zone in ("bronze", "silver", "gold"):
+        rows_in = store.info(zone, name)["rows"]
+        promoted = {}
+
+        def promote():
+            promoted["table"] = _promote(store, zone, name)
+            return promoted["table"][2]
+
+        suite.measure("promotion", f"{zone}_to_{to_zone}", promote, rows_in)
+        if to_zone != "gold":
+            zone, name = promoted["table"][:2]
+    silver_name = name
+
+    # Gold aggregations on the silver frame, without the store around them
+    silver = store.read("silver", silver_name)
+    silver_rows = len(silver)
+    suite.measure("gold", "aggregate_by_category", lambda: len(aggregate_by_category(silver)), len(silver))
+    suite.measure("gold", "summarize", lambda: len(summarize(silver)), len(silver))
+    del silver
+    suite.measure("gold", "aggregate_category_table",
+                  lambda: len(aggregate_category_table(store, "silver", silver_name)), silver_rows)
+
+    # Query Engine presets, executed as a query worker executes them
+    columns = [c for c, _ in store.info("silver", silver_name)["schema"]]
+    stats = pd.DataFrame(store.stats("silver", silver_name)).T
+    result_path = Path(root) / "bench_result.arrow"
+    for sql_mode in (True, False):
+        mode = "sql" if sql_mode else "pandas"
+        for label, query in query_presets("silver", silver_name, columns, sql_mode, raw_name="bench").items():
+            def execute():
+                status, kind, payload = run_query(
+                    store, result_path, mode, query, "silver", silver_name,
+                    None if sql_mode else {"stats": stats}, None,
+                )
+                if status != OK:
+                    raise RuntimeError(f"{mode} preset {label!r} failed: {payload}")
+                return payload if kind == "table" else None
+
+            suite.measure("query", f"{mode}: {label}", execute, silver_rows)
+    result_path.unlink(missing_ok=True)
+
+    # Analytics dashboard (reads the raw table, like the app)
+    raw_columns = [c for c, _ in store.info("raw", "bench")["schema"]]
+    raw_rows = store.info("raw", "bench")["rows"]
+    cat_col = find_column(raw_columns, CATEGORY_COLUMNS)
+    suite.measure("analytics", "kpis", lambda: analytics.kpis(store, "raw", "bench")["rows"], raw_rows)
+    suite.measure("analytics", "category_counts",
+                  lambda: len(analytics.category_counts(store, "raw", "bench", cat_col)), raw_rows)
+    suite.measure("analytics", "price_values", lambda: len(analytics.price_values(store, "raw", "bench")), raw_rows)
+    suite.measure("analytics", "price_values (exact)",
+                  lambda: len(analytics.price_values(store, "raw", "bench", exact=True)), raw_rows)
+    suite.measure("analytics", "price_percentiles",
+                  lambda: len(analytics.price_percentiles(store, "raw", "bench")), raw_rows)
+    suite.measure("analytics", "price_histogram",
+                  lambda: len(analytics.price_histogram(store, "raw", "bench")), raw_rows)
+    suite.measure("analytics", "price_histogram (exact)",
+                  lambda: len(analytics.price_histogram(store, "raw", "bench", exact=True)), raw_rows)
+    suite.measure("analytics", "category_summary",
+                  lambda: len(analytics.category_summary(store, "raw", "bench", cat_col)), raw_rows)
+    return suite.results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default="bench_results.json", help="JSON file to write the results to")
+    parser.add_argument("--compare", metavar="BASELINE", help="results JSON of another version to compare against")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="slowdown ratio reported as a regression with --compare (default 1.2)")
+    args = parser.parse_args()
+    # Measure with the app's pandas settings
+    pd.set_option("mode.copy_on_write", True)
+
+    report = {
+        "schema": SCHEMA_VERSION,
+        "version": _version(),
+        "created_at": datetime.datetime.now().isoformat(),
+        "environment": _environment(),
+        "config": {"rows": args.rows, "repeat": args.repeat, "seed": args.seed},
+        "results": [],
+    }
+    print(f"{'rows':>12}  {'group':<10} {'benchmark':<42} {'best':>12} {'throughput':>21} {'peak RSS':>11}")
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory(prefix="lake-bench-") as root:
+            report["results"] += run_size(rows, args.repeat, args.seed, root)
+        # Written after every size, so a run that runs out of memory keeps the smaller ones
+        Path(args.out).write_text(json.dumps(report, indent=2))
+    print(f"\nWrote {len(report['results'])} results to {args.out}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        rows = compare(baseline, report, args.threshold)
+        print_comparison(rows, baseline, report)
+        sys.exit(1 if any(row["regression"] for row in rows) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+"""
+Storage and processing layer behind the E-Commerce Data Lake app.
+"""
+
+from lake.store import ZONES, LakeStore, safe_table_name
+
+__all__ = ["ZONES", "LakeStore", "safe_table_name"]
@@ -0,0 +1,192 @@
+"""
+Partitioned Aggregation
+=======================
+Group-by aggregation (count, sum, mean, min, max, median and other
+quantiles) computed as mergeable partial states: every chunk of a table
+is reduced to per-group counts, sums, minima, maxima and quantile
+sketches (``lake.sketches.QuantileSketch``), the partials are merged, and
+the final values are derived from the merged state. Merging is exact for
+everything but quantiles, whose sketches merge without adding error, so
+the result does not depend on how the table was split.
+
+``aggregate_table`` splits a stored table into its Parquet row groups,
+reads only the columns the aggregation needs and reduces the row groups
+on a pool of worker processes (lake/worker.py), one contiguous slice per
+worker. When the table already keeps quantile sketches per category
+(lake/stats.py), those are used instead of sketching the values again.
+
+Medians and quantiles are approximate: within ``alpha`` (1%) of the true
+value, relative to that value (interpolated between the two middle values
+of an even-sized group, as pandas does). ``exact=True`` (or ``LAKE_EXACT_QUANTILES=1``
+for the gold promotions) computes them exactly, by sorting each group.
+"""
+
+import os
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from lake.sketches import DEFAULT_QUANTILE_ALPHA, QuantileSketch
+from lake.worker import OK, WorkerPool
+
+DEFAULT_WORKERS = int(os.environ.get("LAKE_AGG_WORKERS", os.cpu_count() or 1))
+# Below this many rows, starting worker interpreters costs more than it saves
+PARALLEL_MIN_ROWS = int(os.environ.get("LAKE_AGG_PARALLEL_MIN_ROWS", 2_000_000))
+QUANTILES = {"median": 0.5}
+EXACT_QUANTILES = os.environ.get("LAKE_EXACT_QUANTILES", "0") not in ("", "0")
+_STATES = ["count", "sum", "min", "max"]
+
+
+def _sketched(spec):
+    return [col for col, aggs in spec.items() if any(agg in QUANTILES for agg in aggs)]
+
+
+def partial(df, by, spec, alpha=DEFAULT_QUANTILE_ALPHA, sketch=True):
+    """Partial state of ``spec`` (``{column: [aggregate, ...]}``) over ``df`` grouped by ``by``
+    (``sketch=False``: without the quantile sketches, which the caller has already)"""
+    columns = list(spec)
+    states = df.groupby(by, observed=True)[columns].agg(_STATES)
+    states.index = states.index.astype(object)
+    sketches = {}
+    sketched = _sketched(spec) if sketch else []
+    if sketched:
+        codes, groups = pd.factorize(df[by])
+        keep = codes >= 0
+        groups = [str(g) for g in groups]
+        for col in sketched:
+            values = df[col].to_numpy(dtype=np.float64, na_value=np.nan)[keep]
+            sketches[col] = dict(zip(groups, QuantileSketch.grouped(values, codes[keep], len(groups), alpha)))
+    return {"states": states, "sketches": sketches}
+
+
+def merge(partials):
+    """Combine partial states into one"""
+    partials = list(partials)
+    states = pd.concat([p["states"] for p in partials])
+    merged = pd.concat(
+        [getattr(states.xs(state, axis=1, level=1, drop_level=False).groupby(level=0, sort=False),
+                 "sum" if state in ("count", "sum") else state)()
+         for state in _STATES],
+        axis=1,
+    )[states.columns]
+    sketches = {}
+    for p in partials:
+        for col, by_group in p["sketches"].items():
+            target = sketches.setdefault(col, {})
+            for group, sketch in by_group.items():
+                if group in target:
+                    target[group].merge(sketch)
+                else:
+                    target[group] = sketch
+    return {"states": merged, "sketches": sketches}
+
+
+def finalize(state, by, spec):
+    """DataFrame with one row per group (sorted) and a ``<column>_<aggregate>``
+    column per requested aggregate"""
+    states = state["states"]
+    groups = sorted(states.index, key=str)
+    states = states.loc[groups]
+    out = {by: pd.Series(groups, dtype=object)}
+    for col, aggs in spec.items():
+        count = states[(col, "count")].to_numpy(dtype=np.float64)
+        for agg in aggs:
+            if agg == "count":
+                values = count.astype(np.int64)
+            elif agg == "sum":
+                values = states[(col, "sum")].to_numpy(dtype=np.float64)
+            elif agg == "mean":
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    values = states[(col, "sum")].to_numpy(dtype=np.float64) / count
+            elif agg in ("min", "max"):
+                values = states[(col, agg)].to_numpy(dtype=np.float64)
+            elif agg in QUANTILES:
+                sketches = state["sketches"].get(col, {})   # none: NaN (filled in by ``_exact``)
+                values = np.array([
+                    sketches[str(g)].quantile(QUANTILES[agg]) if str(g) in sketches else np.nan for g in groups
+                ])
+                # A bucket midpoint can overshoot the group's range; clamp into it
+                values = np.clip(values, states[(col, "min")].to_numpy(float), states[(col, "max")].to_numpy(float))
+            else:
+                raise ValueError(f"Unsupported aggregate: {agg!r}")
+            out[f"{col}_{agg}"] = values
+    return pd.DataFrame(out)
+
+
+def _exact(out, df, by, spec):
+    """Replace the sketched quantiles of ``out`` with exact ones computed from ``df``"""
+    for col, aggs in spec.items():
+        for agg in aggs:
+            if agg in QUANTILES:
+                exact = df.groupby(by, observed=True)[col].quantile(QUANTILES[agg])
+                exact.index = exact.index.astype(str)
+                out[f"{col}_{agg}"] = out[by].astype(str).map(exact).to_numpy(dtype=np.float64)
+    return out
+
+
+def aggregate_frame(df, by, spec, alpha=DEFAULT_QUANTILE_ALPHA, exact=EXACT_QUANTILES):
+    """``spec`` aggregated over an in-memory frame (``exact``: sort for the quantiles)"""
+    if exact:
+        return _exact(finalize(partial(df, by, spec, alpha, sketch=False), by, spec), df, by, spec)
+    return finalize(partial(df, by, spec, alpha), by, spec)
+
+
+# ── stored tables ───────────────────────────────────────────────────────────
+def stored_sketches(store, zone, name, by, spec, alpha=DEFAULT_QUANTILE_ALPHA):
+    """``{column: {group: QuantileSketch}}`` the table keeps for the sketched
+    columns of ``spec``, or None when it does not keep them all per ``by``"""
+    sketches = {}
+    for col in _sketched(spec):
+        found = store.quantile_sketches(zone, name, col)
+        if found is None or found[2] != by or found[0].alpha != alpha:
+            return None
+        sketches[col] = found[1]
+    return sketches
+
+
+def aggregate_row_groups(store, result_path, zone, name, row_groups, by, spec,
+                         alpha=DEFAULT_QUANTILE_ALPHA, sketch=True):
+    """Worker task: the merged partial state of some row groups of ``zone/name``"""
+    columns = [by] + [col for col in spec if col != by]
+    frames = store.read_row_groups(zone, name, row_groups, columns)
+    return OK, "value", merge(partial(df, by, spec, alpha, sketch) for df in frames)
+
+
+def aggregate_table(store, zone, name, by, spec, workers=DEFAULT_WORKERS, alpha=DEFAULT_QUANTILE_ALPHA,
+                    exact=EXACT_QUANTILES):
+    """``spec`` aggregated over a stored table, row group by row group, reading
+    only the columns it needs; large tables are split across ``workers`` processes"""
+    if exact:
+        return aggregate_frame(store.read(zone, name, columns=[by] + [c for c in spec if c != by]),
+                               by, spec, alpha, exact=True)
+    stored = stored_sketches(store, zone, name, by, spec, alpha)
+    state = _aggregate_states(store, zone, name, by, spec, workers, alpha, sketch=stored is None)
+    if stored is not None:
+        state["sketches"] = stored
+    return finalize(state, by, spec)
+
+
+def _aggregate_states(store, zone, name, by, spec, workers, alpha, sketch):
+    row_groups = store.row_groups(zone, name)
+    workers = max(1, min(int(workers), len(row_groups)))
+    if workers == 1 or store.info(zone, name)["rows"] < PARALLEL_MIN_ROWS:
+        return aggregate_row_groups(store, None, zone, name, row_groups, by, spec, alpha, sketch)[2]
+    bounds = np.linspace(0, len(row_groups), workers + 1).astype(int)
+    pool = WorkerPool(store.root, workers=workers, name=f"agg-{uuid.uuid4().hex[:8]}")
+    try:
+        handles = [
+            pool.call(
+                "lake.aggregate:aggregate_row_groups", zone=zone, name=name,
+                row_groups=row_groups[lo:hi], by=by, spec=spec, alpha=alpha, sketch=sketch,
+            )
+            for lo, hi in zip(bounds[:-1], bounds[1:])
+        ]
+        for handle in handles:
+            handle.wait()
+    finally:
+        pool.close()
+    failed = [h for h in handles if h.status != OK]
+    if failed:
+        raise RuntimeError(f"Aggregating {zone}/{name} failed: {failed[0].error}")
+    return merge(h.result for h in handles)
@@ -0,0 +1,76 @@
+"""
+Analytics Computations
+======================
+The numbers behind the Analytics dashboard, computed from a stored table.
+Each function reads only the columns it needs; the app caches the results
+per table fingerprint. Percentiles and medians come from the table's
+quantile sketches (within 1% of the exact values for positive columns
+such as prices, see ``LakeStore.quantiles``) unless ``exact`` is set.
+"""
+
+from lake import charts
+
+PRICE_PERCENTILES = (0.25, 0.5, 0.75, 0.9, 0.95, 0.99)
+
+
+def kpis(store, zone, name):
+    """Row count and average rating, discount and price, out-of-stock count"""
+    manifest = store.info(zone, name)
+    columns = [c for c, _ in manifest["schema"]]
+    wanted = [c for c in ['average_rating', 'discount_pct', 'selling_price_clean', 'out_of_stock'] if c in columns]
+    df = store.read(zone, name, columns=wanted)
+    out = {"rows": manifest["rows"]}
+    if 'average_rating' in df.columns:
+        out["avg_rating"] = float(df['average_rating'].mean())
+    if 'discount_pct' in df.columns:
+        out["avg_discount"] = float(df['discount_pct'].mean())
+    if 'selling_price_clean' in df.columns:
+        out["avg_price"] = float(df['selling_price_clean'].mean())
+        out["rupees"] = 'actual_price' in columns and '₹' in str(store.head(zone, name, 1)['actual_price'].iloc[0])
+    if 'out_of_stock' in df.columns:
+        out["out_of_stock"] = int(df['out_of_stock'].sum())
+    return out
+
+
+def category_counts(store, zone, name, cat_col):
+    """Ten most frequent categories with their row counts"""
+    counts = store.read(zone, name, columns=[cat_col])[cat_col].value_counts().head(10).reset_index()
+    counts.columns = [cat_col, 'count']
+    return counts
+
+
+def price_percentiles(store, zone, name, qs=PRICE_PERCENTILES, exact=False):
+    """Selling price at each quantile of ``qs`` (0..1), as a Series indexed by ``qs``"""
+    return store.quantiles(zone, name, 'selling_price_clean', qs, exact=exact)
+
+
+def price_values(store, zone, name, exact=False):
+    """Selling prices below the 95th percentile, for the price histogram"""
+    cutoff = float(price_percentiles(store, zone, name, [0.95], exact).iloc[0])
+    prices = store.read(zone, name, columns=['selling_price_clean'],
+                        filters=[('selling_price_clean', '<', cutoff)])['selling_price_clean']
+    return prices.reset_index(drop=True)
+
+
+def price_histogram(store, zone, name, bins=charts.HISTOGRAM_BINS, exact=False):
+    """``start, end, count`` per bin of the selling prices below the 95th
+    percentile; binned from the table's price sketch without reading it,
+    unless ``exact`` (or the table has no sketch)"""
+    found = None if exact else store.quantile_sketches(zone, name, 'selling_price_clean')
+    if found is None:
+        return charts.histogram_bins(price_values(store, zone, name, exact=True), bins)
+    sketch = found[0]
+    return charts.sketch_bins(sketch, bins, tuple(sketch.quantiles([0, 0.95])))
+
+
+def category_summary(store, zone, name, cat_col, exact=False):
+    """Product count and price statistics of the 20 largest categories"""
+    df = store.read(zone, name, columns=[cat_col, 'selling_price_clean'])
+    summary = df.groupby(cat_col, observed=True).agg({
+        cat_col: 'count',
+        'selling_price_clean': ['mean', 'min', 'max'],
+    })
+    summary.columns = ['product_count', 'avg_price', 'min_price', 'max_price']
+    medians = store.quantiles(zone, name, 'selling_price_clean', [0.5], by=cat_col, exact=exact)[0.5]
+    summary.insert(2, 'median_price', summary.index.astype(str).map(medians).to_numpy(dtype=float))
+    return summary.round(2).reset_index().sort_values('product_count', ascending=False).head(20)
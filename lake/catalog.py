@@ -0,0 +1,241 @@
+"""
+Data Catalog
+============
+The metadata registry of the lake's tables, persisted in one SQLite file in
+the lake root and shared by every session. One entry per ``(zone, table)``:
+writing a table again replaces its entry.
+
+Entries are indexed by zone, source, owner, tag, column name and content
+checksums (of the data, and of the uploaded file it came from), and a
+full-text index (FTS5, trigram tokenizer) over the name, zone, source,
+owner, tags and columns answers substring searches without scanning the
+catalog. Searches are paginated, so a page costs the same with ten tables
+or tens of thousands.
+"""
+
+import datetime
+import json
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+
+CATALOG_DB = "_catalog.sqlite"
+PAGE_SIZE = 30
+# FTS5 trigram matching needs at least this many characters; shorter terms scan
+_MIN_MATCH_CHARS = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tables (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    zone TEXT NOT NULL,
+    name TEXT NOT NULL,
+    source TEXT,
+    owner TEXT,
+    row_count INTEGER,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    entry TEXT NOT NULL,
+    UNIQUE (zone, name)
+);
+CREATE INDEX IF NOT EXISTS tables_zone ON tables(zone, updated_at);
+CREATE INDEX IF NOT EXISTS tables_updated ON tables(updated_at);
+CREATE INDEX IF NOT EXISTS tables_source ON tables(source);
+CREATE INDEX IF NOT EXISTS tables_owner ON tables(owner);
+CREATE TABLE IF NOT EXISTS table_tags (
+    tag TEXT NOT NULL,
+    table_id INTEGER NOT NULL,
+    PRIMARY KEY (tag, table_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS table_tags_table ON table_tags(table_id);
+CREATE TABLE IF NOT EXISTS table_columns (
+    column_name TEXT NOT NULL,
+    table_id INTEGER NOT NULL,
+    dtype TEXT,
+    PRIMARY KEY (column_name, table_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS table_columns_table ON table_columns(table_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS tables_fts USING fts5(doc, tokenize = 'trigram');
+"""
+
+# Catalogs created before entries' checksums were indexed get the columns
+# added and filled from the entries
+_CHECKSUMS = """
+ALTER TABLE tables ADD COLUMN checksum TEXT;
+ALTER TABLE tables ADD COLUMN source_checksum TEXT;
+UPDATE tables SET checksum = json_extract(entry, '$.checksum'),
+                  source_checksum = json_extract(entry, '$.source_checksum');
+"""
+_CHECKSUM_INDEXES = """
+CREATE INDEX IF NOT EXISTS tables_checksum ON tables(zone, checksum);
+CREATE INDEX IF NOT EXISTS tables_source_checksum ON tables(zone, source_checksum);
+"""
+_CHECKSUM_FIELDS = ("checksum", "source_checksum")
+
+
+def _now():
+    return datetime.datetime.now().isoformat()
+
+
+def _document(entry):
+    """The text the full-text index holds for an entry"""
+    return " ".join([
+        entry["table_name"], entry["zone"], entry.get("source") or "", entry.get("owner") or "",
+        *entry.get("tags", []), *(col for col, _ in entry.get("schema", [])),
+    ])
+
+
+class Catalog:
+    """Catalog entries (dicts as made by the app's ``make_catalog_entry``) in SQLite"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with closing(self._connect()) as con:
+            con.executescript(_SCHEMA)
+            if "checksum" not in {row["name"] for row in con.execute("PRAGMA table_info(tables)")}:
+                con.executescript(_CHECKSUMS)
+            con.executescript(_CHECKSUM_INDEXES)
+
+    def _connect(self):
+        con = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        con.row_factory = sqlite3.Row
+        con.execute("PRAGMA journal_mode=WAL")
+        return con
+
+    def put(self, entry):
+        """Add the entry of a table, or replace the one it already has"""
+        con = self._connect()
+        try:
+            con.execute("BEGIN IMMEDIATE")
+            row = con.execute(
+                "SELECT id, created_at FROM tables WHERE zone = ? AND name = ?", (entry["zone"], entry["table_name"]),
+            ).fetchone()
+            created = row["created_at"] if row else entry.get("created_at") or _now()
+            entry = {**entry, "created_at": created}
+            values = (
+                entry["zone"], entry["table_name"], entry.get("source"), entry.get("owner"),
+                entry.get("row_count"), created, _now(), entry.get("checksum"), entry.get("source_checksum"),
+                json.dumps(entry, default=str),
+            )
+            if row:
+                table_id = row["id"]
+                con.execute(
+                    "UPDATE tables SET zone = ?, name = ?, source = ?, owner = ?, row_count = ?, created_at = ?, "
+                    "updated_at = ?, checksum = ?, source_checksum = ?, entry = ? WHERE id = ?", values + (table_id,),
+                )
+                for table in ("table_tags", "table_columns"):
+                    con.execute(f"DELETE FROM {table} WHERE table_id = ?", (table_id,))
+                con.execute("DELETE FROM tables_fts WHERE rowid = ?", (table_id,))
+            else:
+                table_id = con.execute(
+                    "INSERT INTO tables (zone, name, source, owner, row_count, created_at, updated_at, checksum, "
+                    "source_checksum, entry) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", values,
+                ).lastrowid
+            con.executemany(
+                "INSERT OR IGNORE INTO table_tags (tag, table_id) VALUES (?, ?)",
+                [(tag.lower(), table_id) for tag in entry.get("tags", [])],
+            )
+            con.executemany(
+                "INSERT OR IGNORE INTO table_columns (column_name, table_id, dtype) VALUES (?, ?, ?)",
+                [(col, table_id, dtype) for col, dtype in entry.get("schema", [])],
+            )
+            con.execute("INSERT INTO tables_fts (rowid, doc) VALUES (?, ?)", (table_id, _document(entry)))
+            con.execute("COMMIT")
+            return table_id
+        except BaseException:
+            con.execute("ROLLBACK")
+            raise
+        finally:
+            con.close()
+
+    def remove(self, zone, name):
+        with closing(self._connect()) as con:
+            row = con.execute("SELECT id FROM tables WHERE zone = ? AND name = ?", (zone, name)).fetchone()
+            if row is None:
+                return False
+            con.execute("BEGIN")
+            for table in ("table_tags", "table_columns"):
+                con.execute(f"DELETE FROM {table} WHERE table_id = ?", (row["id"],))
+            con.execute("DELETE FROM tables_fts WHERE rowid = ?", (row["id"],))
+            con.execute("DELETE FROM tables WHERE id = ?", (row["id"],))
+            con.execute("COMMIT")
+            return True
+
+    def get(self, zone, name):
+        with closing(self._connect()) as con:
+            row = con.execute("SELECT entry FROM tables WHERE zone = ? AND name = ?", (zone, name)).fetchone()
+        return json.loads(row["entry"]) if row else None
+
+    def missing(self, tables, key=None):
+        """The ``(zone, name)`` pairs of ``tables`` that have no entry (with
+        ``key``: no entry, or one without that key)"""
+        sql, args = "SELECT zone, name FROM tables", []
+        if key is not None:
+            sql += " WHERE json_type(entry, ?) IS NOT NULL"
+            args.append(f"$.{key}")
+        with closing(self._connect()) as con:
+            known = {tuple(row) for row in con.execute(sql, args).fetchall()}
+        return [table for table in tables if tuple(table) not in known]
+
+    def find(self, zone, **checksums):
+        """Name of the oldest ``zone`` table whose entry has all the given
+        ``checksum``/``source_checksum`` values, else None"""
+        unknown = set(checksums) - set(_CHECKSUM_FIELDS)
+        if not checksums or unknown:
+            raise ValueError(f"Tables are looked up by {' and/or '.join(_CHECKSUM_FIELDS)}, not {sorted(unknown)}")
+        where = " AND ".join(f"{field} = ?" for field in checksums)
+        with closing(self._connect()) as con:
+            row = con.execute(
+                f"SELECT name FROM tables WHERE zone = ? AND {where} ORDER BY created_at, id LIMIT 1",
+                [zone, *checksums.values()],
+            ).fetchone()
+        return row["name"] if row else None
+
+    def count(self):
+        with closing(self._connect()) as con:
+            return con.execute("SELECT COUNT(*) FROM tables").fetchone()[0]
+
+    def search(self, text="", zone=None, source=None, owner=None, tag=None, column=None, page=0, page_size=PAGE_SIZE):
+        """``(entries, total)``: one page of the entries matching every given
+        filter, newest first. ``text`` matches entries containing each of its
+        words anywhere in their name, zone, source, owner, tags or columns."""
+        where, args = [], []
+        for term in text.split():
+            if len(term) >= _MIN_MATCH_CHARS:
+                where.append("id IN (SELECT rowid FROM tables_fts WHERE tables_fts MATCH ?)")
+                args.append('"{}"'.format(term.replace('"', '""')))
+            else:
+                where.append("id IN (SELECT rowid FROM tables_fts WHERE doc LIKE ? ESCAPE '\\')")
+                args.append("%{}%".format(term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")))
+        for col, value in (("zone", zone), ("source", source), ("owner", owner)):
+            if value:
+                where.append(f"{col} = ?")
+                args.append(value)
+        if tag:
+            where.append("id IN (SELECT table_id FROM table_tags WHERE tag = ?)")
+            args.append(tag.lower())
+        if column:
+            where.append("id IN (SELECT table_id FROM table_columns WHERE column_name = ?)")
+            args.append(column)
+        clause = f" WHERE {' AND '.join(where)}" if where else ""
+        with closing(self._connect()) as con:
+            total = con.execute(f"SELECT COUNT(*) FROM tables{clause}", args).fetchone()[0]
+            rows = con.execute(
+                f"SELECT entry FROM tables{clause} ORDER BY updated_at DESC, id DESC LIMIT ? OFFSET ?",
+                args + [page_size, page * page_size],
+            ).fetchall()
+        return [json.loads(row["entry"]) for row in rows], total
+
+    def facets(self, limit=100):
+        """Values to filter by: ``{"zone": [...], "owner": [...], "tag": [...], "column": [...]}``;
+        tags and columns are the ``limit`` most common ones"""
+        with closing(self._connect()) as con:
+            def common(table, col):
+                return [r[0] for r in con.execute(
+                    f"SELECT {col} FROM {table} GROUP BY {col} ORDER BY COUNT(*) DESC, {col} LIMIT ?", (limit,),
+                )]
+            return {
+                "zone": [r[0] for r in con.execute("SELECT DISTINCT zone FROM tables ORDER BY 1")],
+                "owner": [r[0] for r in con.execute("SELECT DISTINCT owner FROM tables WHERE owner IS NOT NULL ORDER BY 1")],
+                "tag": common("table_tags", "tag"),
+                "column": common("table_columns", "column_name"),
+            }
@@ -0,0 +1,98 @@
+"""
+Chart Payloads
+==============
+Keeps what the app sends to the browser for a chart independent of the
+table size: histograms are binned on the server (from the values with
+NumPy, or from a quantile sketch without reading the table at all), and
+``limit_figure`` caps every trace of a Plotly figure at ``MAX_POINTS``
+points before it is rendered.
+"""
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+HISTOGRAM_BINS = 50
+MAX_POINTS = 2000   # per trace
+# Per-point trace and marker attributes that are downsampled along with x
+# and y (when they hold one value per point rather than a single value)
+_POINT_ATTRS = ("x", "y", "customdata", "text", "hovertext", "base", "width")
+_MARKER_ATTRS = ("color", "size", "opacity", "symbol")
+
+
+def histogram_bins(values, bins=HISTOGRAM_BINS, range=None):
+    """``start, end, count`` per bin of the finite ``values``"""
+    values = np.asarray(values, dtype=np.float64)
+    values = values[np.isfinite(values)]
+    counts, edges = np.histogram(values, bins=bins, range=range)
+    return pd.DataFrame({"start": edges[:-1], "end": edges[1:], "count": counts})
+
+
+def sketch_bins(sketch, bins=HISTOGRAM_BINS, range=None):
+    """``histogram_bins`` from a ``QuantileSketch``; ``range`` defaults to its
+    min to max. Counts are approximate: a value can land in a neighbouring
+    bin when a bin edge falls inside its sketch bucket (1% wide)."""
+    lo, hi = range if range is not None else sketch.quantiles([0, 1])
+    edges = np.linspace(lo, hi, bins + 1)
+    counts = np.diff(sketch.cdf(edges)).round().astype(np.int64)
+    return pd.DataFrame({"start": edges[:-1], "end": edges[1:], "count": counts})
+
+
+def downsample_indices(y, max_points=MAX_POINTS):
+    """Positions of the points to keep from a series of ``len(y)`` points: the
+    first, the last, and the lowest and highest of every one of
+    ``max_points / 2`` equal slices, so peaks and dips survive"""
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+    values = pd.Series(pd.to_numeric(pd.Series(y), errors="coerce").to_numpy(dtype=np.float64))
+    slices = values.groupby(np.arange(n) * (max_points // 2) // n)
+    keep = np.concatenate([[0, n - 1], slices.idxmin().dropna(), slices.idxmax().dropna()]).astype(np.int64)
+    return np.unique(keep)
+
+
+def _binned(trace, bins):
+    """A histogram trace over raw values as a bar trace over its bins"""
+    binned = histogram_bins(trace.x, trace.nbinsx or bins)
+    return go.Bar(
+        x=(binned["start"] + binned["end"]) / 2, y=binned["count"], width=binned["end"] - binned["start"],
+        name=trace.name, marker=trace.marker.to_plotly_json(), showlegend=trace.showlegend, legendgroup=trace.legendgroup,
+        xaxis=trace.xaxis, yaxis=trace.yaxis,
+    )
+
+
+def _sliced(obj, attrs, keep, size):
+    """The ``keep`` positions of those of ``attrs`` of ``obj`` that hold ``size`` values"""
+    return {
+        attr: np.asarray(obj[attr])[keep] for attr in attrs
+        if attr in obj and obj[attr] is not None and not isinstance(obj[attr], str)
+        and np.ndim(obj[attr]) == 1 and len(obj[attr]) == size
+    }
+
+
+def limit_figure(fig, max_points=MAX_POINTS, bins=HISTOGRAM_BINS):
+    """``fig`` with no trace above ``max_points`` points: raw-value histograms
+    are binned, line/scatter traces downsampled (``downsample_indices``) and
+    bar traces cut to their first ``max_points`` bars"""
+    traces, changed = [], False
+    for trace in fig.data:
+        size = len(trace.x) if getattr(trace, "x", None) is not None else 0
+        if size <= max_points:
+            traces.append(trace)
+            continue
+        changed = True
+        if trace.type == "histogram" and trace.y is None:
+            traces.append(_binned(trace, bins))
+            continue
+        if trace.type in ("scatter", "scattergl") and trace.y is not None:
+            keep = downsample_indices(trace.y, max_points)
+        elif trace.type == "bar":
+            keep = np.arange(max_points)
+        else:
+            traces.append(trace)
+            continue
+        trace.update(_sliced(trace, _POINT_ATTRS, keep, size))
+        if "marker" in trace:
+            trace.marker.update(_sliced(trace.marker, _MARKER_ATTRS, keep, size))
+        traces.append(trace)
+    return go.Figure(data=traces, layout=fig.layout) if changed else fig
@@ -0,0 +1,255 @@
+"""
+Pipeline DAG Scheduler
+======================
+Runs a pipeline declared as a DAG of stages (``PIPELINE_STAGES`` in
+lake/transforms.py) over one or more raw tables. Every (table, stage) pair
+is a task that becomes ready once the stages it depends on have written
+their tables; ready tasks run in parallel on a pool of worker processes
+(lake/worker.py), so independent datasets and independent branches of the
+same dataset use separate CPU cores.
+
+A stage reads the table written by its first dependency (the raw table for
+a stage without dependencies) and writes one table of its own, which is
+how stages exchange data across processes. A failed stage skips the
+stages downstream of it; other branches and datasets carry on.
+
+Every run returns a schedule report: when each task ran and on which
+worker, the critical path (the longest chain of dependent tasks, which
+bounds the run time however many workers there are) and how busy the
+workers were in total and per stage.
+"""
+
+import datetime
+import os
+import time
+import uuid
+
+from lake.metrics import Meter
+from lake.transforms import PIPELINE_STAGES, TABLE_TRANSFORMS
+from lake.worker import OK, WorkerPool
+
+DEFAULT_WORKERS = int(os.environ.get("LAKE_DAG_WORKERS", os.cpu_count() or 1))
+_POLL_S = 0.02
+
+
+class Pipeline:
+    """A validated DAG of ``(name, label, zone, transform, after)`` stages"""
+
+    def __init__(self, stages=PIPELINE_STAGES):
+        self.stages = {}
+        for name, label, zone, transform, after in stages:
+            if name in self.stages:
+                raise ValueError(f"Duplicate stage {name!r}")
+            self.stages[name] = {"label": label, "zone": zone, "transform": transform, "after": tuple(after)}
+        for name, stage in self.stages.items():
+            for dep in stage["after"]:
+                if dep not in self.stages:
+                    raise ValueError(f"Stage {name!r} depends on unknown stage {dep!r}")
+        self.order = self._topological_order()
+        self.dependents = {name: [s for s in self.order if name in self.stages[s]["after"]] for name in self.order}
+        # Stages on the longest chain below each stage go first when several are ready
+        self.height = {}
+        for name in reversed(self.order):
+            self.height[name] = 1 + max((self.height[d] for d in self.dependents[name]), default=0)
+
+    def _topological_order(self):
+        order, state = [], {}
+
+        def visit(name, path):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"Pipeline has a cycle: {' → '.join(path + [name])}")
+            state[name] = "visiting"
+            for dep in self.stages[name]["after"]:
+                visit(dep, path + [name])
+            state[name] = "done"
+            order.append(name)
+
+        for name in self.stages:
+            visit(name, [])
+        return order
+
+    def table_name(self, stage, source, ts):
+        """Table ``stage`` writes for raw table ``source`` (``silver_products_143015``,
+        ``gold_products_category_143015`` for a stage not named after its zone)"""
+        zone = self.stages[stage]["zone"]
+        suffix = "" if stage == zone else "_" + stage.removeprefix(f"{zone}_")
+        return f"{zone}_{source}{suffix}_{ts}"
+
+
+def unpromoted_raw_tables(store):
+    """Raw tables that no bronze table has been built from yet, oldest first"""
+    promoted = set()
+    for name in store.list_tables("bronze"):
+        manifest = store.info("bronze", name)
+        promoted.add(manifest.get("source"))
+        promoted.update(manifest.get("incremental", {}).get("sources", []))   # merged by incremental runs
+    return [name for name in store.list_tables("raw") if f"raw/{name}" not in promoted]
+
+
+# ── worker side ──────────────────────────────────────────────────────────────
+def run_stage(store, result_path, transform, source_zone, source_name, zone, dest):
+    """Apply one stage's ``transform`` to ``source_zone/source_name`` and write ``zone/dest``"""
+    started = time.time()
+    with Meter() as meter:
+        if transform in TABLE_TRANSFORMS:
+            meter.rows_in = store.info(source_zone, source_name)["rows"]
+            # One worker per stage already: aggregate in this process
+            out = TABLE_TRANSFORMS[transform](store, source_zone, source_name, workers=1)
+        else:
+            df = store.read(source_zone, source_name)
+            meter.rows_in = len(df)
+            out = transform(df)
+        meter.rows_out = len(out)
+        store.write(zone, dest, out, source=f"{source_zone}/{source_name}")
+    return OK, "value", {
+        "started": started, "finished": time.time(), "worker": os.getpid(), "metrics": meter.metrics(),
+    }
+
+
+# ── scheduler ────────────────────────────────────────────────────────────────
+class DagScheduler:
+    """Runs a ``Pipeline`` over raw tables on a pool of worker processes"""
+
+    def __init__(self, store, pipeline=None, workers=DEFAULT_WORKERS):
+        self.store = store
+        self.pipeline = pipeline or Pipeline()
+        self.workers = max(int(workers), 1)
+
+    def run(self, sources, report=None):
+        """Run every stage for every raw table in ``sources``; returns the stage
+        records and the schedule report"""
+        pipeline = self.pipeline
+        report = report or (lambda fraction, message=None: None)
+        ts = datetime.datetime.now().strftime("%H%M%S")
+        tasks = {(source, stage): pipeline.table_name(stage, source, ts) for source in sources for stage in pipeline.order}
+        if not tasks:
+            return {"stages": [], "schedule": None}
+        waiting = {key: len(pipeline.stages[key[1]]["after"]) for key in tasks}
+        ready = [key for key, n in waiting.items() if n == 0]
+        running, records = {}, {}
+        # No point starting more interpreters than tasks can ever run side by side
+        pool = WorkerPool(self.store.root, workers=min(self.workers, len(tasks)), name=f"dag-{uuid.uuid4().hex[:8]}")
+        started = time.time()
+        try:
+            while ready or running:
+                ready.sort(key=lambda key: -pipeline.height[key[1]])
+                for key in ready:
+                    running[key] = self._submit(pool, key, tasks)
+                ready = []
+                finished = [key for key, handle in running.items() if handle.done]
+                if not finished:
+                    time.sleep(_POLL_S)
+                    continue
+                for key in finished:
+                    records[key] = self._record(key, tasks, running.pop(key), started)
+                    if records[key]["status"] == "succeeded":
+                        for dependent in pipeline.dependents[key[1]]:
+                            waiting[(key[0], dependent)] -= 1
+                            if waiting[(key[0], dependent)] == 0:
+                                ready.append((key[0], dependent))
+                    else:
+                        self._skip_downstream(key, tasks, records)
+                report(len(records) / len(tasks), f"{len(records)}/{len(tasks)} stages · {len(running)} running")
+        finally:
+            pool.close()
+        # Time the schedule from the first task, not from the worker interpreters starting up
+        startup_ms = min(r["start_ms"] for r in records.values())
+        for record in records.values():
+            record["start_ms"] -= startup_ms
+        makespan_ms = max(r["start_ms"] + r["duration_ms"] for r in records.values())
+        stages = [records[key] for key in sorted(records, key=lambda k: (records[k]["start_ms"], k))]
+        schedule = self._schedule(records, makespan_ms, pool.workers)
+        schedule["startup_ms"] = startup_ms
+        return {"stages": stages, "schedule": schedule}
+
+    def _submit(self, pool, key, tasks):
+        source, stage = key
+        spec = self.pipeline.stages[stage]
+        after = spec["after"]
+        input_zone, input_name = (
+            (self.pipeline.stages[after[0]]["zone"], tasks[(source, after[0])]) if after else ("raw", source)
+        )
+        return pool.call(
+            "lake.dag:run_stage", transform=spec["transform"],
+            source_zone=input_zone, source_name=input_name, zone=spec["zone"], dest=tasks[key],
+        )
+
+    def _record(self, key, tasks, handle, started):
+        source, stage = key
+        spec = self.pipeline.stages[stage]
+        after = spec["after"]
+        record = {
+            "stage": spec["label"], "step": stage, "dataset": source, "zone": spec["zone"], "table": tasks[key],
+            "source": f"{self.pipeline.stages[after[0]]['zone']}/{tasks[(source, after[0])]}" if after else f"raw/{source}",
+        }
+        if handle.status == OK:
+            result = handle.result
+            record.update(
+                status="succeeded", rows=result["metrics"]["rows_out"], worker=result["worker"],
+                start_ms=int((result["started"] - started) * 1000),
+                duration_ms=int((result["finished"] - result["started"]) * 1000),
+                cpu_ms=result["metrics"]["cpu_ms"], metrics=result["metrics"],
+            )
+        else:
+            record.update(
+                status="failed", error=handle.error, rows=0, worker=None,
+                start_ms=int(((handle.started or started) - started) * 1000), duration_ms=handle.elapsed_ms, cpu_ms=0,
+            )
+        return record
+
+    def _skip_downstream(self, key, tasks, records):
+        source, stage = key
+        for dependent in self.pipeline.dependents[stage]:
+            dep_key = (source, dependent)
+            if dep_key in records:
+                continue
+            spec = self.pipeline.stages[dependent]
+            records[dep_key] = {
+                "stage": spec["label"], "step": dependent, "dataset": source, "zone": spec["zone"],
+                "table": tasks[dep_key], "source": f"{self.pipeline.stages[stage]['zone']}/{tasks[key]}",
+                "status": "skipped", "error": f"Upstream stage {stage!r} failed", "rows": 0, "worker": None,
+                "start_ms": records[key]["start_ms"] + records[key]["duration_ms"], "duration_ms": 0, "cpu_ms": 0,
+            }
+            self._skip_downstream(dep_key, tasks, records)
+
+    def _schedule(self, records, makespan_ms, workers):
+        """Critical path and worker utilization of a finished run"""
+        pipeline = self.pipeline
+        # Longest chain of dependent tasks by measured duration
+        chain = {}
+        for source in sorted({key[0] for key in records}):
+            for stage in pipeline.order:
+                key = (source, stage)
+                before = max(
+                    (chain[(source, dep)] for dep in pipeline.stages[stage]["after"]),
+                    key=lambda c: c[0], default=(0, []),
+                )
+                chain[key] = (before[0] + records[key]["duration_ms"], before[1] + [key])
+        length_ms, path = max(chain.values(), key=lambda c: c[0])
+        makespan_ms = max(makespan_ms, 1)
+        capacity_ms = makespan_ms * workers
+        per_stage = []
+        for stage in pipeline.order:
+            runs = [r for r in records.values() if r["step"] == stage and r["status"] == "succeeded"]
+            busy_ms = sum(r["duration_ms"] for r in runs)
+            per_stage.append({
+                "stage": pipeline.stages[stage]["label"], "runs": len(runs), "busy_ms": busy_ms,
+                "avg_ms": int(busy_ms / len(runs)) if runs else 0,
+                "cpu_ms": sum(r["cpu_ms"] for r in runs), "utilization": busy_ms / capacity_ms,
+            })
+        busy_ms = sum(r["duration_ms"] for r in records.values())
+        return {
+            "workers": workers,
+            "makespan_ms": makespan_ms,
+            "busy_ms": busy_ms,
+            "utilization": busy_ms / capacity_ms,
+            "speedup": busy_ms / makespan_ms,
+            "critical_path": [
+                {"dataset": s, "stage": pipeline.stages[t]["label"], "duration_ms": records[(s, t)]["duration_ms"]}
+                for s, t in path
+            ],
+            "critical_path_ms": length_ms,
+            "stages": per_stage,
+        }
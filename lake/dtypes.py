@@ -0,0 +1,113 @@
+"""
+Dtype Compaction
+================
+Shrinks freshly ingested frames: low-cardinality strings become
+categoricals, object columns holding only booleans become nullable
+``boolean``, integers are downcast, and floats are downcast to float32
+only where that is lossless.
+"""
+
+import numpy as np
+import pandas as pd
+
+MAX_UNIQUE_RATIO = 0.5   # strings with fewer distinct values than this share of rows
+_BOOL_VALUES = {True, False}
+
+
+def _is_stringy(s):
+    return s.dtype == object or pd.api.types.is_string_dtype(s.dtype)
+
+
+def _is_boolean_object(s):
+    if s.dtype != object:
+        return False
+    values = s.dropna()
+    return len(values) > 0 and all(type(v) in (bool, np.bool_) for v in values.unique())
+
+
+def plan_dtypes(df, downcast=True, max_unique_ratio=MAX_UNIQUE_RATIO):
+    """Pick a target dtype for every column that can be stored more compactly.
+
+    With ``downcast=False`` only categoricals and booleans are planned, which
+    stay valid for later chunks of the same stream.
+    """
+    plan = {}
+    rows = max(len(df), 1)
+    for col in df.columns:
+        s = df[col]
+        if _is_boolean_object(s):
+            plan[col] = "boolean"
+        elif isinstance(s.dtype, pd.CategoricalDtype):
+            continue
+        elif _is_stringy(s):
+            if s.nunique(dropna=True) <= max_unique_ratio * rows:
+                plan[col] = "category"
+        elif not downcast:
+            continue
+        elif pd.api.types.is_bool_dtype(s.dtype):
+            continue
+        elif pd.api.types.is_integer_dtype(s.dtype):
+            target = pd.to_numeric(s, downcast="integer").dtype
+            if target != s.dtype:
+                plan[col] = str(target)
+        elif pd.api.types.is_float_dtype(s.dtype) and s.dtype != np.float32:
+            as32 = s.to_numpy(dtype=np.float32)
+            if np.array_equal(as32.astype(np.float64), s.to_numpy(dtype=np.float64), equal_nan=True):
+                plan[col] = "float32"
+    return plan
+
+
+def plan_misfits(df, plan, max_unique_ratio=MAX_UNIQUE_RATIO):
+    """Planned columns whose values in ``df`` the planned dtype does not fit,
+    e.g. a later chunk of a stream with text in a column planned as boolean"""
+    misfits = []
+    rows = max(len(df), 1)
+    for col, dtype in plan.items():
+        if col not in df.columns:
+            continue
+        s = df[col]
+        if dtype == "boolean":
+            fits = pd.api.types.is_bool_dtype(s.dtype) or s.isna().all() or _is_boolean_object(s)
+        elif dtype == "category":
+            fits = isinstance(s.dtype, pd.CategoricalDtype) or (
+                _is_stringy(s) and s.nunique(dropna=True) <= max_unique_ratio * rows)
+        else:
+            continue
+        if not fits:
+            misfits.append(col)
+    return misfits
+
+
+def apply_dtypes(df, plan):
+    """Cast the planned columns; columns a chunk does not have are skipped"""
+    casts = {col: dtype for col, dtype in plan.items() if col in df.columns}
+    return df.astype(casts) if casts else df
+
+
+def memory_mb(df):
+    return df.memory_usage(deep=True).sum() / 1024 / 1024
+
+
+def estimate_memory_bytes(df, sample_rows=20_000):
+    """In-memory size of ``df``; object columns are measured on an even sample"""
+    if len(df) <= sample_rows:
+        return int(df.memory_usage(deep=True, index=False).sum())
+    total = int(df.memory_usage(deep=False, index=False).sum())
+    objects = df.columns[df.dtypes == object]
+    if len(objects):
+        sample = df[objects].iloc[np.linspace(0, len(df) - 1, sample_rows).astype(np.int64)]
+        extra = sample.memory_usage(deep=True, index=False).sum() - sample.memory_usage(deep=False, index=False).sum()
+        total += int(extra * len(df) / sample_rows)
+    return total
+
+
+def optimize_dtypes(df, downcast=True):
+    """Return ``(compacted_df, report)`` with before/after memory in MB"""
+    before = memory_mb(df)
+    plan = plan_dtypes(df, downcast=downcast)
+    out = apply_dtypes(df, plan)
+    return out, {
+        "memory_before_mb": round(float(before), 3),
+        "memory_after_mb": round(float(memory_mb(out)), 3),
+        "converted": {col: f"{df[col].dtype}→{dtype}" for col, dtype in plan.items()},
+    }
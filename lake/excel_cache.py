@@ -0,0 +1,97 @@
+"""
+Excel Conversion Cache
+======================
+Parsing .xlsx through openpyxl is slow, so every workbook is converted
+once to a Parquet file keyed by the SHA-256 of its bytes. Re-uploads of
+identical content are served from that file. The cache is bounded in
+size and evicts least-recently-used entries first.
+"""
+
+import io
+import os
+import threading
+import uuid
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from lake.fingerprint import content_hash
+from lake.store import to_arrow
+
+DEFAULT_MAX_MB = int(os.environ.get("LAKE_EXCEL_CACHE_MB", 512))
+
+
+class ExcelCache:
+    """Size-bounded, content-addressed Excel → Parquet cache"""
+
+    def __init__(self, root, max_bytes=DEFAULT_MAX_MB * 1024 * 1024):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return self.root / f"{key}.parquet"
+
+    def read(self, data, key=None):
+        """Return ``(df, hit)`` for the workbook bytes ``data`` (``key`` = its precomputed hash).
+
+        ``df`` is the workbook as the cache stores it (mixed-type columns as
+        strings), on a miss as on a hit; a corrupt entry is converted again.
+        """
+        path = self._path(key or content_hash(data))
+        if path.exists():
+            try:
+                df = pq.read_table(path).to_pandas()
+            except (OSError, pa.ArrowInvalid):
+                path.unlink(missing_ok=True)
+            else:
+                os.utime(path)  # mark as recently used
+                with self._lock:
+                    self.hits += 1
+                return df, True
+
+        table = to_arrow(pd.read_excel(io.BytesIO(data)))
+        tmp = path.with_name(f".{uuid.uuid4().hex}.tmp")
+        pq.write_table(table, tmp)
+        os.replace(tmp, path)
+        df = table.to_pandas()
+        with self._lock:
+            self.misses += 1
+            self._evict()
+        return df, False
+
+    def _entries(self):
+        return sorted(
+            ((p, p.stat()) for p in self.root.glob("*.parquet")),
+            key=lambda item: item[1].st_mtime,
+        )
+
+    def _evict(self):
+        entries = self._entries()
+        total = sum(stat.st_size for _, stat in entries)
+        # Always keep the newest entry, even if it alone exceeds the budget
+        for path, stat in entries[:-1]:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= stat.st_size
+            self.evictions += 1
+
+    def stats(self):
+        entries = self._entries()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(entries),
+            "size_mb": sum(stat.st_size for _, stat in entries) / 1024 / 1024,
+            "max_mb": self.max_bytes / 1024 / 1024,
+        }
@@ -0,0 +1,80 @@
+"""
+Content Fingerprints
+====================
+Checksums over actual data: SHA-256 of uploaded file bytes, and a stable
+row/column fingerprint for DataFrames that can be built chunk by chunk.
+"""
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+_BLOCK = 8 * 1024 * 1024
+
+
+def content_hash(data):
+    """SHA-256 of a bytes object"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_checksum(fh):
+    """SHA-256 of a file-like object, read in blocks; rewinds it afterwards"""
+    h = hashlib.sha256()
+    fh.seek(0)
+    for block in iter(lambda: fh.read(_BLOCK), b""):
+        h.update(block)
+    fh.seek(0)
+    return h.hexdigest()
+
+
+def column_hashes(df):
+    """64-bit hash of every cell, per column.
+
+    Computed once per chunk and shared by the table fingerprint and the
+    distinct-count sketches.
+    """
+    hashes = {}
+    for col in df.columns:
+        try:
+            hashes[col] = pd.util.hash_pandas_object(df[col], index=False).to_numpy()
+        except TypeError:
+            # Unhashable cells (lists, dicts) — fall back to their string form
+            hashes[col] = pd.util.hash_pandas_object(df[col].astype(str), index=False).to_numpy()
+    return hashes
+
+
+def _row_hashes(df, hashes):
+    # Order-sensitive combination of the column hashes (same mixing as pandas)
+    acc = np.full(len(df), 0x345678, dtype=np.uint64)
+    mult = np.uint64(1000003)
+    for i, col in enumerate(df.columns):
+        acc = (acc ^ hashes[col]) * mult
+        mult += np.uint64(82520 + 2 * (len(df.columns) - i))
+    return acc + np.uint64(97531)
+
+
+class FrameFingerprint:
+    """Incremental fingerprint: column names + dtypes, then per-row hashes in order"""
+
+    def __init__(self):
+        self._h = hashlib.sha256()
+        self._started = False
+
+    def update(self, df, hashes=None):
+        if hashes is None:
+            hashes = column_hashes(df)
+        if not self._started:
+            header = "|".join(f"{c}:{t}" for c, t in df.dtypes.astype(str).items())
+            self._h.update(header.encode())
+            self._started = True
+        self._h.update(_row_hashes(df, hashes).tobytes())
+        return self
+
+    def hexdigest(self):
+        return self._h.hexdigest()
+
+
+def frame_fingerprint(df):
+    """Stable fingerprint of a DataFrame's columns, dtypes and row contents"""
+    return FrameFingerprint().update(df).hexdigest()
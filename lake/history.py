@@ -0,0 +1,135 @@
+"""
+History Logs
+============
+The app's histories (job runs, ingestions, queries) as append-only
+JSON-lines logs in the lake root, shared by every session. Each log keeps
+a ring buffer of its newest records in memory, and a fixed-width index of
+record offsets next to the log, so any page of it is read by seeking to
+its records: memory and read time do not grow with the log.
+
+``retention`` bounds the log on disk: once it holds twice that many
+records, it is rewritten with the newest ``retention`` ones. Appends come
+from one server process (the Streamlit server) and are serialized by a
+lock.
+"""
+
+import json
+import os
+import struct
+import threading
+from collections import deque
+from pathlib import Path
+
+HISTORY_DIR = "_history"
+DEFAULT_RETENTION = int(os.environ.get("LAKE_HISTORY_RETENTION", 100_000))   # records on disk, per log
+DEFAULT_RECENT = int(os.environ.get("LAKE_HISTORY_RECENT", 200))             # records in memory, per log
+PAGE_SIZE = 50
+_OFFSET = struct.Struct("<Q")
+
+
+class HistoryLog:
+    """An append-only log of JSON records with a ring buffer of the newest ones"""
+
+    def __init__(self, path, retention=DEFAULT_RETENTION, recent=DEFAULT_RECENT):
+        self.path = Path(path)
+        self.index_path = self.path.with_name(self.path.name + ".idx")
+        self.retention = retention
+        self._lock = threading.Lock()
+        # Keys of the newest appends, so a record several sessions report is logged once
+        self._keys = deque(maxlen=max(recent, 1) * 4)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.touch(exist_ok=True)
+        if not self.index_path.exists() or not self._index_valid():
+            self._rebuild_index()
+        self._count = self.index_path.stat().st_size // _OFFSET.size
+        self._recent = deque(reversed(self.page(0, recent)), maxlen=recent)
+
+    def __len__(self):
+        return self._count
+
+    def _index_valid(self):
+        size = self.index_path.stat().st_size
+        if size % _OFFSET.size:
+            return False
+        if not size:
+            return True
+        with open(self.index_path, "rb") as fh:
+            fh.seek(size - _OFFSET.size)
+            last = _OFFSET.unpack(fh.read(_OFFSET.size))[0]
+        return last < self.path.stat().st_size
+
+    def _rebuild_index(self):
+        """Index every complete line of the log (after a crash or an interrupted compaction)"""
+        offsets, offset = [], 0
+        with open(self.path, "rb") as fh:
+            for line in fh:
+                if line.endswith(b"\n") and line.strip():
+                    offsets.append(offset)
+                offset += len(line)
+        tmp = self.index_path.with_name(self.index_path.name + ".tmp")
+        tmp.write_bytes(b"".join(_OFFSET.pack(o) for o in offsets))
+        os.replace(tmp, self.index_path)
+
+    def append(self, record, key=None):
+        """Log ``record``; with a ``key`` seen among the newest appends, do
+        nothing and return False"""
+        line = (json.dumps(record, default=str) + "\n").encode()
+        with self._lock:
+            if key is not None:
+                if key in self._keys:
+                    return False
+                self._keys.append(key)
+            with open(self.path, "ab") as fh:
+                offset = fh.seek(0, os.SEEK_END)
+                fh.write(line)
+            with open(self.index_path, "ab") as fh:
+                fh.write(_OFFSET.pack(offset))
+            self._count += 1
+            self._recent.append(record)
+            if self.retention and self._count >= 2 * self.retention:
+                self._compact()
+        return True
+
+    def _compact(self):
+        """Rewrite the log with its newest ``retention`` records"""
+        keep = self._read(self._count - self.retention, self._count)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        offsets, offset = [], 0
+        with open(tmp, "wb") as fh:
+            for line in keep:
+                offsets.append(offset)
+                fh.write(line)
+                offset += len(line)
+        os.replace(tmp, self.path)
+        # An index left over from before the replace fails _index_valid() and is rebuilt
+        tmp = self.index_path.with_name(self.index_path.name + ".tmp")
+        tmp.write_bytes(b"".join(_OFFSET.pack(o) for o in offsets))
+        os.replace(tmp, self.index_path)
+        self._count = len(offsets)
+
+    def _read(self, start, stop):
+        """Raw lines of records ``start .. stop - 1`` (oldest first)"""
+        start, stop = max(start, 0), min(stop, self._count)
+        if start >= stop:
+            return []
+        with open(self.index_path, "rb") as fh:
+            fh.seek(start * _OFFSET.size)
+            offsets = [o for (o,) in _OFFSET.iter_unpack(fh.read((stop - start) * _OFFSET.size))]
+        with open(self.path, "rb") as fh:
+            lines = []
+            for offset in offsets:
+                fh.seek(offset)
+                lines.append(fh.readline())
+        return lines
+
+    def page(self, page=0, page_size=PAGE_SIZE):
+        """Records of one page, newest first"""
+        with self._lock:
+            stop = self._count - page * page_size
+            lines = self._read(stop - page_size, stop)
+        return [json.loads(line) for line in reversed(lines)]
+
+    def recent(self, n=None):
+        """The newest ``n`` records (at most the ring buffer's size), newest first"""
+        records = list(self._recent)[::-1]
+        return records if n is None else records[:n]
@@ -0,0 +1,222 @@
+"""
+Incremental Promotion
+=====================
+Promotes only the rows that are new or changed since the last promotion
+and merges them into one stable table per dataset and zone
+(``raw/flipkart_20240102_080000`` → ``bronze/bronze_flipkart`` →
+``silver/silver_flipkart`` → ``gold/gold_flipkart``) instead of writing a
+new timestamped copy of the whole history every time.
+
+Every stable table tracks, in its manifest, a watermark: the largest
+``crawled_at`` merged so far. Source rows at or below it are not read at
+all (the filter is pushed down to the Parquet parts). Next to the table,
+a small state file keeps a 64-bit hash of every merged key
+(``pid``/``product_id``) and of its row, so the remaining rows can be told
+apart as new, changed or already merged; without a ``crawled_at`` column
+the key state alone decides. New and changed rows are transformed and
+upserted (see ``LakeStore.upsert``), so bronze and silver cost O(delta).
+
+Gold is refreshed from the delta as well: only the categories that
+changed rows belong to now, or belonged to before, are recomputed from
+silver and upserted; every other category row is kept as it is.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+from lake.fingerprint import _row_hashes, column_hashes
+from lake.metrics import Meter, stage_record
+from lake.transforms import CATEGORY_COLUMNS, ID_COLUMNS, NEXT_ZONE, PROMOTIONS, find_column
+
+STATE_FILE = "_incremental.npz"
+WATERMARK_COLUMNS = ("crawled_at",)
+# Ingestion (``_20240102_080000``) and promotion (``_143015``) timestamps
+_NAME_SUFFIX = re.compile(r"(_\d{8}_\d{6})?(_\d{6})?$")
+_EMPTY = np.empty(0, dtype=np.uint64)
+
+
+def dataset_name(zone, name):
+    """Dataset a table belongs to: its name without zone prefix and timestamps"""
+    if name.startswith(f"{zone}_"):
+        name = name[len(zone) + 1:]
+    return _NAME_SUFFIX.sub("", name) or name
+
+
+def target_name(zone, name):
+    """Stable table ``zone/name`` is merged into one zone up (``silver_flipkart``)"""
+    return f"{NEXT_ZONE[zone]}_{dataset_name(zone, name)}"
+
+
+# ── key state ───────────────────────────────────────────────────────────────
+def _hashes(df, key):
+    """``(key hashes, row hashes)`` of ``df``"""
+    hashes = column_hashes(df)
+    return hashes[key], _row_hashes(df, hashes)
+
+
+def load_state(store, zone, name):
+    """``{"keys", "rows", "groups"}`` of a stable table, keys sorted; None when
+    missing or written for another version of the table"""
+    path = store.table_path(zone, name) / STATE_FILE
+    if not path.exists():
+        return None
+    with np.load(path) as state:
+        if int(state["version"]) != store.info(zone, name)["version"]:
+            return None
+        return {"keys": state["keys"], "rows": state["rows"], "groups": state["groups"] if "groups" in state.files else None}
+
+
+def _save_state(store, zone, name, state):
+    path = store.table_path(zone, name)
+    arrays = {k: v for k, v in state.items() if v is not None}
+    tmp = path / f"{STATE_FILE}.tmp.npz"
+    np.savez(tmp, version=store.info(zone, name)["version"], **arrays)
+    tmp.replace(path / STATE_FILE)
+
+
+def _lookup(state, keys):
+    """Position of every key in ``state`` and whether it is there"""
+    if state is None or not len(state["keys"]):
+        return np.zeros(len(keys), dtype=np.int64), np.zeros(len(keys), dtype=bool)
+    pos = np.minimum(np.searchsorted(state["keys"], keys), len(state["keys"]) - 1)
+    return pos, state["keys"][pos] == keys
+
+
+def _merge_state(state, keys, rows, groups=None):
+    """``state`` with ``keys`` added or their row hashes (and groups) replaced"""
+    old_keys = state["keys"] if state else _EMPTY
+    all_keys = np.concatenate([keys, old_keys])
+    # np.unique keeps the first occurrence, i.e. the new entry of a changed key
+    merged_keys, first = np.unique(all_keys, return_index=True)
+    merged = {"keys": merged_keys, "rows": np.concatenate([rows, state["rows"] if state else _EMPTY])[first]}
+    if groups is not None:
+        old_groups = state["groups"] if state and state["groups"] is not None else np.empty(len(old_keys), dtype=str)
+        # Fixed-width strings, so the state file loads without pickle
+        merged["groups"] = np.concatenate([np.asarray(groups, dtype=str), old_groups])[first]
+    return merged
+
+
+# ── promotion ───────────────────────────────────────────────────────────────
+def _changed_rows(store, zone, name, target, key, frame):
+    """Rows of ``frame`` (default: ``zone/name`` above the target's watermark)
+    that the target has not merged yet, their hashes, and the target's state"""
+    to_zone = NEXT_ZONE[zone]
+    exists = store.exists(to_zone, target)
+    tracking = store.info(to_zone, target).get("incremental", {}) if exists else {}
+    state = load_state(store, to_zone, target) if exists else None
+    if frame is None or state is None:
+        # Without state (first merge, or a table out of sync) the whole source is merged
+        filters = None
+        column = tracking.get("watermark_column")
+        if state is not None and column and tracking.get("watermark") is not None:
+            # A null crawled_at never passes the filter; such sources are read whole
+            if store.stats(zone, name).get(column, {}).get("null_count", 1) == 0:
+                filters = [(column, ">", tracking["watermark"])]
+        frame = store.read(zone, name, filters=filters)
+    frame = frame.dropna(subset=[key]).drop_duplicates(subset=[key], keep="last").reset_index(drop=True)
+    keys, rows = _hashes(frame, key)
+    pos, found = _lookup(state, keys)
+    changed = ~found
+    if found.any():
+        changed[found] = state["rows"][pos[found]] != rows[found]
+    return frame[changed].reset_index(drop=True), keys[changed], rows[changed], state, tracking
+
+
+def _watermark(frame, tracking):
+    """Watermark after merging ``frame``: the largest ``crawled_at`` seen so far"""
+    column = find_column(frame.columns, WATERMARK_COLUMNS)
+    if column is None or not pd.api.types.is_datetime64_any_dtype(frame[column]):
+        return {}
+    latest = frame[column].max()
+    previous = tracking.get("watermark")
+    if previous is not None and (pd.isna(latest) or pd.Timestamp(previous) >= latest):
+        return {"watermark_column": column, "watermark": previous}
+    return {"watermark_column": column, "watermark": None if pd.isna(latest) else latest.isoformat()}
+
+
+def _sources(tracking, source):
+    """Every table merged into a stable table so far"""
+    return sorted(set(tracking.get("sources", [])) | {source})
+
+
+def promote_incremental(store, zone, name, frame=None):
+    """Merge the new and changed rows of ``zone/name`` into its stable table one zone up.
+
+    ``frame`` replaces reading the source (the delta of the previous stage
+    when zones are promoted in a chain) once the target has been merged
+    into before. Returns the stage record and the transformed delta that
+    was merged.
+    """
+    to_zone, target = NEXT_ZONE[zone], target_name(zone, name)
+    source = f"{zone}/{name}"
+    columns = [c for c, _ in store.info(zone, name)["schema"]]
+    key = find_column(columns, ID_COLUMNS)
+    if key is None:
+        raise ValueError(f"{source} has no key column ({', '.join(ID_COLUMNS)}) to merge by")
+    with Meter() as meter:
+        delta, keys, rows, state, tracking = _changed_rows(store, zone, name, target, key, frame)
+        meter.rows_in = len(delta)
+        if to_zone == "gold":
+            out, counts = _refresh_gold(store, zone, name, target, key, delta, keys, rows, state, tracking)
+        else:
+            out = PROMOTIONS[to_zone](delta)
+            counts = {}
+            if len(out) or not store.exists(to_zone, target):
+                manifest = store.upsert(
+                    to_zone, target, out, key, source=source,
+                    incremental={"key": key, **_watermark(delta, tracking), "sources": _sources(tracking, source)},
+                )
+                counts = manifest["last_upsert"]
+                # Rows the transform dropped (e.g. cleaning) count as merged, not as pending
+                _save_state(store, to_zone, target, _merge_state(state, keys, rows))
+        meter.rows_out = len(out)
+    record = stage_record(
+        f"incremental_{zone}_to_{to_zone}", to_zone, target, source, meter,
+        table_rows=store.info(to_zone, target)["rows"], **counts,
+    )
+    return record, out
+
+
+def _refresh_gold(store, zone, name, target, key, delta, keys, rows, state, tracking):
+    """Recompute the category rows of ``gold/target`` that the delta touches"""
+    group = find_column(delta.columns, CATEGORY_COLUMNS)
+    meta = {"source": f"{zone}/{name}", "incremental": {
+        "key": group, **_watermark(delta, tracking), "sources": _sources(tracking, f"{zone}/{name}"),
+    }}
+    if group is None or "selling_price_clean" not in delta.columns or state is None:
+        # No delta-refreshable aggregate (or no state to refresh from): rebuild once
+        source = store.read(zone, name)
+        out = PROMOTIONS["gold"](source)
+        meta["incremental"].update(_watermark(source, tracking))
+        store.write("gold", target, out, **meta)
+        if group is not None:
+            full = source.dropna(subset=[key]).drop_duplicates(subset=[key], keep="last")
+            full_keys, full_rows = _hashes(full, key)
+            _save_state(store, "gold", target, _merge_state(None, full_keys, full_rows, full[group].astype(str).to_numpy()))
+        return out, {"inserted": len(out), "updated": 0, "deleted": 0}
+    if not len(delta):
+        return delta.head(0), {}
+    groups = delta[group].astype(str).to_numpy()
+    pos, found = _lookup(state, keys)
+    previous = state["groups"][pos[found]] if state["groups"] is not None else np.empty(0, dtype=str)
+    affected = sorted(set(groups) | set(previous))
+    out = PROMOTIONS["gold"](store.read(zone, name, filters=[(group, "in", affected)]))
+    out = out[out[group].astype(str).isin(affected)]
+    emptied = [g for g in affected if g not in set(out[group].astype(str))]
+    manifest = store.upsert("gold", target, out, group, delete=emptied, **meta)
+    _save_state(store, "gold", target, _merge_state(state, keys, rows, groups))
+    return out, manifest["last_upsert"]
+
+
+def run_incremental_pipeline(store, raw_name, report=None):
+    """Promote the delta of ``raw/raw_name`` through bronze, silver and gold"""
+    report = report or (lambda fraction, message=None: None)
+    stages, zone, name, frame = [], "raw", raw_name, None
+    while zone in NEXT_ZONE:
+        report(len(stages) / len(NEXT_ZONE), f"Merging {zone}/{name} into {target_name(zone, name)}")
+        record, frame = promote_incremental(store, zone, name, frame)
+        stages.append(record)
+        zone, name = record["zone"], record["table"]
+    return stages
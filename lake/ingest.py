@@ -0,0 +1,61 @@
+"""
+Streaming Ingestion
+===================
+Reads large CSV exports in fixed-size chunks, cleans each chunk and
+appends it to a Raw Zone table, so peak memory is bounded by the chunk
+size rather than the file size.
+"""
+
+import time
+
+import pandas as pd
+
+from lake.dtypes import apply_dtypes, memory_mb, plan_dtypes, plan_misfits
+
+DEFAULT_CHUNK_ROWS = 200_000
+
+
+def stream_csv(file, store, name, clean_fn=None, chunk_rows=DEFAULT_CHUNK_ROWS,
+               total_bytes=None, on_progress=None, compact=True, **meta):
+    """Stream ``file`` into ``raw/<name>`` chunk by chunk and return the manifest.
+
+    ``on_progress(rows, rows_per_sec, fraction)`` is called after every
+    chunk; ``fraction`` is ``None`` when the total size is unknown. With
+    ``compact`` the categorical/boolean plan of the first chunk is applied
+    to every chunk and the before/after memory is recorded in the manifest.
+    A column a later chunk does not fit the plan for (text among booleans,
+    a string column turning high-cardinality) is left as read from then on;
+    the table schema reconciles its parts (see ``TableWriter``).
+    """
+    t0 = time.perf_counter()
+    plan = None
+    before = after = 0.0
+    with store.writer("raw", name, **meta) as writer:
+        for chunk in pd.read_csv(file, chunksize=chunk_rows):
+            if clean_fn is not None:
+                chunk = clean_fn(chunk)
+            if compact:
+                if plan is None:
+                    # Integer/float downcasts chosen on one chunk may not fit the next
+                    plan = plan_dtypes(chunk, downcast=False)
+                    converted = {col: f"{chunk[col].dtype}→{dtype}" for col, dtype in plan.items()}
+                else:
+                    for col in plan_misfits(chunk, plan):
+                        del plan[col]
+                        converted.pop(col)
+                before += memory_mb(chunk)
+                chunk = apply_dtypes(chunk, plan)
+                after += memory_mb(chunk)
+                writer.meta["memory"] = {
+                    "memory_before_mb": round(float(before), 3),
+                    "memory_after_mb": round(float(after), 3),
+                    "converted": converted,
+                }
+            rows = writer.append(chunk)
+            if on_progress is not None:
+                elapsed = max(time.perf_counter() - t0, 1e-9)
+                fraction = None
+                if total_bytes and hasattr(file, "tell"):
+                    fraction = min(file.tell() / total_bytes, 1.0)
+                on_progress(rows, rows / elapsed, fraction)
+    return writer.manifest
@@ -0,0 +1,269 @@
+"""
+Background Jobs
+===============
+A persistent job queue (one SQLite file in the lake root) and a runner
+that executes queued jobs on background threads, independent of any
+Streamlit session: a pipeline keeps running across reruns, page switches
+and closed tabs, and jobs interrupted by a server restart are queued
+again when the runner starts.
+
+Job kinds map to handler functions ``handler(store, report, **params)``
+that return a JSON-serializable result; ``report(fraction, message)``
+publishes progress. The runner's ``on_finished(job)`` hook sees every
+succeeded job, with its result, before it is marked finished (the app
+records its tables in the catalog, lineage and job log there, see
+lake/records.py).
+"""
+
+import datetime
+import json
+import os
+import sqlite3
+import threading
+import traceback
+from contextlib import closing
+from pathlib import Path
+
+from lake.dag import DEFAULT_WORKERS as DAG_WORKERS
+from lake.dag import DagScheduler, unpromoted_raw_tables
+from lake.incremental import promote_incremental, run_incremental_pipeline
+from lake.metrics import Meter, stage_record
+from lake.transforms import NEXT_ZONE, PROMOTIONS, TABLE_TRANSFORMS, promoted_name
+
+JOBS_DB = "_jobs.sqlite"
+DEFAULT_WORKERS = int(os.environ.get("LAKE_JOB_WORKERS", 2))
+ACTIVE = ("queued", "running")
+_IDLE_POLL_S = 0.5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    label TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    result TEXT,
+    error TEXT,
+    submitted_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status, id);
+"""
+
+
+def _now():
+    return datetime.datetime.now().isoformat()
+
+
+def _row(row):
+    job = dict(row)
+    job["params"] = json.loads(job["params"])
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+
+class JobQueue:
+    """Jobs persisted in SQLite: queued → running → succeeded / failed"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with closing(self._connect()) as con:
+            con.executescript(_SCHEMA)
+
+    def _connect(self):
+        con = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        con.row_factory = sqlite3.Row
+        con.execute("PRAGMA journal_mode=WAL")
+        return con
+
+    def submit(self, kind, label, **params):
+        with closing(self._connect()) as con:
+            cur = con.execute(
+                "INSERT INTO jobs (kind, label, params, status, submitted_at) VALUES (?, ?, ?, 'queued', ?)",
+                (kind, label, json.dumps(params), _now()),
+            )
+            return cur.lastrowid
+
+    def record(self, kind, label, result, started_at, **params):
+        """Log work that already ran outside the runner (e.g. an ingestion) as a succeeded job"""
+        with closing(self._connect()) as con:
+            cur = con.execute(
+                "INSERT INTO jobs (kind, label, params, status, progress, result, submitted_at, started_at, finished_at) "
+                "VALUES (?, ?, ?, 'succeeded', 1, ?, ?, ?, ?)",
+                (kind, label, json.dumps(params), json.dumps(result), started_at, started_at, _now()),
+            )
+            return cur.lastrowid
+
+    def claim(self):
+        """Atomically move the oldest queued job to running and return it"""
+        con = self._connect()
+        try:
+            con.execute("BEGIN IMMEDIATE")
+            row = con.execute("SELECT * FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1").fetchone()
+            if row is None:
+                con.execute("COMMIT")
+                return None
+            started = _now()
+            con.execute("UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?", (started, row["id"]))
+            con.execute("COMMIT")
+            job = _row(row)
+            job.update(status="running", started_at=started)
+            return job
+        finally:
+            con.close()
+
+    def report(self, job_id, fraction, message=None):
+        with closing(self._connect()) as con:
+            con.execute("UPDATE jobs SET progress = ?, message = ? WHERE id = ?", (float(fraction), message, job_id))
+
+    def finish(self, job_id, result=None, error=None):
+        with closing(self._connect()) as con:
+            if error:
+                con.execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                    (error, _now(), job_id),
+                )
+            else:
+                con.execute(
+                    "UPDATE jobs SET status = 'succeeded', progress = 1, result = ?, finished_at = ? WHERE id = ?",
+                    (json.dumps(result), _now(), job_id),
+                )
+
+    def requeue_interrupted(self):
+        """Queue jobs again that were running when the previous server stopped"""
+        with closing(self._connect()) as con:
+            return con.execute(
+                "UPDATE jobs SET status = 'queued', progress = 0, message = 'requeued after restart' "
+                "WHERE status = 'running'"
+            ).rowcount
+
+    def get(self, job_id):
+        with closing(self._connect()) as con:
+            row = con.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _row(row) if row else None
+
+    def list(self, limit=50, statuses=None, after_id=0):
+        """Newest first; ``after_id`` returns only jobs with a larger id"""
+        sql = "SELECT * FROM jobs WHERE id > ?"
+        args = [after_id]
+        if statuses:
+            sql += f" AND status IN ({','.join('?' * len(statuses))})"
+            args += list(statuses)
+        sql += " ORDER BY id DESC LIMIT ?"
+        with closing(self._connect()) as con:
+            return [_row(r) for r in con.execute(sql, args + [limit]).fetchall()]
+
+    def counts(self):
+        with closing(self._connect()) as con:
+            return dict(con.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+
+class JobRunner:
+    """Background threads that execute jobs from a ``JobQueue``"""
+
+    def __init__(self, store, queue, handlers, workers=DEFAULT_WORKERS, on_finished=None):
+        self.store = store
+        self.queue = queue
+        self.handlers = handlers
+        self.on_finished = on_finished
+        self._wake = threading.Event()
+        queue.requeue_interrupted()
+        for i in range(max(int(workers), 1)):
+            threading.Thread(target=self._loop, name=f"job-runner-{i}", daemon=True).start()
+
+    def submit(self, kind, label, **params):
+        job_id = self.queue.submit(kind, label, **params)
+        self._wake.set()
+        return job_id
+
+    def _loop(self):
+        while True:
+            job = self.queue.claim()
+            if job is None:
+                self._wake.wait(_IDLE_POLL_S)
+                self._wake.clear()
+                continue
+            self._run(job)
+
+    def _run(self, job):
+        handler = self.handlers.get(job["kind"])
+        if handler is None:
+            self.queue.finish(job["id"], error=f"Unknown job kind: {job['kind']!r}")
+            return
+        try:
+            result = handler(self.store, lambda f, m=None: self.queue.report(job["id"], f, m), **job["params"])
+        except Exception as e:
+            traceback.print_exc()
+            self.queue.finish(job["id"], error=f"{type(e).__name__}: {e}")
+        else:
+            if self.on_finished is not None:
+                try:
+                    self.on_finished({**job, "result": result})
+                except Exception:
+                    # The work itself succeeded; only its bookkeeping is missing
+                    traceback.print_exc()
+            self.queue.finish(job["id"], result=result)
+
+
+# ── handlers ────────────────────────────────────────────────────────────────
+def promote_table(store, report, zone, name, incremental=False):
+    """Promote ``zone/name`` one zone up (``incremental``: merge its delta into the stable table)"""
+    if incremental:
+        report(0.1, f"Merging new rows of {zone}/{name}")
+        return {"kind": "promotion", "stages": [promote_incremental(store, zone, name)[0]]}
+    to_zone = NEXT_ZONE[zone]
+    with Meter() as meter:
+        transform = PROMOTIONS[to_zone]
+        if transform in TABLE_TRANSFORMS:
+            report(0.1, f"Aggregating {zone}/{name}")
+            meter.rows_in = store.info(zone, name)["rows"]
+            df = TABLE_TRANSFORMS[transform](store, zone, name)
+        else:
+            report(0.1, f"Reading {zone}/{name}")
+            df = store.read(zone, name)
+            meter.rows_in = len(df)
+            df = transform(df)
+        meter.rows_out = len(df)
+        dest = promoted_name(zone, name, to_zone, datetime.datetime.now().strftime("%H%M%S"))
+        report(0.6, f"Writing {to_zone}/{dest}")
+        store.write(to_zone, dest, df, source=f"{zone}/{name}")
+    stage = stage_record(f"promote_{zone}_to_{to_zone}", to_zone, dest, f"{zone}/{name}", meter)
+    return {"kind": "promotion", "stages": [stage]}
+
+
+def run_pipeline(store, report, raw_name=None, raw_names=None, workers=DAG_WORKERS):
+    """Run the pipeline DAG on ``raw/<raw_name>`` (or every table in ``raw_names``)"""
+    sources = list(raw_names) if raw_names else [raw_name] if raw_name else []
+    if not sources:
+        raise ValueError("run_pipeline needs raw_name or raw_names")
+    report(0.0, f"Scheduling {len(sources)} dataset(s) on {workers} worker(s)")
+    run = DagScheduler(store, workers=workers).run(sources, report)
+    report(1.0, "Completed")
+    return {"kind": "pipeline", **run}
+
+
+def run_batch(store, report, workers=DAG_WORKERS):
+    """Run the pipeline DAG on every raw table that has not been promoted yet"""
+    sources = unpromoted_raw_tables(store)
+    if not sources:
+        report(1.0, "Nothing to promote")
+        return {"kind": "pipeline", "stages": [], "schedule": None}
+    return run_pipeline(store, report, raw_names=sources, workers=workers)
+
+
+def run_incremental(store, report, raw_name):
+    """Merge the new and changed rows of ``raw/<raw_name>`` through bronze, silver and gold"""
+    stages = run_incremental_pipeline(store, raw_name, report)
+    report(1.0, "Completed")
+    return {"kind": "pipeline", "stages": stages}
+
+
+HANDLERS = {
+    "promote": promote_table,
+    "pipeline": run_pipeline,
+    "batch": run_batch,
+    "incremental": run_incremental,
+}
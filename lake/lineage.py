@@ -0,0 +1,203 @@
+"""
+Data Lineage
+============
+Lineage events (an ingestion, promotion or pipeline stage moving rows from
+one dataset to another) stored as a graph in one SQLite file in the lake
+root and shared by every session.
+
+Every event is added to ``events``, and folded into one compacted edge per
+``(source, destination, operation)`` that counts its events, rows and time,
+so repeated promotions of the same pair do not add edges. ``events`` keeps
+the newest ``retention`` events (``LAKE_HISTORY_RETENTION``, as the app's
+other histories, lake/history.py); the edges keep the totals of all of
+them. Edges are indexed by source and by destination (the adjacency
+lists); upstream/downstream traversals are recursive queries over them.
+"""
+
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from lake.history import DEFAULT_RETENTION
+
+LINEAGE_DB = "_lineage.sqlite"
+PAGE_SIZE = 50
+# Traversals stop this many edges away (the graph may have cycles)
+MAX_DEPTH = 64
+# Events past the retention are pruned once this many more have been recorded
+_PRUNE_EVERY = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT UNIQUE,
+    source TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    operation TEXT NOT NULL,
+    rows_processed INTEGER NOT NULL,
+    duration_ms INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    timestamp TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS edges (
+    source TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    operation TEXT NOT NULL,
+    events INTEGER NOT NULL,
+    rows_processed INTEGER NOT NULL,
+    duration_ms INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    first_at TEXT NOT NULL,
+    last_at TEXT NOT NULL,
+    PRIMARY KEY (source, destination, operation)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS edges_destination ON edges(destination, source);
+"""
+
+_EVENT_COLUMNS = ["source", "destination", "operation", "rows_processed", "duration_ms", "status", "timestamp"]
+_EDGE_COLUMNS = ["source", "destination", "operation", "events", "rows_processed", "duration_ms", "status",
+                 "first_at", "last_at"]
+
+# Reachable nodes with their distance, following edges one way or the other
+_TRAVERSAL = """
+WITH RECURSIVE reach(node, depth) AS (
+    SELECT ?, 0
+    UNION
+    SELECT edges.{next}, reach.depth + 1 FROM edges JOIN reach ON edges.{this} = reach.node
+    WHERE reach.depth < ?
+)
+SELECT node, MIN(depth) AS depth FROM reach WHERE depth > 0 GROUP BY node ORDER BY depth, node
+"""
+
+
+class LineageGraph:
+    """Lineage events (dicts as made by the app's ``make_lineage_event``) and their compacted edges"""
+
+    def __init__(self, path, retention=DEFAULT_RETENTION):
+        self.path = Path(path)
+        self.retention = retention
+        with closing(self._connect()) as con:
+            con.executescript(_SCHEMA)
+
+    def _connect(self):
+        con = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        con.row_factory = sqlite3.Row
+        con.execute("PRAGMA journal_mode=WAL")
+        return con
+
+    def record(self, event, key=None):
+        """Add an event and fold it into its edge. An event with a ``key``
+        that was already recorded (e.g. the same job seen by two sessions)
+        is ignored; returns whether it was added."""
+        con = self._connect()
+        try:
+            con.execute("BEGIN IMMEDIATE")
+            values = [event[col] for col in _EVENT_COLUMNS]
+            cursor = con.execute(
+                f"INSERT OR IGNORE INTO events (key, {', '.join(_EVENT_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [key] + values,
+            )
+            added = cursor.rowcount
+            if added:
+                if self.retention and cursor.lastrowid % _PRUNE_EVERY == 0:
+                    con.execute("DELETE FROM events WHERE id <= ?", (cursor.lastrowid - self.retention,))
+                con.execute(
+                    "INSERT INTO edges (source, destination, operation, events, rows_processed, duration_ms, status, "
+                    "first_at, last_at) VALUES (?, ?, ?, 1, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (source, destination, operation) DO UPDATE SET "
+                    "events = events + 1, rows_processed = rows_processed + excluded.rows_processed, "
+                    "duration_ms = duration_ms + excluded.duration_ms, status = excluded.status, "
+                    "last_at = excluded.last_at",
+                    values[:-1] + [event["timestamp"], event["timestamp"]],
+                )
+            con.execute("COMMIT")
+            return bool(added)
+        except BaseException:
+            con.execute("ROLLBACK")
+            raise
+        finally:
+            con.close()
+
+    def count(self):
+        """Events recorded, including those past the retention"""
+        with closing(self._connect()) as con:
+            return con.execute("SELECT COALESCE(SUM(events), 0) FROM edges").fetchone()[0]
+
+    def summary(self):
+        """Event count, total rows moved and mean duration over all events
+        (from the edges, so including those past the retention)"""
+        with closing(self._connect()) as con:
+            row = con.execute(
+                "SELECT COALESCE(SUM(events), 0), COALESCE(SUM(rows_processed), 0), "
+                "1.0 * SUM(duration_ms) / SUM(events) FROM edges"
+            ).fetchone()
+        return {"events": row[0], "rows_processed": row[1], "avg_duration_ms": row[2]}
+
+    def retained(self):
+        """Events still in the event log"""
+        with closing(self._connect()) as con:
+            return con.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+    def events(self, page=0, page_size=PAGE_SIZE):
+        """``(events, total)``: one page of the retained events, newest first, as a DataFrame"""
+        with closing(self._connect()) as con:
+            total = con.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+            rows = con.execute(
+                f"SELECT {', '.join(_EVENT_COLUMNS)} FROM events ORDER BY id DESC LIMIT ? OFFSET ?",
+                (page_size, page * page_size),
+            ).fetchall()
+        return pd.DataFrame([tuple(r) for r in rows], columns=_EVENT_COLUMNS), total
+
+    def nodes(self):
+        with closing(self._connect()) as con:
+            return [r[0] for r in con.execute(
+                "SELECT source FROM edges UNION SELECT destination FROM edges ORDER BY 1"
+            )]
+
+    def edges(self, nodes=None, limit=None):
+        """Compacted edges as a DataFrame, heaviest first; ``nodes`` keeps the
+        edges between those nodes only, ``limit`` the ``limit`` heaviest"""
+        sql, args = f"SELECT {', '.join(_EDGE_COLUMNS)} FROM edges", []
+        if nodes is not None:
+            nodes = list(nodes)
+            marks = ",".join("?" * len(nodes))
+            sql += f" WHERE source IN ({marks}) AND destination IN ({marks})"
+            args = nodes + nodes
+        sql += " ORDER BY rows_processed DESC, events DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            args.append(int(limit))
+        with closing(self._connect()) as con:
+            rows = con.execute(sql, args).fetchall()
+        return pd.DataFrame([tuple(r) for r in rows], columns=_EDGE_COLUMNS)
+
+    def _traverse(self, node, this, following, max_depth):
+        with closing(self._connect()) as con:
+            rows = con.execute(_TRAVERSAL.format(this=this, next=following), (node, max_depth)).fetchall()
+        return pd.DataFrame([tuple(r) for r in rows], columns=["node", "depth"])
+
+    def downstream(self, node, max_depth=MAX_DEPTH):
+        """Every dataset derived from ``node``, directly or not, with its distance"""
+        return self._traverse(node, "source", "destination", max_depth)
+
+    def upstream(self, node, max_depth=MAX_DEPTH):
+        """Every dataset ``node`` was derived from, directly or not, with its distance"""
+        return self._traverse(node, "destination", "source", max_depth)
+
+    def impact(self, node, zone="gold"):
+        """The ``zone`` tables that depend on ``node`` (e.g. the gold tables built from a raw file)"""
+        downstream = self.downstream(node)
+        return downstream[downstream["node"].str.startswith(f"{zone}/")].reset_index(drop=True)
+
+
+def sankey_links(edges):
+    """``(nodes, sources, targets, values)`` arrays of a Sankey over ``edges``
+    (a DataFrame from ``LineageGraph.edges``): node labels, and per edge the
+    positions of its endpoints in ``nodes`` and its row count (at least 1)"""
+    codes, nodes = pd.factorize(pd.concat([edges["source"], edges["destination"]], ignore_index=True))
+    sources, targets = codes[:len(edges)], codes[len(edges):]
+    values = np.maximum(edges["rows_processed"].to_numpy(dtype=np.int64), 1)
+    return np.asarray(nodes, dtype=object), sources, targets, values
@@ -0,0 +1,102 @@
+"""
+Run Metrics
+===========
+Measures what one unit of work — an ingestion, a promotion, a pipeline
+stage — actually cost: wall time, CPU time, peak resident memory, input
+and output rows and throughput. The numbers are recorded with the job
+that ran the work, so history pages can show trends across runs.
+
+CPU time and resident memory are per process. Work that runs next to
+other work in the server process (concurrent jobs, other sessions) is
+charged for some of theirs; pipeline stages run in their own worker
+process and are measured cleanly.
+"""
+
+import datetime
+import os
+import threading
+import time
+
+SAMPLE_S = 0.02
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss_bytes(pid=None):
+    """Resident set size of ``pid`` (default: this process; Linux /proc); None where unavailable"""
+    try:
+        with open(f"/proc/{pid or 'self'}/statm") as fh:
+            return int(fh.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class Meter:
+    """Context manager that measures the block it wraps.
+
+    Set ``rows_in``/``rows_out`` inside the block (or pass ``rows_in``);
+    ``metrics()`` returns the measurements as a JSON-friendly dict. Peak
+    memory is sampled on a background thread every ``sample_s`` seconds.
+    """
+
+    def __init__(self, rows_in=None, sample_s=SAMPLE_S):
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.sample_s = sample_s
+        self.wall_s = self.cpu_s = None
+
+    def __enter__(self):
+        self.started_at = datetime.datetime.now()
+        self.start_rss = self.peak_rss = rss_bytes() or 0
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, name="meter", daemon=True)
+        self._sampler.start()
+        self._wall, self._cpu = time.perf_counter(), time.process_time()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(self.sample_s):
+            self.peak_rss = max(self.peak_rss, rss_bytes() or 0)
+
+    def __exit__(self, *exc):
+        self.wall_s = time.perf_counter() - self._wall
+        self.cpu_s = time.process_time() - self._cpu
+        self._stop.set()
+        self._sampler.join()
+        self.peak_rss = max(self.peak_rss, rss_bytes() or 0)
+        return False
+
+    def metrics(self):
+        rows = self.rows_in if self.rows_in is not None else self.rows_out
+        return {
+            "started_at": self.started_at.isoformat(),
+            "wall_ms": int(self.wall_s * 1000),
+            "cpu_ms": int(self.cpu_s * 1000),
+            "peak_rss_mb": round(self.peak_rss / 1024 / 1024, 1),
+            "rss_growth_mb": round((self.peak_rss - self.start_rss) / 1024 / 1024, 1),
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "rows_per_sec": int(rows / self.wall_s) if rows and self.wall_s > 0 else None,
+        }
+
+
+def stage_record(stage, zone, table, source, meter, **fields):
+    """Job result entry for one stage (``rows``: output rows) with its measurements"""
+    metrics = meter.metrics()
+    return {
+        "stage": stage, "zone": zone, "table": table, "source": source, "rows": meter.rows_out,
+        "duration_ms": metrics["wall_ms"], "metrics": metrics, **fields,
+    }
+
+
+def stage_history(jobs):
+    """One row per measured stage of finished ``jobs`` (oldest first) for trend charts"""
+    rows = []
+    for job in sorted(jobs, key=lambda j: j["id"]):
+        for stage in (job["result"] or {}).get("stages", []):
+            metrics = stage.get("metrics")
+            if metrics:
+                rows.append({
+                    "job": job["id"], "kind": job["kind"], "stage": stage["stage"], "zone": stage["zone"],
+                    "status": stage.get("status", "succeeded"), "finished_at": job["finished_at"], **metrics,
+                })
+    return rows
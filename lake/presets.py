@@ -0,0 +1,49 @@
+"""
+Query Engine Presets
+====================
+The quick queries the Query Engine offers for a table, as SQL (DuckDB,
+see lake/sql.py) or as pandas expressions (``df``, ``scan``, ``stats``;
+see ``lake.worker.run_query``), depending on the columns it has.
+"""
+
+from lake.transforms import CATEGORY_COLUMNS, find_column
+
+
+def query_presets(zone, name, columns, sql_mode, raw_name=None):
+    """``{label: query}`` for ``zone/name``; ``raw_name`` adds a join with that raw table"""
+    sql_table = f'{zone}."{name}"'
+    if sql_mode:
+        presets = {"Top 10 rows": f"SELECT * FROM {sql_table} LIMIT 10"}
+    else:
+        presets = {"Top 10 rows": "df.head(10)", "Statistical summary": "df.describe()", "Column statistics": "stats"}
+
+    cat_col = find_column(columns, CATEGORY_COLUMNS)
+    if cat_col:
+        presets["Products by category"] = (
+            f'SELECT "{cat_col}", COUNT(*) AS count FROM {sql_table} GROUP BY 1 ORDER BY count DESC' if sql_mode else
+            f"df.groupby('{cat_col}', observed=True).size().reset_index(name='count').sort_values('count', ascending=False)"
+        )
+
+    if 'brand' in columns and 'selling_price_clean' in columns:
+        presets["Top brands"] = (
+            f"SELECT brand, AVG(selling_price_clean) AS selling_price_clean FROM {sql_table} GROUP BY 1 ORDER BY 2 DESC LIMIT 10" if sql_mode else
+            "df.groupby('brand', observed=True)['selling_price_clean'].mean().sort_values(ascending=False).head(10).reset_index()"
+        )
+
+    if 'discount_pct_calc' in columns and not sql_mode:
+        presets["High discount products"] = "df.nlargest(20, 'discount_pct_calc')[['title', 'brand', 'discount_pct_calc', 'selling_price_clean'] if 'title' in df.columns else df.columns[:5]]"
+
+    if 'average_rating' in columns:
+        if sql_mode:
+            presets["Rating distribution"] = f"SELECT average_rating, COUNT(*) AS count FROM {sql_table} GROUP BY 1 ORDER BY 1"
+            presets["Top rated (pushed-down filter)"] = f"SELECT * FROM {sql_table} WHERE average_rating >= 4.5"
+        else:
+            presets["Rating distribution"] = "df['average_rating'].value_counts().sort_index().reset_index()"
+            presets["Top rated (pruned scan)"] = "scan(filters=[('average_rating', '>=', 4.5)])"
+
+    if sql_mode and 'pid' in columns and zone != "raw" and raw_name:
+        presets["Join with Raw Zone"] = (
+            f'SELECT COUNT(*) AS matched, COUNT(DISTINCT r.pid) AS products FROM {sql_table} t '
+            f'JOIN raw."{raw_name}" r USING (pid)'
+        )
+    return presets
@@ -0,0 +1,104 @@
+"""
+Flipkart Data Processing
+========================
+Cleaning of raw Flipkart product exports. Currency (``₹1,299``) and
+percent (``34% off``) strings are parsed with Arrow compute kernels,
+writing straight into float64 columns without intermediate object
+Series, and crawl timestamps are parsed with an explicit format.
+"""
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Fast path: drop the currency sign and separators, and a "%"/"% off" suffix
+_OFF_SUFFIX = "off"
+_TRAILING_CHARS = " \t%"
+# Slow path: first number in the cell; thousands separators are stripped
+_NUMBER_PATTERN = r"(?P<num>-?[\d,]*\.?\d+)"
+
+# crawled_at as exported by the Flipkart crawler, day first: "10/02/2021, 20:11:51" is 10 February
+CRAWLED_AT_FORMAT = "%d/%m/%Y, %H:%M:%S"
+
+
+def _as_arrow_strings(series):
+    try:
+        return pa.array(series, type=pa.string(), from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Mixed object column (e.g. numbers and strings from Excel)
+        return pa.array(series.where(series.isna(), series.astype(str)), type=pa.string(), from_pandas=True)
+
+
+def parse_number(series):
+    """Parse currency/percent strings (``₹1,299``, ``34% off``) into a float64 array.
+
+    Numeric columns are passed through as float64; cells without a number
+    become NaN.
+    """
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        return series.to_numpy(dtype=np.float64, na_value=np.nan)
+    strings = _as_arrow_strings(series)
+    stripped = pc.utf8_trim_whitespace(pc.replace_substring(pc.replace_substring(strings, "₹", ""), ",", ""))
+    off = pc.ends_with(stripped, _OFF_SUFFIX, ignore_case=True)
+    if pc.any(off).as_py():
+        stripped = pc.if_else(off, pc.utf8_slice_codeunits(stripped, 0, -len(_OFF_SUFFIX)), stripped)
+    stripped = pc.utf8_rtrim(stripped, _TRAILING_CHARS)
+    try:
+        values = pc.cast(stripped, pa.float64())
+    except pa.ArrowInvalid:
+        # Some cells are not clean numbers — extract the first number per cell
+        matched = pc.struct_field(pc.extract_regex(strings, _NUMBER_PATTERN), [0])
+        values = pc.cast(pc.replace_substring(matched, ",", ""), pa.float64())
+    return values.to_numpy(zero_copy_only=False)
+
+
+def parse_crawled_at(series):
+    """Parse crawl timestamps with the crawler's explicit (day-first) format.
+
+    Values the format does not match (a different export layout) are parsed
+    one by one with pandas' inference, still reading ambiguous dates day
+    first; values neither can parse become NaT.
+    """
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return series
+    stamps = pc.strptime(_as_arrow_strings(series), format=CRAWLED_AT_FORMAT, unit="ns", error_is_null=True)
+    stamps = pd.Series(stamps.to_numpy(zero_copy_only=False), index=series.index, name=series.name)
+    failed = stamps.isna().to_numpy() & series.notna().to_numpy()
+    if failed.any():
+        stamps[failed] = pd.to_datetime(series[failed], format="mixed", dayfirst=True, errors="coerce")
+    return stamps
+
+
+def process_flipkart_data(df):
+    """Clean and process the Flipkart dataset.
+
+    ``df`` is not modified: the result is a new frame that shares the
+    columns it leaves unchanged with ``df`` instead of copying them.
+    """
+    df = df.copy(deep=False)
+
+    # Basic cleaning
+    if 'Unnamed: 0' in df.columns:
+        df = df.drop(columns=['Unnamed: 0'])
+
+    # Parse prices and discount percentage straight into float columns
+    for src, dst in (('actual_price', 'actual_price_clean'),
+                     ('selling_price', 'selling_price_clean'),
+                     ('discount', 'discount_pct')):
+        if src in df.columns:
+            df[dst] = parse_number(df[src])
+
+    # Handle missing ratings
+    if 'average_rating' in df.columns:
+        df['average_rating'] = df['average_rating'].fillna(0)
+
+    # Create price difference
+    if 'actual_price_clean' in df.columns and 'selling_price_clean' in df.columns:
+        df['price_savings'] = df['actual_price_clean'].to_numpy() - df['selling_price_clean'].to_numpy()
+
+    # Clean dates
+    if 'crawled_at' in df.columns:
+        df['crawled_at'] = parse_crawled_at(df['crawled_at'])
+
+    return df
@@ -0,0 +1,131 @@
+"""
+Query Result Cache
+==================
+Results of Query Engine runs, keyed by the normalized query text and the
+versions of the tables it read. A rewrite of any of those tables (a new
+manifest version, or a SQL alias now pointing at a newer promotion)
+invalidates the entry on its next lookup. Entries are evicted
+least-recently-used first once the results exceed the memory budget.
+"""
+
+import ast
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+from lake.dtypes import estimate_memory_bytes
+
+DEFAULT_MAX_MB = int(os.environ.get("LAKE_QUERY_CACHE_MB", 256))
+
+# Queries whose result changes between runs on the same data are never cached
+_VOLATILE_RE = re.compile(r"\b(sample|random|rand|now|today|current_timestamp|current_date|uuid|gen_random_uuid)\b", re.I)
+_SQL_TOKEN_RE = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|--[^\n]*|\s+|[^\s'\"]+")
+
+
+def normalize_query(query, mode):
+    """Canonical text for ``query``: formatting-insensitive for pandas
+    expressions (compared by syntax tree) and whitespace/comment-insensitive
+    for SQL (string literals and quoted identifiers are kept verbatim)."""
+    if mode == "pandas":
+        try:
+            return ast.dump(ast.parse(query.strip(), mode="eval"))
+        except SyntaxError:
+            return query.strip()
+    tokens = []
+    for token in _SQL_TOKEN_RE.findall(query):
+        if token.isspace() or token.startswith("--"):
+            continue
+        tokens.append(token if token[0] in "'\"" else token.lower())
+    return " ".join(tokens).rstrip(";").strip()
+
+
+def is_cacheable(query):
+    return not _VOLATILE_RE.search(query)
+
+
+def result_size(result):
+    if isinstance(result, pd.DataFrame):
+        return estimate_memory_bytes(result)
+    if isinstance(result, pd.Series):
+        return estimate_memory_bytes(result.to_frame())
+    return sys.getsizeof(result)
+
+
+class QueryCache:
+    """In-memory LRU of query results under a byte budget"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.saved_ms = 0
+        self.size = 0
+        self._entries = OrderedDict()   # key -> (dependencies, result, elapsed_ms, size)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(query, mode, scope=""):
+        """``scope`` distinguishes queries whose text alone does not name the data (pandas ``df``)"""
+        return mode, scope, normalize_query(query, mode)
+
+    def get(self, key, dependencies):
+        """Return ``(result, saved_ms)`` on a hit, ``None`` on a miss.
+
+        ``dependencies`` is the current ``(zone, name, version)`` of every
+        table the query reads; an entry computed against other versions is
+        dropped.
+        """
+        t0 = time.perf_counter()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] != dependencies:
+                self._drop(key)
+                self.invalidations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            _, result, elapsed_ms, _ = entry
+            saved = max(elapsed_ms - int((time.perf_counter() - t0) * 1000), 0)
+            self.hits += 1
+            self.saved_ms += saved
+            return result, saved
+
+    def put(self, key, dependencies, result, elapsed_ms):
+        size = result_size(result)
+        if size > self.max_bytes:
+            return False
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (dependencies, result, elapsed_ms, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+        return True
+
+    def _drop(self, key):
+        self.size -= self._entries.pop(key)[3]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "saved_ms": self.saved_ms,
+            "entries": len(self._entries),
+            "size_mb": self.size / 1024 / 1024,
+            "max_mb": self.max_bytes / 1024 / 1024,
+        }
@@ -0,0 +1,98 @@
+"""
+Lake Records
+============
+The catalog entries, lineage events and job-log entries kept for the
+tables the lake writes, and ``record_job``, which folds a finished job
+into all three. The job runner calls it as each job finishes (see
+``JobRunner``'s ``on_finished``), so a job is recorded once whether or not
+any session is open. Records are keyed by job and stage, so recording a
+job again adds nothing.
+"""
+
+import datetime
+
+STAGE_STATUS = {"succeeded": "SUCCESS", "failed": "FAILED", "skipped": "SKIPPED"}
+
+
+def make_catalog_entry(name, zone, schema, rows, source, checksum, memory=None, stats=None, source_checksum=None):
+    return {
+        "table_name": name,
+        "zone": zone,
+        "schema": schema,
+        "row_count": rows,
+        "source": source,
+        "created_at": datetime.datetime.now().isoformat(),
+        "checksum": checksum,
+        "source_checksum": source_checksum,
+        "format": "Parquet",
+        "owner": "data-eng-team",
+        "tags": [zone.lower(), source.lower(), "ecommerce"],
+        "memory": memory,
+        "stats": stats,
+    }
+
+
+def make_lineage_event(src, dst, operation, rows, duration_ms, status="SUCCESS"):
+    return {
+        "source": src,
+        "destination": dst,
+        "operation": operation,
+        "rows_processed": rows,
+        "timestamp": datetime.datetime.now().isoformat(),
+        "duration_ms": duration_ms,
+        "status": status,
+    }
+
+
+def make_job(name, zone, stage):
+    """Job log entry for one stage record, with what was measured while it ran (lake/metrics.py)"""
+    metrics = stage.get("metrics") or {}
+    return {
+        "job_name": name,
+        "zone": zone,
+        "rows": stage.get("rows") or 0,
+        "rows_in": metrics.get("rows_in"),
+        "duration_ms": stage.get("duration_ms", 0),
+        "cpu_ms": metrics.get("cpu_ms", stage.get("cpu_ms")),
+        "peak_rss_mb": metrics.get("peak_rss_mb"),
+        "rows_per_sec": metrics.get("rows_per_sec"),
+        "started_at": metrics.get("started_at") or datetime.datetime.now().isoformat(),
+        "status": STAGE_STATUS.get(stage.get("status", "succeeded"), "SUCCESS"),
+    }
+
+
+def stage_key(job_id, stage):
+    """Key of a job's stage in the lineage graph and the job log"""
+    return f"job:{job_id}:{stage['stage']}:{stage['zone']}/{stage['table']}"
+
+
+def record_job(job, store, catalog, lineage, job_log):
+    """Fold the stages of a succeeded ``job`` (with its ``result``) into the
+    catalog, the lineage graph and the job log"""
+    for stage in job["result"]["stages"]:
+        zone, table = stage["zone"], stage["table"]
+        key = stage_key(job["id"], stage)
+        if stage.get("status", "succeeded") != "succeeded" or not store.exists(zone, table):
+            # Failed and skipped DAG stages wrote nothing, but still belong in the job log
+            job_log.append(make_job(stage["stage"], zone, stage), key=key)
+            continue
+        manifest = store.info(zone, table)
+        if job["kind"] == "promote":
+            catalog_source, operation = f"{job['params']['zone']}-promotion", "PROMOTE"
+        elif job["kind"] == "ingest":
+            catalog_source, operation = f"file-upload-{stage['source']}", "INGEST"
+        else:
+            catalog_source, operation = "etl-pipeline", stage["stage"]
+        if stage["stage"].startswith("incremental_"):
+            operation = "MERGE"
+        # One catalog entry per table: incremental runs replace the stable table's entry
+        catalog.put(make_catalog_entry(
+            table, zone.upper(), [tuple(item) for item in manifest["schema"]], stage["rows"],
+            catalog_source, manifest["checksum"], manifest.get("memory"), manifest.get("stats"),
+            manifest.get("source_checksum"),
+        ))
+        lineage.record(
+            make_lineage_event(stage["source"], f"{zone}/{table}", operation, stage["rows"], stage["duration_ms"]),
+            key=key,
+        )
+        job_log.append(make_job(stage["stage"], zone, stage), key=key)
@@ -0,0 +1,221 @@
+"""
+Probabilistic Sketches
+======================
+Small, mergeable summaries that are built in one pass over a table and
+stored next to it.
+
+HyperLogLog
+    Approximate distinct counts. With ``p`` index bits the sketch keeps
+    ``2**p`` one-byte registers and has a standard error of about
+    ``1.04 / sqrt(2**p)`` (≈1.6% at the default ``p=12``).
+
+QuantileSketch
+    Approximate quantiles (medians, percentiles) with a relative error
+    bound: log-spaced buckets as in DDSketch, so every value read back is
+    within ``alpha`` (1% by default) of a true value, relative to it.
+    Quantiles falling between two ranks interpolate between their values
+    as NumPy and pandas do (the median of [1, 2, 3, 4] is 2.5), so they
+    stay within ``alpha`` of the true quantile when both values have the
+    same sign; across zero the error is ``alpha`` times the larger
+    magnitude. Merging adds bucket counts, so a sketch built from partitions
+    is identical to one built in a single pass, and rows removed from a
+    table can be subtracted again. A sketch holds about
+    ``ln(max / min) / (2 * alpha)`` counts (≈310 for prices from 39 to
+    20,000), and answering a quantile does not depend on the row count.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class HyperLogLog:
+    """Distinct-count sketch over 64-bit hashes of column values"""
+
+    def __init__(self, p=12, registers=None):
+        self.p = p
+        self.m = 1 << p
+        self.registers = np.zeros(self.m, dtype=np.uint8) if registers is None else registers
+
+    def add_hashes(self, hashes):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if not len(hashes):
+            return self
+        idx = (hashes >> np.uint64(64 - self.p)).astype(np.int64)
+        rest = (hashes << np.uint64(self.p)) | np.uint64(1 << (self.p - 1))
+        # Position of the leftmost 1-bit in the remaining 64-p bits
+        rank = np.clip(64 - np.floor(np.log2(rest.astype(np.float64))), 1, 65 - self.p).astype(np.uint8)
+        np.maximum.at(self.registers, idx, rank)
+        return self
+
+    def add(self, series, hashes=None):
+        """Add the non-null values of a pandas Series (``hashes``: its precomputed cell hashes)"""
+        if hashes is None:
+            values = series.dropna()
+            return self.add_hashes(pd.util.hash_pandas_object(values, index=False).to_numpy())
+        return self.add_hashes(hashes[series.notna().to_numpy()])
+
+    def merge(self, other):
+        if other.p != self.p:
+            raise ValueError("Cannot merge HyperLogLog sketches of different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)   # linear counting for small cardinalities
+        return int(round(estimate))
+
+
+DEFAULT_QUANTILE_ALPHA = 0.01
+_MIN_MAGNITUDE = 1e-9   # smaller magnitudes count as zero
+
+
+class _Buckets:
+    """Counts of log-spaced buckets ``offset .. offset + len(counts) - 1``"""
+
+    def __init__(self, offset=0, counts=None):
+        self.offset = offset
+        self.counts = np.zeros(0, dtype=np.int64) if counts is None else counts
+
+    def merge(self, other, sign=1):
+        if not len(other.counts):
+            return self
+        if not len(self.counts):
+            self.offset, self.counts = other.offset, sign * other.counts
+            return self
+        lo = min(self.offset, other.offset)
+        hi = max(self.offset + len(self.counts), other.offset + len(other.counts))
+        counts = np.zeros(hi - lo, dtype=np.int64)
+        counts[self.offset - lo:self.offset - lo + len(self.counts)] += self.counts
+        counts[other.offset - lo:other.offset - lo + len(other.counts)] += sign * other.counts
+        self.offset, self.counts = lo, counts
+        return self
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch: every quantile is within ``alpha`` relative error"""
+
+    def __init__(self, alpha=DEFAULT_QUANTILE_ALPHA):
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = np.log(self.gamma)
+        self.positive = _Buckets()
+        self.negative = _Buckets()
+        self.zeros = 0
+
+    def _index(self, magnitudes):
+        return np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64)
+
+    @classmethod
+    def grouped(cls, values, codes, groups, alpha=DEFAULT_QUANTILE_ALPHA):
+        """One sketch per group ``0 .. groups - 1`` of ``values`` (``codes``: each
+        value's group), built with a single bincount per sign"""
+        sketches = [cls(alpha) for _ in range(groups)]
+        values = np.asarray(values, dtype=np.float64)
+        codes = np.asarray(codes, dtype=np.int64)
+        keep = ~np.isnan(values)
+        values, codes = values[keep], codes[keep]
+        magnitudes = np.abs(values)
+        small = magnitudes < _MIN_MAGNITUDE
+        for code, count in zip(*np.unique(codes[small], return_counts=True)):
+            sketches[code].zeros += int(count)
+        for sign, side in ((values > 0, "positive"), (values < 0, "negative")):
+            sign &= ~small
+            if not sign.any():
+                continue
+            index = sketches[0]._index(magnitudes[sign])
+            lo, span = int(index.min()), int(index.max() - index.min() + 1)
+            counts = np.bincount(codes[sign] * span + (index - lo), minlength=groups * span).reshape(groups, span)
+            for code in np.flatnonzero(counts.any(axis=1)):
+                row = np.flatnonzero(counts[code])
+                setattr(sketches[code], side, _Buckets(lo + int(row[0]), counts[code, row[0]:row[-1] + 1].copy()))
+        return sketches
+
+    def add(self, values):
+        """Add the non-null values of an array or Series"""
+        return self.merge(self.grouped(values, np.zeros(len(values), dtype=np.int64), 1, self.alpha)[0])
+
+    def merge(self, other, sign=1):
+        if other.alpha != self.alpha:
+            raise ValueError("Cannot merge quantile sketches of different accuracy")
+        self.positive.merge(other.positive, sign)
+        self.negative.merge(other.negative, sign)
+        self.zeros += sign * other.zeros
+        return self
+
+    def subtract(self, other):
+        """Take the values of ``other`` (a subset of this sketch's values) out"""
+        return self.merge(other, sign=-1)
+
+    def pack(self):
+        """The sketch as one int64 array (``unpack`` reverses it); ``alpha`` is not included"""
+        return np.concatenate([
+            [self.zeros, self.positive.offset, len(self.positive.counts)], self.positive.counts,
+            [self.negative.offset, len(self.negative.counts)], self.negative.counts,
+        ]).astype(np.int64)
+
+    @classmethod
+    def unpack(cls, packed, alpha=DEFAULT_QUANTILE_ALPHA):
+        """Sketches from the concatenation of one or more ``pack()`` arrays"""
+        sketches, at = [], 0
+        packed = np.asarray(packed, dtype=np.int64)
+        while at < len(packed):
+            sketch = cls(alpha)
+            sketch.zeros = int(packed[at])
+            for side in (sketch.positive, sketch.negative):
+                offset, size = int(packed[at + 1]), int(packed[at + 2])
+                side.offset, side.counts = offset, packed[at + 3:at + 3 + size].copy()
+                at += 2 + size
+            at += 1
+            sketches.append(sketch)
+        return sketches
+
+    def count(self):
+        return int(self.positive.counts.sum() + self.negative.counts.sum() + self.zeros)
+
+    def quantiles(self, qs):
+        """Values at quantiles ``qs`` (0..1; rank ``q * (count - 1)``, linearly
+        interpolated between the two nearest ranks); NaN when empty"""
+        qs = np.atleast_1d(np.asarray(qs, dtype=np.float64))
+        n = self.count()
+        if n == 0:
+            return np.full(len(qs), np.nan)
+        # Buckets in ascending value order: negatives (largest magnitude first), zero, positives
+        neg_index = self.negative.offset + np.arange(len(self.negative.counts))[::-1]
+        pos_index = self.positive.offset + np.arange(len(self.positive.counts))
+        values = np.concatenate([
+            -self._bucket_value(neg_index), [0.0], self._bucket_value(pos_index),
+        ])
+        counts = np.concatenate([self.negative.counts[::-1], [self.zeros], self.positive.counts])
+        ranks = np.clip(qs, 0, 1) * (n - 1)
+        below = np.floor(ranks)
+        cumulative = np.cumsum(counts)
+        lo = values[np.searchsorted(cumulative, below, side="right")]
+        hi = values[np.searchsorted(cumulative, np.minimum(below + 1, n - 1), side="right")]
+        return lo + (ranks - below) * (hi - lo)
+
+    def quantile(self, q):
+        return float(self.quantiles([q])[0])
+
+    def cdf(self, points):
+        """Approximate number of values <= each of ``points``, with every
+        bucket's count spread evenly over the bucket's range"""
+        neg_index = self.negative.offset + np.arange(len(self.negative.counts))[::-1]
+        pos_index = self.positive.offset + np.arange(len(self.positive.counts))
+        gamma = np.exp(self._log_gamma)
+        # Bucket ranges in ascending value order: negatives, zero, positives
+        lows = np.concatenate([-gamma ** neg_index, [0.0], gamma ** (pos_index - 1)])
+        highs = np.concatenate([-gamma ** (neg_index - 1), [0.0], gamma ** pos_index])
+        counts = np.concatenate([self.negative.counts[::-1], [self.zeros], self.positive.counts])
+        cumulative = np.cumsum(counts)
+        knots = np.column_stack([lows, highs]).ravel()
+        ranks = np.column_stack([cumulative - counts, cumulative]).ravel()
+        return np.interp(np.asarray(points, dtype=np.float64), knots, ranks, left=0, right=self.count())
+
+    def _bucket_value(self, index):
+        # Midpoint (in relative terms) of bucket (gamma**(i-1), gamma**i]
+        return 2 * np.exp(index * self._log_gamma) / (self.gamma + 1)
@@ -0,0 +1,133 @@
+"""
+SQL Engine
+==========
+Runs SQL over lake tables with DuckDB. Every zone is a SQL schema and
+every table a view over its Parquet parts, so queries can join across
+zones (``SELECT ... FROM raw.flipkart r JOIN gold."gold_x" g ...``).
+DuckDB reads the part files directly: only the referenced columns are
+decoded and row groups whose Parquet min/max statistics cannot match a
+``WHERE`` clause are skipped, so nothing is materialized in pandas first.
+"""
+
+import re
+import threading
+import time
+
+import duckdb
+
+from lake.store import SWAP_WAIT_S, ZONES
+
+_TIMESTAMP_SUFFIX = re.compile(r"_\d{6}$")
+_TABLE_REF = re.compile(
+    r"\b(" + "|".join(ZONES) + r')\s*\.\s*(?:"((?:[^"]|"")+)"|([A-Za-z0-9_]+))', re.I
+)
+
+
+def _quote(identifier):
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def table_aliases(zone, name):
+    """SQL names a table is reachable under.
+
+    Besides its own name, a promoted table (``silver/silver_products_143015``)
+    is reachable without the zone prefix and run timestamp
+    (``silver.products``), which always points at the newest promotion.
+    """
+    aliases = [name]
+    if name.startswith(f"{zone}_"):
+        aliases.append(_TIMESTAMP_SUFFIX.sub("", name[len(zone) + 1:]))
+    return aliases
+
+
+class SqlEngine:
+    """One in-process DuckDB database whose views track the lake's tables"""
+
+    def __init__(self, store, threads=None, memory_limit_mb=None):
+        self.store = store
+        self._con = duckdb.connect(":memory:")
+        if threads:
+            self._con.execute(f"SET threads = {int(threads)}")
+        if memory_limit_mb:
+            self._con.execute(f"SET memory_limit = '{int(memory_limit_mb)}MB'")
+        for zone in ZONES:
+            self._con.execute(f"CREATE SCHEMA IF NOT EXISTS {zone}")
+        self._views = {}
+        self._lock = threading.Lock()
+
+    def _sync(self):
+        """Create views for new tables and drop views of deleted ones"""
+        current = {}
+        for zone in ZONES:
+            for name in self.store.list_tables(zone):
+                # Newer tables win an alias clash (list_tables is oldest first)
+                for alias in table_aliases(zone, name):
+                    current[(zone, alias)] = name
+        for (zone, alias), name in current.items():
+            if self._views.get((zone, alias)) == name:
+                continue
+            parts = (self.store.table_path(zone, name) / "part-*.parquet").as_posix()
+            try:
+                self._con.execute(
+                    f"CREATE OR REPLACE VIEW {zone}.{_quote(alias)} AS "
+                    f"SELECT * FROM read_parquet('{parts}', union_by_name = true)"
+                )
+            except duckdb.Error:
+                continue   # e.g. a table without columns
+            self._views[(zone, alias)] = name
+        for zone, alias in set(self._views) - set(current):
+            if self.store.exists(zone, self._views[(zone, alias)]):
+                continue   # being swapped in by a rewrite (see TableWriter.commit)
+            self._con.execute(f"DROP VIEW IF EXISTS {zone}.{_quote(alias)}")
+            del self._views[(zone, alias)]
+
+    def tables(self):
+        """``{"zone.alias": "zone/name"}`` for every queryable view"""
+        with self._lock:
+            self._sync()
+            return {f"{zone}.{alias}": f"{zone}/{name}" for (zone, alias), name in sorted(self._views.items())}
+
+    def dependencies(self, sql):
+        """Sorted ``(zone, name, version)`` of every lake table ``sql`` references"""
+        with self._lock:
+            self._sync()
+            views = dict(self._views)
+        deps = set()
+        for zone, quoted, bare in _TABLE_REF.findall(sql):
+            zone = zone.lower()
+            alias = quoted.replace('""', '"') if quoted else bare
+            name = views.get((zone, alias))
+            if name is not None:
+                deps.add((zone, name, self.store.info(zone, name)["version"]))
+        return tuple(sorted(deps))
+
+    def query(self, sql):
+        """Run ``sql`` and return the result as an Arrow table. A query that
+        finds a table's files missing (a new version being swapped in, see
+        ``TableWriter.commit``) is retried for up to ``SWAP_WAIT_S``."""
+        deadline = time.monotonic() + SWAP_WAIT_S
+        retried = False
+        while True:
+            with self._lock:
+                self._sync()
+                cursor = self._con.cursor()
+            try:
+                return cursor.execute(sql).fetch_arrow_table()
+            except (duckdb.IOException, duckdb.InvalidInputException):
+                # Once in any case: the swap may have finished before the check
+                if retried and (time.monotonic() > deadline or not self.store.swapping()):
+                    raise
+                retried = True
+                time.sleep(0.01)
+            finally:
+                cursor.close()
+
+    def explain(self, sql):
+        """DuckDB's physical plan (shows the projected columns and pushed-down filters)"""
+        with self._lock:
+            self._sync()
+            cursor = self._con.cursor()
+        try:
+            return "\n".join(row[-1] for row in cursor.execute(f"EXPLAIN {sql}").fetchall())
+        finally:
+            cursor.close()
@@ -0,0 +1,269 @@
+"""
+Column Statistics
+=================
+Per-column statistics gathered in a single pass while a table is written:
+null count, min/max and an approximate distinct count (HyperLogLog).
+Per-part min/max ranges are kept as well, so readers can skip parts whose
+range cannot satisfy a filter.
+
+Numeric columns also get quantile sketches (``QuantileSketch``), for the
+whole table and per value of its category column, so medians and
+percentiles are answered without reading the table (``LakeStore.quantiles``).
+"""
+
+import datetime
+import math
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from lake.sketches import DEFAULT_QUANTILE_ALPHA, HyperLogLog, QuantileSketch
+
+FILTER_OPS = ("==", "!=", "<", "<=", ">", ">=", "in")
+CATEGORY_COLUMNS = ("category", "product_category", "main_category")
+# Keys of the quantile sketches in a table's sketch file (HLL registers are keyed by column)
+QUANTILE_KEY = "quantile:{}"
+GROUPED_QUANTILE_KEY = "quantile_by:{}"
+QUANTILE_GROUPS = "quantile_groups"
+QUANTILE_GROUP_COLUMN = "quantile_group_column"
+QUANTILE_ALPHA = "quantile_alpha"
+
+
+def _kind(arrow_type):
+    if pa.types.is_dictionary(arrow_type):
+        return "category"
+    if pa.types.is_boolean(arrow_type):
+        return "bool"
+    if pa.types.is_integer(arrow_type) or pa.types.is_floating(arrow_type) or pa.types.is_decimal(arrow_type):
+        return "number"
+    if pa.types.is_timestamp(arrow_type) or pa.types.is_date(arrow_type):
+        return "datetime"
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        return "string"
+    return "other"
+
+
+def _jsonable(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def _min_max(column):
+    if _kind(column.type) not in ("number", "datetime", "string", "bool") or column.null_count == len(column):
+        return None, None
+    result = pc.min_max(column)
+    return _jsonable(result["min"].as_py()), _jsonable(result["max"].as_py())
+
+
+def group_column(columns):
+    """The column quantile sketches are kept per value of (the category), or None"""
+    return next((col for col in CATEGORY_COLUMNS if col in columns), None)
+
+
+def load_quantiles(sketches, column):
+    """``(table sketch, {group: sketch}, group column)`` of ``column`` from a
+    table's sketches (loaded file or dict), or None when it has no quantile sketch of it"""
+    if QUANTILE_KEY.format(column) not in sketches:
+        return None
+    alpha = float(sketches[QUANTILE_ALPHA][0])
+    table = QuantileSketch.unpack(sketches[QUANTILE_KEY.format(column)], alpha)[0]
+    if GROUPED_QUANTILE_KEY.format(column) not in sketches:
+        return table, {}, None
+    groups = [str(g) for g in sketches[QUANTILE_GROUPS]]
+    grouped = QuantileSketch.unpack(sketches[GROUPED_QUANTILE_KEY.format(column)], alpha)
+    return table, dict(zip(groups, grouped)), str(sketches[QUANTILE_GROUP_COLUMN][0])
+
+
+def part_ranges(table):
+    """``{column: [min, max]}`` for the orderable columns of one Arrow part"""
+    ranges = {}
+    for name, column in zip(table.column_names, table.columns):
+        lo, hi = _min_max(column)
+        if lo is not None:
+            ranges[name] = [lo, hi]
+    return ranges
+
+
+class StatsBuilder:
+    """Accumulates column statistics chunk by chunk"""
+
+    def __init__(self):
+        self.columns = {}
+        self.sketches = {}
+        self.quantiles = {}   # column -> QuantileSketch
+        self.grouped = {}     # column -> {category: QuantileSketch}
+
+    def update(self, df, table, hashes=None):
+        """Fold one chunk (as DataFrame and Arrow table) in; returns its part ranges"""
+        ranges = part_ranges(table)
+        for name, column in zip(table.column_names, table.columns):
+            col = self.columns.setdefault(name, {
+                "kind": _kind(column.type), "null_count": 0, "min": None, "max": None,
+            })
+            col["null_count"] += column.null_count
+            if name in ranges:
+                lo, hi = ranges[name]
+                try:
+                    col["min"] = lo if col["min"] is None else min(col["min"], lo)
+                    col["max"] = hi if col["max"] is None else max(col["max"], hi)
+                except TypeError:
+                    # Type drifted between chunks — no meaningful range
+                    col["kind"] = "other"
+            sketch = self.sketches.setdefault(name, HyperLogLog())
+            if hashes is not None:
+                sketch.add(df[name], hashes[name])
+            else:
+                sketch.add(_hashable(df[name]))
+        self._fold_quantiles(df)
+        return ranges
+
+    def _fold_quantiles(self, df, sign=1):
+        """Add (``sign=-1``: subtract) the numeric values of ``df`` to the quantile sketches"""
+        numeric = [name for name in df.columns if self.columns.get(name, {}).get("kind") == "number"]
+        if not numeric or not len(df):
+            return
+        group = group_column(df.columns)
+        if group is not None:
+            codes, uniques = pd.factorize(df[group])
+            labels = [str(u) for u in uniques]
+            codes = np.where(codes < 0, len(labels), codes)   # rows without a category: table sketch only
+        else:
+            codes, labels = np.zeros(len(df), dtype=np.int64), []
+        for name in numeric:
+            try:
+                values = df[name].to_numpy(dtype=np.float64, na_value=np.nan)
+            except (TypeError, ValueError):
+                continue
+            parts = QuantileSketch.grouped(values, codes, len(labels) + 1)
+            table = self.quantiles.setdefault(name, QuantileSketch())
+            grouped = self.grouped.setdefault(name, {}) if group is not None else {}
+            for label, sketch in zip(labels, parts):
+                table.merge(sketch, sign)
+                if label in grouped:
+                    grouped[label].merge(sketch, sign)
+                else:
+                    grouped[label] = sketch if sign > 0 else QuantileSketch().subtract(sketch)
+            table.merge(parts[-1], sign)
+
+    def absorb(self, stats, sketches):
+        """Fold in the statistics of rows written earlier (a previous table
+        version whose rows are carried over without being read)"""
+        for name, old in stats.items():
+            col = self.columns.setdefault(name, {"kind": old["kind"], "null_count": 0, "min": None, "max": None})
+            col["null_count"] += old["null_count"]
+            for bound, pick in (("min", min), ("max", max)):
+                if old[bound] is not None:
+                    try:
+                        col[bound] = old[bound] if col[bound] is None else pick(col[bound], old[bound])
+                    except TypeError:
+                        col["kind"] = "other"
+            if name in sketches:
+                self.sketches.setdefault(name, HyperLogLog()).merge(HyperLogLog(registers=sketches[name].copy()))
+            quantiles = load_quantiles(sketches, name)
+            if quantiles is not None and quantiles[0].alpha == DEFAULT_QUANTILE_ALPHA:
+                table, grouped, _ = quantiles
+                self.quantiles.setdefault(name, QuantileSketch()).merge(table)
+                target = self.grouped.setdefault(name, {}) if grouped else {}
+                for label, sketch in grouped.items():
+                    target.setdefault(label, QuantileSketch()).merge(sketch)
+
+    def retract(self, df):
+        """Take rows removed from absorbed data back out of the null counts.
+
+        Min/max ranges and distinct-count sketches cannot shrink, so they may
+        stay wider than the remaining data — still safe for part skipping.
+        Quantile sketches subtract the removed values exactly.
+        """
+        for name, nulls in df.isna().sum().items():
+            if name in self.columns:
+                self.columns[name]["null_count"] -= int(nulls)
+        self._fold_quantiles(df, sign=-1)
+
+    def finish(self):
+        """Return ``(stats, sketches)``: JSON-friendly stats, and HLL registers by
+        column plus the packed quantile sketches (see ``load_quantiles``)"""
+        stats = {}
+        for name, col in self.columns.items():
+            stats[name] = {**col, "distinct_approx": self.sketches[name].count()}
+        sketches = {name: sk.registers for name, sk in self.sketches.items()}
+        quantiles = {name: sk for name, sk in self.quantiles.items() if self.columns[name]["kind"] == "number"}
+        if quantiles:
+            sketches[QUANTILE_ALPHA] = np.array([DEFAULT_QUANTILE_ALPHA])
+            for name, sketch in quantiles.items():
+                sketches[QUANTILE_KEY.format(name)] = sketch.pack()
+            labels = sorted({label for name in quantiles for label in self.grouped.get(name, {})})
+            if labels:
+                sketches[QUANTILE_GROUPS] = np.array(labels, dtype=str)
+                sketches[QUANTILE_GROUP_COLUMN] = np.array([group_column(self.columns)], dtype=str)
+                for name in quantiles:
+                    grouped = self.grouped.get(name, {})
+                    sketches[GROUPED_QUANTILE_KEY.format(name)] = np.concatenate([
+                        grouped.get(label, QuantileSketch()).pack() for label in labels
+                    ])
+        return stats, sketches
+
+
+def _hashable(series):
+    if series.dtype == object:
+        # Lists/dicts from nested data hash by their string form
+        first = series.dropna().head(1)
+        if len(first) and isinstance(first.iloc[0], (list, dict, np.ndarray)):
+            return series.astype(str).where(series.notna())
+    return series
+
+
+def coerce_value(kind, value):
+    """Bring a filter value to the column's type (ISO strings for datetimes)"""
+    if kind == "datetime":
+        return pd.Timestamp(value).to_pydatetime()
+    return value
+
+
+def may_match(lo, hi, kind, op, value):
+    """Whether a range ``[lo, hi]`` can contain rows satisfying ``column <op> value``"""
+    if lo is None or kind not in ("number", "datetime", "string", "bool"):
+        return True
+    try:
+        lo, hi = coerce_value(kind, lo), coerce_value(kind, hi)
+        if op == "in":
+            values = [coerce_value(kind, v) for v in value]
+            return any(lo <= v <= hi for v in values)
+        value = coerce_value(kind, value)
+        if op == "==":
+            return lo <= value <= hi
+        if op == "!=":
+            return not (lo == hi == value)
+        if op == "<":
+            return lo < value
+        if op == "<=":
+            return lo <= value
+        if op == ">":
+            return hi > value
+        if op == ">=":
+            return hi >= value
+    except TypeError:
+        return True
+    raise ValueError(f"Unsupported filter operator: {op!r}")
+
+
+def filter_expression(filters):
+    """Arrow dataset expression for ``[(column, op, value), ...]`` filters"""
+    expr = None
+    for column, op, value in filters:
+        field = ds.field(column)
+        if op == "in":
+            term = field.isin(list(value))
+        else:
+            term = {
+                "==": field == value, "!=": field != value,
+                "<": field < value, "<=": field <= value,
+                ">": field > value, ">=": field >= value,
+            }[op]
+        expr = term if expr is None else expr & term
+    return expr
@@ -0,0 +1,669 @@
+"""
+Lake Store — Parquet-backed Zone Storage
+========================================
+Every zone is a directory under the lake root and every table is a
+directory of Parquet part files plus a small ``_table.json`` manifest.
+Tables are read from disk on demand, so nothing stays resident between
+reruns and the lake survives server restarts.
+
+Writing a table again swaps a new directory in with two renames, so for
+an instant the table is missing. Reads that find its files missing while
+a swap is in progress, or just after one (with a manifest naming the old
+version's files), wait and try again.
+"""
+
+import datetime
+import functools
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from lake.dtypes import estimate_memory_bytes
+from lake.fingerprint import FrameFingerprint, column_hashes, content_hash, frame_fingerprint
+from lake.sketches import HyperLogLog
+from lake.stats import (
+    FILTER_OPS, StatsBuilder, coerce_value, filter_expression, load_quantiles, may_match, part_ranges,
+)
+
+ZONES = ("raw", "bronze", "silver", "gold")
+MANIFEST = "_table.json"
+SCHEMA_FILE = "_schema.arrow"
+SKETCH_FILE = "_sketches.npz"
+ROW_GROUP_ROWS = 128_000   # granularity at which readers can skip rows by Parquet statistics
+DEFAULT_ROOT = Path(os.environ.get("LAKE_ROOT", Path(__file__).resolve().parent.parent / "lake_data"))
+
+# Longest a read waits for a table being swapped in by ``TableWriter.commit``
+SWAP_WAIT_S = 5.0
+
+_NAME_RE = re.compile(r"^[A-Za-z0-9_][A-Za-z0-9_.\-]*$")
+_UNSAFE_RE = re.compile(r"[^A-Za-z0-9_.\-]+")
+
+
+def safe_table_name(name):
+    """Turn an arbitrary label (e.g. an uploaded file name) into a valid table name"""
+    cleaned = _UNSAFE_RE.sub("_", str(name).strip()).strip("._-")
+    return cleaned or "dataset"
+
+
+def to_arrow(df, preserve_index=False):
+    """Convert a DataFrame to Arrow, stringifying mixed-type object columns Parquet cannot hold"""
+    try:
+        return pa.Table.from_pandas(df, preserve_index=preserve_index)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+        pass
+    fixed = {}
+    for col in df.columns[df.dtypes == object]:
+        try:
+            pa.array(df[col], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+            fixed[col] = df[col].map(lambda v: None if pd.isna(v) else str(v))
+    return pa.Table.from_pandas(df.assign(**fixed), preserve_index=preserve_index)
+
+
+def _recently_trashed(directory, pattern):
+    """Whether ``directory`` has a previous table version matching ``pattern``
+    that ``TableWriter.commit`` moved aside within ``SWAP_WAIT_S`` (renaming
+    sets its ctime): its replacement is being swapped in or just was"""
+    now = time.time()
+    for trash in directory.glob(pattern):
+        try:
+            if now - trash.stat().st_ctime < SWAP_WAIT_S:
+                return True
+        except FileNotFoundError:
+            pass
+    return False
+
+
+def _swap_safe(method):
+    """Retry a read of ``zone/name`` whose files went missing under it while the table still exists"""
+    @functools.wraps(method)
+    def read(self, zone, name, *args, **kwargs):
+        deadline = time.monotonic() + SWAP_WAIT_S
+        while True:
+            try:
+                return method(self, zone, name, *args, **kwargs)
+            except FileNotFoundError:
+                if time.monotonic() > deadline or not self.exists(zone, name):
+                    raise
+                time.sleep(0.01)
+    return read
+
+
+class LakeStore:
+    """Small storage API over the zone directories"""
+
+    def __init__(self, root=DEFAULT_ROOT):
+        self.root = Path(root)
+        for zone in ZONES:
+            (self.root / zone).mkdir(parents=True, exist_ok=True)
+
+    # ── paths & manifests ───────────────────────────────────────────────────
+    def table_path(self, zone, name):
+        if zone not in ZONES:
+            raise ValueError(f"Unknown zone: {zone!r}")
+        if not _NAME_RE.match(name):
+            raise ValueError(f"Invalid table name: {name!r}")
+        return self.root / zone / name
+
+    def exists(self, zone, name):
+        """Whether the table exists, including while a new version is being swapped in"""
+        path = self.table_path(zone, name)
+        return (path / MANIFEST).exists() or _recently_trashed(path.parent, f".{path.name}.*.trash")
+
+    def swapping(self):
+        """Whether some table is being swapped in by ``TableWriter.commit`` right now"""
+        return any(_recently_trashed(self.root / zone, ".*.trash") for zone in ZONES)
+
+    @_swap_safe
+    def info(self, zone, name):
+        """Return the manifest of a table without touching its data"""
+        with open(self.table_path(zone, name) / MANIFEST, encoding="utf-8") as fh:
+            return json.load(fh)
+
+    def list_tables(self, zone):
+        """Table names in a zone, oldest first"""
+        manifests = []
+        for path in (self.root / zone).iterdir():
+            if not path.name.startswith(".") and (path / MANIFEST).exists():
+                manifests.append(self.info(zone, path.name))
+        return [m["name"] for m in sorted(manifests, key=lambda m: m["created_at"])]
+
+    def find(self, zone, **fields):
+        """Name of the first table whose manifest matches all ``fields``, else None"""
+        for name in self.list_tables(zone):
+            manifest = self.info(zone, name)
+            if all(manifest.get(k) == v for k, v in fields.items()):
+                return name
+        return None
+
+    def update_manifest(self, zone, name, version=None, **fields):
+        """Merge ``fields`` into a manifest, unless the table moved past ``version``"""
+        path = self.table_path(zone, name)
+        manifest = self.info(zone, name)
+        if version is not None and manifest["version"] != version:
+            return manifest
+        manifest.update(fields)
+        self._write_manifest(path, manifest)
+        return manifest
+
+    def stats(self, zone, name):
+        """Per-column statistics (kind, null_count, min, max, distinct_approx).
+
+        Tables written by ``TableWriter`` carry them in the manifest; older
+        tables are scanned once and backfilled.
+        """
+        manifest = self.info(zone, name)
+        if "stats" not in manifest:
+            df = self.read(zone, name)
+            builder = StatsBuilder()
+            builder.update(df, to_arrow(df), column_hashes(df))
+            stats, _ = builder.finish()
+            manifest = self.update_manifest(
+                zone, name, version=manifest["version"], stats=stats,
+                memory_bytes=estimate_memory_bytes(df),
+            )
+            manifest.setdefault("stats", stats)
+        return manifest["stats"]
+
+    def sketch(self, zone, name, column):
+        """HyperLogLog distinct-count sketch of a column, or None"""
+        path = self.table_path(zone, name) / SKETCH_FILE
+        if not path.exists():
+            return None
+        with np.load(path) as sketches:
+            return HyperLogLog(registers=sketches[column].copy()) if column in sketches.files else None
+
+    def quantile_sketches(self, zone, name, column):
+        """``(table sketch, {category: sketch}, category column)`` of a numeric
+        column (see ``lake.stats.load_quantiles``), or None"""
+        path = self.table_path(zone, name) / SKETCH_FILE
+        if not path.exists():
+            return None
+        with np.load(path) as sketches:
+            return load_quantiles(sketches, column)
+
+    def quantiles(self, zone, name, column, qs, by=None, exact=False):
+        """Values of ``column`` at the quantiles ``qs`` (0..1): a Series indexed
+        by ``qs``, or with ``by`` (the table's category column) a DataFrame with
+        one row per category and a column per quantile.
+
+        Answered from the table's quantile sketches without reading the table,
+        interpolated between ranks as pandas does: within 1% of the exact value
+        (relative) when the values around the quantile share a sign, as prices
+        do (see ``lake.sketches.QuantileSketch``). ``exact`` — or a table
+        written without sketches — reads the column and computes them exactly.
+        """
+        qs = list(qs)
+        found = None if exact else self.quantile_sketches(zone, name, column)
+        if found is not None and (by is None or found[2] == by):
+            table, grouped, _ = found
+            if by is None:
+                return pd.Series(table.quantiles(qs), index=qs, name=column)
+            grouped = {group: sketch for group, sketch in grouped.items() if sketch.count()}
+            return pd.DataFrame(
+                [sketch.quantiles(qs) for sketch in grouped.values()],
+                index=pd.Index(list(grouped), name=by), columns=qs,
+            )
+        df = self.read(zone, name, columns=[column] if by is None else [by, column])
+        if by is None:
+            return df[column].quantile(qs)
+        out = df.groupby(by, observed=True)[column].quantile(qs).unstack().dropna(how="all")
+        out.index = out.index.astype(str)
+        return out
+
+    def _write_manifest(self, path, manifest):
+        tmp = path / f"{MANIFEST}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(manifest, fh, indent=1, default=str)
+        os.replace(tmp, path / MANIFEST)
+
+    # ── writes ──────────────────────────────────────────────────────────────
+    def writer(self, zone, name, **meta):
+        """Open a staged writer; parts only become visible on ``commit()``"""
+        return TableWriter(self, zone, name, meta)
+
+    def write(self, zone, name, df, **meta):
+        """Create or fully replace a table with ``df``.
+
+        When ``df`` holds exactly the content of the table named by
+        ``source="zone/name"`` (a stage that changed nothing), the new table
+        references that table's part files instead of storing them again.
+        """
+        source = meta.get("source")
+        if "checksum" not in meta and isinstance(source, str) and self._same_shape(source, df):
+            checksum = frame_fingerprint(df)
+            if checksum == self.info(*source.split("/", 1))["checksum"]:
+                return self.link(zone, name, *source.split("/", 1), **meta)
+            meta["checksum"] = checksum
+        with self.writer(zone, name, **meta) as w:
+            w.append(df)
+        return w.manifest
+
+    def _same_shape(self, source, df):
+        """Whether ``source`` ("zone/name") is a stored table with ``df``'s rows and dtypes"""
+        zone, _, name = source.partition("/")
+        if zone not in ZONES or not _NAME_RE.match(name) or not self.exists(zone, name):
+            return False
+        manifest = self.info(zone, name)
+        return (manifest["rows"] == len(df) and manifest.get("checksum") is not None
+                and manifest["schema"] == [[c, str(t)] for c, t in df.dtypes.items()])
+
+    def link(self, zone, name, source_zone, source_name, **meta):
+        """Create or replace ``zone/name`` with the content of another table,
+        sharing its part files (hard links) and carrying over its statistics"""
+        source = self.info(source_zone, source_name)
+        path = self.table_path(source_zone, source_name)
+        part_stats = source.get("part_stats") or [{}] * len(source["parts"])
+        meta = {**meta, "checksum": source["checksum"], "reference": f"{source_zone}/{source_name}"}
+        with np.load(path / SKETCH_FILE) if (path / SKETCH_FILE).exists() else _no_sketches() as sketches:
+            with self.writer(zone, name, **meta) as writer:
+                writer.absorb(source, {column: sketches[column] for column in sketches.files})
+                for part, ranges in zip(source["parts"], part_stats):
+                    writer.carry(path / part, ranges)
+        return writer.manifest
+
+    def footprint(self):
+        """Bytes stored per zone: ``stored`` counts every table's parts,
+        ``unique`` counts a part file shared by several tables (hard links)
+        once, in the first zone that holds it (raw → gold)"""
+        seen, usage = set(), {}
+        for zone in ZONES:
+            usage[zone] = {"tables": 0, "stored_bytes": 0, "unique_bytes": 0, "references": 0}
+            for name in self.list_tables(zone):
+                manifest = self.info(zone, name)
+                path = self.table_path(zone, name)
+                usage[zone]["tables"] += 1
+                usage[zone]["references"] += "reference" in manifest
+                for part in manifest["parts"]:
+                    try:
+                        stat = os.stat(path / part)
+                    except FileNotFoundError:   # replaced by a concurrent write
+                        continue
+                    usage[zone]["stored_bytes"] += stat.st_size
+                    if (stat.st_dev, stat.st_ino) not in seen:
+                        seen.add((stat.st_dev, stat.st_ino))
+                        usage[zone]["unique_bytes"] += stat.st_size
+        return usage
+
+    def upsert(self, zone, name, df, key, delete=(), **meta):
+        """Insert or replace rows of ``zone/name`` by ``key`` and drop the
+        rows whose key is in ``delete``; creates the table if it is missing.
+
+        Parts that hold none of the affected keys are carried into the new
+        version as they are (hard links, not rewritten); only parts holding
+        a replaced or deleted key are rewritten, and ``df`` is added as new
+        parts. Statistics are carried over likewise. The manifest's
+        ``last_upsert`` records how many rows were inserted, updated and
+        deleted and how many parts were rewritten.
+        """
+        df = df.drop_duplicates(subset=[key], keep="last")
+        if not self.exists(zone, name):
+            with self.writer(zone, name, **meta) as writer:
+                if len(df):
+                    _append_parts(writer, df)
+                else:
+                    writer.append(df)
+            counts = {"inserted": len(df), "updated": 0, "deleted": 0, "parts_kept": 0, "parts_rewritten": 0}
+            return self.update_manifest(zone, name, last_upsert=counts)
+        self.stats(zone, name)   # older tables: backfill the statistics that get carried over
+        previous = self.info(zone, name)
+        path = self.table_path(zone, name)
+        columns = [c for c, _ in previous["schema"]]
+        if len(df) and set(df.columns) != set(columns):
+            raise ValueError(f"Upsert columns {list(df.columns)} do not match table columns {columns}")
+        df = df[columns] if len(df) else df
+        touched = np.concatenate([df[key].to_numpy(dtype=object), np.asarray(list(delete), dtype=object)])
+        schema = _read_schema(path, previous["parts"][0])
+        part_stats = previous.get("part_stats") or [{}] * len(previous["parts"])
+        removed, kept = [], 0
+        writer = self.writer(
+            zone, name, **{**meta, "checksum": content_hash(
+                f"{previous.get('checksum')}|{frame_fingerprint(df)}|{sorted(map(str, delete))}".encode()
+            )},
+        )
+        try:
+            with np.load(path / SKETCH_FILE) if (path / SKETCH_FILE).exists() else _no_sketches() as sketches:
+                writer.absorb(previous, {column: sketches[column] for column in sketches.files})
+            for part, ranges in zip(previous["parts"], part_stats):
+                hit = pq.read_table(path / part, columns=[key]).column(key).to_pandas().isin(touched).to_numpy()
+                if not hit.any():
+                    writer.carry(path / part, ranges)
+                    kept += 1
+                    continue
+                rows = ds.dataset(str(path / part), schema=schema, format="parquet").to_table().to_pandas()
+                removed.append(rows[hit])
+                if not hit.all():
+                    writer.append(rows[~hit], counted=True)
+            removed = pd.concat(removed, ignore_index=True) if removed else df.head(0)
+            writer.retract(removed)
+            _append_parts(writer, df)
+            writer.commit()
+        except Exception:
+            writer.abort()
+            raise
+        updated = int(removed[key].isin(df[key]).sum()) if len(removed) else 0
+        counts = {
+            "inserted": len(df) - updated, "updated": updated, "deleted": len(removed) - updated,
+            "parts_kept": kept, "parts_rewritten": len(previous["parts"]) - kept,
+        }
+        return self.update_manifest(zone, name, last_upsert=counts)
+
+    def delete(self, zone, name):
+        shutil.rmtree(self.table_path(zone, name), ignore_errors=True)
+
+    # ── reads ───────────────────────────────────────────────────────────────
+    def _dataset(self, zone, name):
+        path = self.table_path(zone, name)
+        manifest = self.info(zone, name)
+        files = [str(path / p) for p in manifest["parts"]]
+        return ds.dataset(files, schema=_read_schema(path, manifest["parts"][0]), format="parquet")
+
+    @_swap_safe
+    def read(self, zone, name, columns=None, filters=None):
+        """Load a table into a DataFrame.
+
+        ``columns`` limits the columns read; ``filters`` is a list of
+        ``(column, op, value)`` triples (ops: ==, !=, <, <=, >, >=, in). Parts
+        whose recorded min/max cannot match are skipped without being opened,
+        and Parquet row-group statistics prune the rest.
+        """
+        if not filters:
+            return self._dataset(zone, name).to_table(columns=columns).to_pandas()
+        path = self.table_path(zone, name)
+        manifest = self.info(zone, name)
+        stats = manifest.get("stats", {})
+        coerced = []
+        for column, op, value in filters:
+            if op not in FILTER_OPS:
+                raise ValueError(f"Unsupported filter operator: {op!r}")
+            kind = stats.get(column, {}).get("kind")
+            value = [coerce_value(kind, v) for v in value] if op == "in" else coerce_value(kind, value)
+            coerced.append((column, op, value))
+        part_stats = manifest.get("part_stats") or [{}] * len(manifest["parts"])
+        parts = [
+            part for part, ranges in zip(manifest["parts"], part_stats)
+            if all(
+                may_match(*ranges.get(column, (None, None)), stats.get(column, {}).get("kind"), op, value)
+                for column, op, value in coerced
+            )
+        ]
+        schema = _read_schema(path, manifest["parts"][0])
+        if not parts:
+            table = schema.empty_table()
+            return (table.select(columns) if columns else table).to_pandas()
+        dataset = ds.dataset([str(path / p) for p in parts], schema=schema, format="parquet")
+        return dataset.to_table(columns=columns, filter=filter_expression(coerced)).to_pandas()
+
+    @_swap_safe
+    def row_groups(self, zone, name):
+        """``(part, row group)`` pairs of a table in order: the smallest units it can be read in"""
+        path = self.table_path(zone, name)
+        return [
+            (part, index) for part in self.info(zone, name)["parts"]
+            for index in range(pq.read_metadata(path / part).num_row_groups)
+        ]
+
+    def read_row_groups(self, zone, name, row_groups, columns=None):
+        """Yield the ``(part, row group)`` units of a table as DataFrames, cast to the table schema"""
+        path = self.table_path(zone, name)
+        manifest = self.info(zone, name)
+        schema = _read_schema(path, manifest["parts"][0])
+        for part, index in row_groups:
+            fragment = next(ds.dataset(str(path / part), schema=schema, format="parquet").get_fragments())
+            yield fragment.subset(row_group_ids=[index]).to_table(schema=schema, columns=columns).to_pandas()
+
+    @_swap_safe
+    def head(self, zone, name, n=10):
+        """First ``n`` rows, reading only as many row groups as needed"""
+        return self._dataset(zone, name).head(n).to_pandas()
+
+
+def _append_parts(writer, df):
+    # Row-group sized parts: a later upsert only rewrites the parts its keys are in
+    for start in range(0, len(df), ROW_GROUP_ROWS):
+        writer.append(df.iloc[start:start + ROW_GROUP_ROWS])
+
+
+class _no_sketches:
+    """Stands in for the sketch file of a table written without one"""
+    files = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def _normalize_dictionaries(table):
+    """Give every categorical column int32 codes so chunks of one table share a schema"""
+    fields = []
+    for field in table.schema:
+        if pa.types.is_dictionary(field.type) and field.type.index_type != pa.int32():
+            field = field.with_type(pa.dictionary(pa.int32(), field.type.value_type, field.type.ordered))
+        fields.append(field)
+    schema = pa.schema(fields, metadata=table.schema.metadata)
+    return table if schema.equals(table.schema) else table.cast(schema)
+
+
+def _reconcile_schemas(schema, other):
+    """``schema`` and ``other`` unified field by field, and the names of the
+    fields whose types do not unify, which become strings"""
+    fields, strings = [], []
+    for a, b in zip(schema, other):
+        try:
+            fields.append(pa.unify_schemas([pa.schema([a]), pa.schema([b])], promote_options="permissive").field(0))
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            fields.append(a.with_type(pa.string()).with_nullable(True))
+            strings.append(a.name)
+    return pa.schema(fields, metadata=_object_columns(schema.metadata, strings)), strings
+
+
+def _object_columns(metadata, names):
+    """``metadata`` with the pandas metadata of columns ``names`` changed to object (strings)"""
+    metadata = dict(metadata or {})
+    if names and b"pandas" in metadata:
+        pandas_meta = json.loads(metadata[b"pandas"])
+        for column in pandas_meta.get("columns", []):
+            if column.get("field_name") in names:
+                column.update(pandas_type="unicode", numpy_type="object", metadata=None)
+        metadata[b"pandas"] = json.dumps(pandas_meta).encode()
+    return metadata
+
+
+def _as_strings(table, names):
+    """``table`` with columns ``names`` as strings, formatted as pandas'
+    ``str`` formats them (booleans as "True"/"False", which an Arrow cast
+    would write in lower case)"""
+    if not names:
+        return table
+    for name in names:
+        i = table.schema.get_field_index(name)
+        column = table.column(i)
+        if pa.types.is_boolean(column.type):
+            column = pc.if_else(column, "True", "False")
+        elif pa.types.is_dictionary(column.type):
+            column = column.cast(column.type.value_type).cast(pa.string())
+        else:
+            column = column.cast(pa.string())
+        table = table.set_column(i, pa.field(name, pa.string()), column)
+    return table.replace_schema_metadata(_object_columns(table.schema.metadata, names))
+
+
+def _read_schema(path, first_part):
+    if not (path / SCHEMA_FILE).exists():
+        return pq.read_schema(path / first_part)
+    with open(path / SCHEMA_FILE, "rb") as fh:
+        return pa.ipc.read_schema(pa.py_buffer(fh.read()))
+
+
+class TableWriter:
+    """Appends DataFrame chunks as Parquet parts into a staging directory.
+
+    A content fingerprint, column statistics and distinct-count sketches
+    are accumulated as chunks arrive and recorded with the table. Parts
+    keep their own physical types; the writer tracks a permissively
+    unified table schema (e.g. an int column that later meets NaNs
+    becomes double, and a column whose types cannot be unified, such as
+    booleans followed by text, becomes string) that the reader casts every
+    part to. ``commit()``
+    swaps the staging directory into place, replacing any previous version
+    of the table. The swap is two renames, not one atomic step: readers
+    that run into the gap between them retry (see ``_swap_safe``).
+    """
+
+    def __init__(self, store, zone, name, meta):
+        self.store = store
+        self.zone = zone
+        self.name = name
+        self.meta = meta
+        self.path = store.table_path(zone, name)
+        self.staging = self.path.with_name(f".{name}.{uuid.uuid4().hex}.staging")
+        self.staging.mkdir(parents=True)
+        self.parts = []
+        self.rows = 0
+        self.schema = None
+        self.strings = set()   # columns whose types did not unify, stored as strings
+        # A caller that already fingerprinted the data passes ``checksum=`` in meta
+        self.fingerprint = None if "checksum" in meta else FrameFingerprint()
+        self.stats = StatsBuilder()
+        self.part_stats = []
+        self.memory_bytes = 0
+        self.manifest = None
+
+    def _unify(self, schema):
+        if self.schema is None:
+            self.schema = schema
+        elif schema != self.schema:
+            if schema.names != self.schema.names:
+                raise ValueError(f"Chunk columns {schema.names} do not match table columns {self.schema.names}")
+            try:
+                self.schema = pa.unify_schemas([self.schema, schema], promote_options="permissive")
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                # A column changed kind (e.g. a boolean column that meets text):
+                # it becomes strings, in the parts written so far too
+                self.schema, strings = _reconcile_schemas(self.schema, schema)
+                self.strings.update(strings)
+                self._restring(range(len(self.parts)))
+
+    def _stringified(self, table):
+        """``table`` with the columns the table schema holds as strings converted to strings"""
+        return _as_strings(table, [name for name in self.strings if table.schema.field(name).type != pa.string()])
+
+    def _restring(self, indices):
+        """Rewrite the written parts at ``indices`` that hold reconciled string columns in another type"""
+        for i in indices:
+            path = self.staging / self.parts[i]
+            if all(pq.read_schema(path).field(name).type == pa.string() for name in self.strings):
+                continue
+            table = self._stringified(pq.read_table(path))
+            pq.write_table(table, path.with_name(path.name + ".tmp"), row_group_size=ROW_GROUP_ROWS)
+            os.replace(path.with_name(path.name + ".tmp"), path)
+            self.part_stats[i] = part_ranges(table)
+
+    def append(self, df, counted=False):
+        """Write ``df`` as the next part; ``counted`` rows are already in
+        absorbed statistics (rows rewritten from a carried-over version)"""
+        table = _normalize_dictionaries(to_arrow(df))
+        self._unify(table.schema)
+        table = self._stringified(table)
+        part = f"part-{len(self.parts):05d}.parquet"
+        pq.write_table(table, self.staging / part, row_group_size=ROW_GROUP_ROWS)
+        if counted:
+            self.part_stats.append(part_ranges(table))
+        else:
+            hashes = column_hashes(df)
+            if self.fingerprint is not None:
+                self.fingerprint.update(df, hashes)
+            self.part_stats.append(self.stats.update(df, table, hashes))
+            self.memory_bytes += estimate_memory_bytes(df)
+        self.parts.append(part)
+        self.rows += len(df)
+        return self.rows
+
+    def absorb(self, manifest, sketches):
+        """Start from the statistics of a previous version whose parts are carried over"""
+        self.stats.absorb(manifest.get("stats", {}), sketches)
+        self.memory_bytes += manifest.get("memory_bytes", 0)
+
+    def carry(self, source, ranges):
+        """Reuse an unchanged part file of a previous version without rewriting it"""
+        part = f"part-{len(self.parts):05d}.parquet"
+        try:
+            os.link(source, self.staging / part)
+        except OSError:
+            shutil.copyfile(source, self.staging / part)
+        self.part_stats.append(ranges)
+        self.parts.append(part)
+        self._unify(pq.read_schema(source))
+        self._restring([len(self.parts) - 1])
+        self.rows += pq.read_metadata(source).num_rows
+        return self.rows
+
+    def retract(self, df):
+        """Take rows dropped from absorbed data out of the statistics"""
+        self.stats.retract(df)
+        self.memory_bytes -= estimate_memory_bytes(df)
+
+    def commit(self):
+        if not self.parts:
+            self.append(pd.DataFrame())
+        previous = self.store.info(self.zone, self.name) if self.store.exists(self.zone, self.name) else None
+        now = datetime.datetime.now().isoformat()
+        dtypes = self.schema.empty_table().to_pandas().dtypes
+        with open(self.staging / SCHEMA_FILE, "wb") as fh:
+            fh.write(self.schema.serialize().to_pybytes())
+        stats, sketches = self.stats.finish()
+        np.savez(self.staging / SKETCH_FILE, **sketches)
+        self.manifest = {
+            "name": self.name,
+            "zone": self.zone,
+            "rows": self.rows,
+            "schema": [[c, str(t)] for c, t in dtypes.items()],
+            "parts": self.parts,
+            "checksum": self.fingerprint.hexdigest() if self.fingerprint is not None else None,
+            "memory_bytes": self.memory_bytes,
+            "stats": stats,
+            "part_stats": self.part_stats,
+            "version": (previous["version"] + 1) if previous else 1,
+            "created_at": previous["created_at"] if previous else now,
+            "updated_at": now,
+            **self.meta,
+        }
+        self.store._write_manifest(self.staging, self.manifest)
+        if self.path.exists():
+            trash = self.path.with_name(f".{self.name}.{uuid.uuid4().hex}.trash")
+            os.replace(self.path, trash)
+            os.replace(self.staging, self.path)
+            shutil.rmtree(trash, ignore_errors=True)
+        else:
+            os.replace(self.staging, self.path)
+        return self.manifest
+
+    def abort(self):
+        shutil.rmtree(self.staging, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+            return False
+        try:
+            self.commit()
+        except Exception:
+            self.abort()
+            raise
+        return False
@@ -0,0 +1,188 @@
+"""
+Shared Table Cache
+==================
+Stored tables loaded into memory once per process and shared by every
+session that reads them: memory grows with the number of distinct tables
+in use, not with tables × sessions.
+
+Sessions hold ``TableHandle``s, which only name a cached table version.
+Each handle counts as a reference to its entry; a referenced entry stays
+in memory, while released ones are kept least-recently-used first under
+the byte budget so reopening a table is free. A handle that is never
+released explicitly (its session ended) is released when it is garbage
+collected.
+
+Entries are keyed by table version, so a rewritten table is loaded anew
+and its old version dropped once no handle refers to it. Handles give out
+shallow copies of the shared frame; with pandas copy-on-write, which the
+app enables, a session that modifies its copy gets its own buffers and
+never changes what other sessions see.
+"""
+
+import os
+import threading
+import weakref
+from collections import OrderedDict, deque
+
+from lake.dtypes import estimate_memory_bytes
+
+DEFAULT_MAX_MB = int(os.environ.get("LAKE_TABLE_CACHE_MB", 1024))
+
+
+class _Entry:
+    __slots__ = ("frame", "size", "refs", "loaded")
+
+    def __init__(self):
+        self.frame = None
+        self.size = 0
+        self.refs = 0
+        self.loaded = threading.Event()
+
+
+class TableHandle:
+    """A session's reference to one cached table version"""
+
+    def __init__(self, cache, key, entry):
+        self.zone, self.name, self.version, self.columns = key
+        self._cache = cache
+        self._key = key
+        self._entry = entry
+        # Runs at garbage collection, possibly inside the cache's lock: only queues the release
+        self._finalizer = weakref.finalize(self, cache._pending.append, key)
+
+    @property
+    def frame(self):
+        """The table as a DataFrame (a shallow copy: modifying it does not touch the shared one)"""
+        return self._entry.frame.copy(deep=False)
+
+    @property
+    def nbytes(self):
+        return self._entry.size
+
+    @property
+    def released(self):
+        return not self._finalizer.alive
+
+    def stale(self):
+        """Whether the table was rewritten (or deleted) since this version was loaded"""
+        return not self._cache.store.exists(self.zone, self.name) or self._cache.version(self.zone, self.name) != self.version
+
+    def release(self):
+        if self._finalizer.detach():
+            self._cache._release(self._key)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class TableCache:
+    """Reference-counted, process-wide cache of stored tables under a byte budget"""
+
+    def __init__(self, store, max_bytes=DEFAULT_MAX_MB * 1024 * 1024):
+        self.store = store
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size = 0
+        self._entries = OrderedDict()   # (zone, name, version, columns) -> _Entry
+        self._latest = {}               # (zone, name) -> newest version acquired
+        self._pending = deque()         # keys of handles garbage collected unreleased
+        self._lock = threading.Lock()
+
+    def version(self, zone, name):
+        manifest = self.store.info(zone, name)
+        return manifest["version"], manifest.get("checksum")
+
+    def acquire(self, zone, name, columns=None):
+        """A handle on the current version of ``zone/name`` (only ``columns``
+        when given), loading it unless some session already has"""
+        key = (zone, name, self.version(zone, name), tuple(columns) if columns else None)
+        with self._lock:
+            self._collect()
+            if self._latest.get((zone, name), key[2]) != key[2]:
+                # Rewritten: older versions nobody refers to are of no further use
+                for old in [k for k, e in self._entries.items()
+                            if k[:2] == (zone, name) and k[2] != key[2] and e.refs <= 0 and e.loaded.is_set()]:
+                    self._drop(old)
+            self._latest[(zone, name)] = key[2]
+            entry = self._entries.get(key)
+            loader = entry is None
+            if loader:
+                entry = self._entries[key] = _Entry()
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            entry.refs += 1
+        if loader:
+            # Outside the lock: other tables stay available; sessions asking
+            # for this one wait for the single read below
+            try:
+                entry.frame = self.store.read(zone, name, columns=list(columns) if columns else None)
+                entry.size = estimate_memory_bytes(entry.frame)
+            except BaseException:
+                with self._lock:
+                    self._entries.pop(key, None)
+                entry.loaded.set()
+                raise
+            with self._lock:
+                self.size += entry.size
+                self._evict()
+            entry.loaded.set()
+        else:
+            entry.loaded.wait()
+            if entry.frame is None:
+                with self._lock:
+                    entry.refs -= 1
+                raise RuntimeError(f"Loading {zone}/{name} failed")
+        return TableHandle(self, key, entry)
+
+    def _release(self, key):
+        with self._lock:
+            self._pending.append(key)
+            self._collect()
+
+    def _collect(self):
+        """Apply queued releases (under the lock); an old version nobody refers to is dropped"""
+        while self._pending:
+            key = self._pending.popleft()
+            entry = self._entries.get(key)
+            if entry is None:
+                continue
+            entry.refs -= 1
+            if entry.refs <= 0 and entry.loaded.is_set() and self._latest.get(key[:2]) != key[2]:
+                self._drop(key)
+        self._evict()
+
+    def _evict(self):
+        """Drop released entries, least recently used first, until under budget"""
+        if self.size <= self.max_bytes:
+            return
+        for key in [k for k, e in self._entries.items() if e.refs <= 0 and e.loaded.is_set()]:
+            if self.size <= self.max_bytes:
+                break
+            self._drop(key)
+            self.evictions += 1
+
+    def _drop(self, key):
+        self.size -= self._entries.pop(key).size
+
+    def stats(self):
+        with self._lock:
+            self._collect()
+            entries = list(self._entries.values())
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(entries),
+            "handles": sum(e.refs for e in entries),
+            "size_mb": self.size / 1024 / 1024,
+            "max_mb": self.max_bytes / 1024 / 1024,
+        }
@@ -0,0 +1,123 @@
+"""
+Zone Transformations
+====================
+The per-zone transformations applied when a table is promoted
+(raw → bronze → silver → gold), and the stages of the full ETL pipeline.
+All functions take and return a DataFrame and do not touch the store.
+They never modify their input, and return it as it is when they have
+nothing to change, so the store can keep such a stage's output as a
+reference to its input (see ``LakeStore.write``).
+
+A transform with an entry in ``TABLE_TRANSFORMS`` also has a version that
+works on a stored table directly; promotions use it instead of reading the
+whole table into memory (e.g. the category KPIs, aggregated from the
+table's row groups in parallel by lake/aggregate.py).
+"""
+
+import pandas as pd
+
+from lake.aggregate import DEFAULT_WORKERS, EXACT_QUANTILES, aggregate_frame, aggregate_table
+from lake.stats import CATEGORY_COLUMNS
+
+ID_COLUMNS = ("pid", "product_id", "id", "_id")
+NEXT_ZONE = {"raw": "bronze", "bronze": "silver", "silver": "gold"}
+# Gold category KPIs: {column: aggregates}, for the columns a table has
+CATEGORY_AGGREGATES = {
+    'selling_price_clean': ('count', 'mean', 'median', 'min', 'max'),
+    'average_rating': ('mean',),
+    'discount_pct_calc': ('mean',),
+}
+
+
+def find_column(columns, candidates):
+    """First of ``candidates`` present in ``columns``, or None"""
+    return next((col for col in candidates if col in columns), None)
+
+
+def clean_records(df):
+    """Bronze: drop rows without an id and duplicate ids (or duplicate rows).
+    Returns ``df`` itself when there is nothing to drop."""
+    id_col = find_column(df.columns, ID_COLUMNS)
+    if id_col:
+        keep = df[id_col].notna().to_numpy() & ~df[id_col].duplicated().to_numpy()
+    else:
+        keep = ~df.duplicated().to_numpy()
+    return df if keep.all() else df[keep]
+
+
+def enrich(df, rating_bands=True):
+    """Silver: add the computed discount and, optionally, a rating category"""
+    if 'actual_price_clean' in df.columns and 'selling_price_clean' in df.columns:
+        df = df.assign(discount_pct_calc=((df['actual_price_clean'] - df['selling_price_clean']) / df['actual_price_clean'] * 100).round(2))
+    if rating_bands and 'average_rating' in df.columns:
+        df = df.assign(rating_category=pd.cut(
+            df['average_rating'],
+            bins=[0, 2, 3, 4, 5],
+            labels=['Poor', 'Fair', 'Good', 'Excellent'],
+        ))
+    return df
+
+
+def category_plan(columns):
+    """``(category column, aggregates)`` of the gold category KPIs, or None
+    when ``columns`` has no category or no selling price"""
+    cat_col = find_column(columns, CATEGORY_COLUMNS)
+    if not (cat_col and 'selling_price_clean' in columns):
+        return None
+    return cat_col, {col: aggs for col, aggs in CATEGORY_AGGREGATES.items() if col in columns}
+
+
+def aggregate_by_category(df, exact=EXACT_QUANTILES):
+    """Gold: price/rating/discount KPIs per category (a describe() without one).
+    Medians are approximate, within 1%, unless ``exact`` (see lake/aggregate.py)."""
+    plan = category_plan(df.columns)
+    if plan is None:
+        return summarize(df)
+    return aggregate_frame(df, *plan, exact=exact).round(2)
+
+
+def aggregate_category_table(store, zone, name, workers=DEFAULT_WORKERS, exact=EXACT_QUANTILES):
+    """``aggregate_by_category`` of the stored ``zone/name``, reading only the
+    aggregated columns, split across ``workers`` processes when it is large"""
+    plan = category_plan([col for col, _ in store.info(zone, name)["schema"]])
+    if plan is None:
+        return summarize(store.read(zone, name))
+    return aggregate_table(store, zone, name, *plan, workers=workers, exact=exact).round(2)
+
+
+def enrich_features(df):
+    """Silver stage of the full pipeline: the computed discount only"""
+    return enrich(df, rating_bands=False)
+
+
+def summarize(df):
+    return df.describe().reset_index()
+
+
+# Transformation applied when promoting a table *into* each zone
+PROMOTIONS = {
+    "bronze": clean_records,
+    "silver": enrich,
+    "gold": aggregate_by_category,
+}
+
+# Versions of transforms that take a stored table: fn(store, zone, name)
+TABLE_TRANSFORMS = {
+    aggregate_by_category: aggregate_category_table,
+}
+
+# Stages of the full pipeline as a DAG: (name, label, zone, transform, after).
+# A stage transforms the table written by its first dependency (the raw table
+# when it has none); stages with the same dependency are independent branches.
+# Transforms must be module-level functions so worker processes can run them.
+PIPELINE_STAGES = [
+    ("bronze", "Bronze: Clean & Validate", "bronze", clean_records, ()),
+    ("silver", "Silver: Enrich & Transform", "silver", enrich_features, ("bronze",)),
+    ("gold", "Gold: Aggregate KPIs", "gold", summarize, ("silver",)),
+    ("gold_category", "Gold: Category KPIs", "gold", aggregate_by_category, ("silver",)),
+]
+
+
+def promoted_name(zone, name, to_zone, ts):
+    """Name of the table ``zone/name`` becomes in ``to_zone`` (e.g. ``silver_products_143015``)"""
+    return f"{to_zone}_{name.replace(f'{zone}_', '')}_{ts}"
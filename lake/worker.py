@@ -0,0 +1,335 @@
+"""
+Worker Processes
+================
+Runs work in a pool of separate worker processes: Query Engine queries,
+so a runaway query cannot block or take down the Streamlit server, and
+pipeline stages, so they use more than one CPU core.
+
+Each worker is a long-lived ``python -m lake.worker`` interpreter (pandas,
+pyarrow and DuckDB imported once) that runs one task at a time; further
+tasks queue. A task names a function (``"module:function"``) that is
+called as ``fn(store, result_path, **kwargs)`` in the worker. A monitor
+thread enforces every task's wall-clock timeout and memory ceiling (the
+worker's resident set size) by killing the worker, which is then
+replaced; a task can also be cancelled the same way. Tabular results
+come back as an Arrow IPC file that the server memory-maps, rather than
+being pickled through the pipe.
+
+Plain subprocesses are used instead of ``multiprocessing`` because its
+spawn/forkserver children re-import the parent's ``__main__``, which under
+Streamlit is the app script.
+"""
+
+import importlib
+import itertools
+import os
+import pickle
+import queue
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from lake.metrics import rss_bytes
+from lake.sql import SqlEngine
+from lake.store import LakeStore, to_arrow
+
+DEFAULT_WORKERS = int(os.environ.get("LAKE_QUERY_WORKERS", 2))
+DEFAULT_TIMEOUT_S = float(os.environ.get("LAKE_QUERY_TIMEOUT_S", 60))
+DEFAULT_MEMORY_MB = int(os.environ.get("LAKE_QUERY_MEMORY_MB", 2048))
+_POLL_S = 0.05
+_PACKAGE_ROOT = str(Path(__file__).resolve().parent.parent)
+
+# Final states of a task
+OK, ERROR, TIMEOUT, MEMORY, CANCELLED = "ok", "error", "timeout", "memory", "cancelled"
+
+
+# ── worker side ──────────────────────────────────────────────────────────────
+def run_query(store, result_path, mode, query, zone, name, extra, memory_limit_mb):
+    """Run one Query Engine query inside a worker; returns ``(status, kind, payload)``"""
+    try:
+        if mode == "sql":
+            table = SqlEngine(store, memory_limit_mb=memory_limit_mb).query(query)
+        else:
+            namespace = {
+                "pd": pd, "np": np,
+                "scan": lambda columns=None, filters=None: store.read(zone, name, columns=columns, filters=filters),
+                **(extra or {}),
+            }
+            if re.search(r"\bdf\b", query):
+                namespace["df"] = store.read(zone, name)
+            result = eval(query, namespace)
+            if isinstance(result, pd.Series):
+                result = result.reset_index()
+            if not isinstance(result, pd.DataFrame):
+                try:
+                    pickle.dumps(result)
+                except Exception:
+                    result = repr(result)
+                return OK, "value", result
+            result.columns = [str(c) for c in result.columns]
+            table = to_arrow(result, preserve_index=None)
+        tmp = f"{result_path}.tmp"
+        with pa.OSFile(tmp, "wb") as sink, ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp, result_path)
+        return OK, "table", table.num_rows
+    except MemoryError:
+        return MEMORY, "error", "MemoryError"
+    except Exception as e:
+        return ERROR, "error", str(e)
+
+
+def _call(store, fn, result_path, kwargs):
+    module, _, func = fn.partition(":")
+    try:
+        return getattr(importlib.import_module(module), func)(store, result_path, **kwargs)
+    except MemoryError:
+        return MEMORY, "error", "MemoryError"
+    except Exception as e:
+        return ERROR, "error", f"{type(e).__name__}: {e}"
+
+
+def main():
+    """Worker loop: read pickled tasks on stdin, write pickled replies on stdout"""
+    replies = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    # Anything a query prints goes to stderr, never into the reply stream
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    tasks = sys.stdin.buffer
+    # As in the app: pipeline stages share the columns they leave unchanged
+    pd.set_option("mode.copy_on_write", True)
+    store = LakeStore(sys.argv[1])
+    while True:
+        try:
+            task = pickle.load(tasks)
+        except EOFError:
+            return
+        pickle.dump(_call(store, **task), replies)
+        replies.flush()
+
+
+# ── server side ──────────────────────────────────────────────────────────────
+class TaskHandle:
+    """A submitted task; its fields are updated by the pool's threads"""
+
+    def __init__(self, tid, timeout_s, memory_mb):
+        self.id = tid
+        self.timeout_s = timeout_s
+        self.memory_mb = memory_mb
+        self.status = "queued"
+        self.error = None
+        self.result = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.rss_mb = 0.0
+        self.peak_rss_mb = 0.0
+        self._kill_reason = None
+        self._done = threading.Event()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    @property
+    def elapsed_ms(self):
+        if self.started is None:
+            return 0
+        return int(((self.finished or time.time()) - self.started) * 1000)
+
+    def wait(self, timeout=None):
+        """Block until the task finished (or ``timeout`` seconds passed); returns ``done``"""
+        return self._done.wait(timeout)
+
+    def _finish(self, status, error=None, result=None):
+        self.status = status
+        self.error = error
+        self.result = result
+        self.finished = time.time()
+        self._done.set()
+
+
+class _Worker:
+    """One worker process plus the thread that feeds it tasks"""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.proc = None
+        self.handle = None
+        self._spawn()
+        threading.Thread(target=self._loop, name=f"{pool.name}-worker", daemon=True).start()
+
+    def _spawn(self):
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [_PACKAGE_ROOT, env.get("PYTHONPATH")]))
+        self.proc = subprocess.Popen(
+            [sys.executable, "-m", "lake.worker", str(self.pool.root)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=env,
+        )
+
+    def _restart(self):
+        if self.proc.poll() is None:
+            self.proc.kill()
+        self.proc.wait()
+        self._spawn()
+
+    def _loop(self):
+        while True:
+            item = self.pool._tasks.get()
+            if item is None:   # pool closed
+                self.proc.stdin.close()
+                self.proc.wait()
+                return
+            handle, task = item
+            with self.pool._lock:
+                if handle.done:   # cancelled while queued
+                    continue
+                if self.proc.poll() is not None:
+                    self._restart()
+                handle.status = "running"
+                handle.started = time.time()
+                self.handle = handle
+            result_path = self.pool.results_dir / f"{uuid.uuid4().hex}.arrow"
+            try:
+                pickle.dump({**task, "result_path": str(result_path)}, self.proc.stdin)
+                self.proc.stdin.flush()
+                reply = pickle.load(self.proc.stdout)
+            except (EOFError, OSError, pickle.UnpicklingError):
+                reply = None
+            with self.pool._lock:
+                self.handle = None
+            try:
+                self._finish(handle, reply, result_path)
+            finally:
+                result_path.unlink(missing_ok=True)
+                Path(f"{result_path}.tmp").unlink(missing_ok=True)
+
+    def _finish(self, handle, reply, result_path):
+        if handle._kill_reason is not None:
+            self._restart()
+            handle._finish(*handle._kill_reason)
+            return
+        if reply is None:
+            code = self.proc.wait()
+            self._spawn()
+            # SIGKILL from outside is almost always the kernel's OOM killer
+            status = MEMORY if code == -9 else ERROR
+            handle._finish(status, f"Worker exited unexpectedly (code {code})")
+            return
+        status, kind, payload = reply
+        rss = rss_bytes(self.proc.pid)
+        if rss is not None and handle.memory_mb and rss > handle.memory_mb * 1024 * 1024 / 2:
+            self._restart()   # hand the memory a large task left behind back to the OS
+        if status != OK:
+            handle._finish(status, payload)
+        elif kind == "value":
+            handle._finish(OK, result=payload)
+        else:
+            try:
+                # Memory-mapped read: the Arrow buffers are not copied through the pipe
+                with pa.memory_map(str(result_path)) as source:
+                    result = ipc.open_file(source).read_all().to_pandas()
+            except (OSError, pa.ArrowInvalid) as e:
+                handle._finish(ERROR, f"Could not read the query result: {e}")
+            else:
+                handle._finish(OK, result=result)
+
+    def kill(self, handle, status, error):
+        """Stop ``handle`` if this worker is running it (called with the pool lock held)"""
+        if self.handle is handle and handle._kill_reason is None:
+            handle._kill_reason = (status, error)
+            self.proc.kill()
+
+
+class WorkerPool:
+    """Fixed pool of worker processes with timeouts, memory limits and cancellation"""
+
+    def __init__(self, root, workers=DEFAULT_WORKERS, name="query"):
+        self.root = Path(root)
+        self.name = name
+        self.results_dir = self.root / "_cache" / "results" / name
+        self.results_dir.mkdir(parents=True, exist_ok=True)
+        for stale in self.results_dir.glob("*.arrow*"):
+            stale.unlink(missing_ok=True)
+        self._ids = itertools.count(1)
+        self._tasks = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._workers = [_Worker(self) for _ in range(max(int(workers), 1))]
+        threading.Thread(target=self._watch, name=f"{name}-monitor", daemon=True).start()
+
+    @property
+    def workers(self):
+        return len(self._workers)
+
+    def call(self, fn, timeout_s=None, memory_mb=None, **kwargs):
+        """Queue ``fn(store, result_path, **kwargs)`` (``fn`` as ``"module:function"``)"""
+        handle = TaskHandle(next(self._ids), timeout_s, memory_mb)
+        self._tasks.put((handle, {"fn": fn, "kwargs": kwargs}))
+        return handle
+
+    def close(self):
+        """Stop the workers once the tasks already queued have run"""
+        self._closed = True
+        for _ in self._workers:
+            self._tasks.put(None)
+
+    def cancel(self, handle):
+        with self._lock:
+            if handle.status == "queued":
+                handle._finish(CANCELLED, "Cancelled before it started")
+                return
+            for worker in self._workers:
+                worker.kill(handle, CANCELLED, "Cancelled by user")
+
+    def active(self):
+        """``(running, queued)`` task counts"""
+        with self._lock:
+            return sum(w.handle is not None for w in self._workers), self._tasks.qsize()
+
+    def _watch(self):
+        while True:
+            time.sleep(_POLL_S)
+            if self._closed and all(w.proc.poll() is not None for w in self._workers):
+                shutil.rmtree(self.results_dir, ignore_errors=True)
+                return
+            with self._lock:
+                now = time.time()
+                for worker in self._workers:
+                    handle = worker.handle
+                    if handle is None or handle._kill_reason is not None:
+                        continue
+                    rss = rss_bytes(worker.proc.pid)
+                    if rss is not None:
+                        handle.rss_mb = rss / 1024 / 1024
+                        handle.peak_rss_mb = max(handle.peak_rss_mb, handle.rss_mb)
+                        if handle.memory_mb and handle.rss_mb > handle.memory_mb:
+                            worker.kill(handle, MEMORY, f"Exceeded the {handle.memory_mb:,} MB memory limit")
+                            continue
+                    if handle.timeout_s and now - handle.started > handle.timeout_s:
+                        worker.kill(handle, TIMEOUT, f"Exceeded the {handle.timeout_s:g}s timeout")
+
+
+class QueryPool(WorkerPool):
+    """Worker pool for Query Engine queries"""
+
+    def submit(self, mode, query, zone=None, name=None, extra=None,
+               timeout_s=DEFAULT_TIMEOUT_S, memory_mb=DEFAULT_MEMORY_MB):
+        """Queue ``query`` (``mode`` "pandas" against ``zone/name``, or "sql")"""
+        return self.call(
+            "lake.worker:run_query", timeout_s=timeout_s, memory_mb=memory_mb,
+            mode=mode, query=query, zone=zone, name=name, extra=extra, memory_limit_mb=memory_mb,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import json
+import sqlite3
+
+import pytest
+
+from lake.catalog import Catalog
+from lake.records import make_catalog_entry
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    catalog = Catalog(tmp_path / "catalog.db")
+    schema = [("pid", "object"), ("selling_price_clean", "float64"), ("brand", "category")]
+    for zone, name, source in [
+        ("RAW", "flipkart_20240101_000000", "file-upload-csv"),
+        ("BRONZE", "bronze_flipkart", "raw-promotion"),
+        ("SILVER", "silver_flipkart", "bronze-promotion"),
+        ("RAW", "amazon_20240101_000000", "file-upload-xlsx"),
+    ]:
+        catalog.put(make_catalog_entry(name, zone, schema, 100, source, f"{name}-checksum"))
+    return catalog
+
+
+def names(result):
+    entries, total = result
+    assert total == len(entries)
+    return sorted(entry["table_name"] for entry in entries)
+
+
+def test_text_search_matches_every_word(catalog):
+    assert names(catalog.search("flipkart")) == ["bronze_flipkart", "flipkart_20240101_000000", "silver_flipkart"]
+    assert names(catalog.search("flipkart upload")) == ["flipkart_20240101_000000"]
+    assert names(catalog.search("selling_price_clean")) == names(catalog.search())
+
+
+def test_short_terms_match_substrings(catalog):
+    assert names(catalog.search("xl")) == ["amazon_20240101_000000"]
+
+
+def test_filters(catalog):
+    assert names(catalog.search(zone="RAW")) == ["amazon_20240101_000000", "flipkart_20240101_000000"]
+    assert names(catalog.search(tag="xlsx")) == []
+    assert names(catalog.search(tag="file-upload-xlsx")) == ["amazon_20240101_000000"]
+    assert names(catalog.search("flipkart", column="brand", zone="SILVER")) == ["silver_flipkart"]
+
+
+def test_put_replaces_and_remove_drops(catalog):
+    catalog.put(make_catalog_entry("silver_flipkart", "SILVER", [("pid", "object")], 5, "etl-pipeline", "new"))
+    assert catalog.count() == 4
+    assert catalog.get("SILVER", "silver_flipkart")["row_count"] == 5
+    assert names(catalog.search(column="brand", zone="SILVER")) == []
+    assert catalog.remove("SILVER", "silver_flipkart")
+    assert names(catalog.search("silver")) == []
+
+
+def test_paging(catalog):
+    first, total = catalog.search(page=0, page_size=3)
+    second, _ = catalog.search(page=1, page_size=3)
+    assert total == 4 and len(first) == 3 and len(second) == 1
+    assert not {e["table_name"] for e in first} & {e["table_name"] for e in second}
+
+
+def test_find_by_checksums(catalog):
+    catalog.put(make_catalog_entry("flipkart_20240102_000000", "RAW", [], 100, "file-upload-csv", "data",
+                                   source_checksum="file"))
+    assert catalog.find("RAW", source_checksum="file") == "flipkart_20240102_000000"
+    assert catalog.find("RAW", checksum="amazon_20240101_000000-checksum") == "amazon_20240101_000000"
+    assert catalog.find("BRONZE", checksum="data") is None
+    with pytest.raises(ValueError):
+        catalog.find("RAW", name="flipkart_20240102_000000")
+
+
+def test_older_catalogs_get_checksum_columns(tmp_path):
+    path = tmp_path / "catalog.db"
+    with sqlite3.connect(path) as con:
+        con.executescript(
+            "CREATE TABLE tables (id INTEGER PRIMARY KEY AUTOINCREMENT, zone TEXT NOT NULL, name TEXT NOT NULL, "
+            "source TEXT, owner TEXT, row_count INTEGER, created_at TEXT NOT NULL, updated_at TEXT NOT NULL, "
+            "entry TEXT NOT NULL, UNIQUE (zone, name));"
+        )
+        con.execute("INSERT INTO tables (zone, name, created_at, updated_at, entry) VALUES (?, ?, ?, ?, ?)",
+                    ("RAW", "old", "2024", "2024", json.dumps({"checksum": "abc"})))
+    catalog = Catalog(path)
+    assert catalog.find("RAW", checksum="abc") == "old"
+    assert catalog.missing([("RAW", "old")], key="source_checksum") == [("RAW", "old")]
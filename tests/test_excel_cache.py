@@ -0,0 +1,35 @@
+import io
+
+import pandas as pd
+import pytest
+
+from lake.excel_cache import ExcelCache
+
+
+@pytest.fixture
+def workbook():
+    buf = io.BytesIO()
+    df = pd.DataFrame({"pid": ["a", "b", "c"], "price": [1.5, 2.0, 3.0], "mixed": [1, "two", 3.0]})
+    df.to_excel(buf, index=False)
+    return buf.getvalue()
+
+
+def test_miss_and_hit_return_the_same_frame(tmp_path, workbook):
+    cache = ExcelCache(tmp_path)
+    missed, hit = cache.read(workbook)
+    assert not hit
+    cached, hit = cache.read(workbook)
+    assert hit
+    pd.testing.assert_frame_equal(missed, cached)
+    assert missed["mixed"].tolist() == ["1", "two", "3"]
+
+
+def test_corrupt_entry_is_rebuilt(tmp_path, workbook):
+    cache = ExcelCache(tmp_path)
+    expected, _ = cache.read(workbook)
+    (entry,) = tmp_path.glob("*.parquet")
+    entry.write_bytes(b"not parquet")
+    df, hit = cache.read(workbook)
+    assert not hit
+    pd.testing.assert_frame_equal(df, expected)
+    assert cache.read(workbook)[1]
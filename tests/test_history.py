@@ -0,0 +1,45 @@
+from lake.history import HistoryLog
+
+
+def fill(log, n, start=0):
+    for i in range(start, start + n):
+        log.append({"i": i})
+
+
+def test_pages_are_newest_first(tmp_path):
+    log = HistoryLog(tmp_path / "jobs.jsonl", recent=5)
+    fill(log, 23)
+    assert len(log) == 23
+    assert [r["i"] for r in log.page(0, 10)] == list(range(22, 12, -1))
+    assert [r["i"] for r in log.page(2, 10)] == [2, 1, 0]
+    assert log.page(3, 10) == []
+    assert [r["i"] for r in log.recent()] == [22, 21, 20, 19, 18]
+
+
+def test_reopening_reads_the_index(tmp_path):
+    fill(HistoryLog(tmp_path / "jobs.jsonl"), 12)
+    log = HistoryLog(tmp_path / "jobs.jsonl")
+    assert len(log) == 12
+    assert [r["i"] for r in log.page(1, 5)] == [6, 5, 4, 3, 2]
+
+
+def test_index_is_rebuilt_when_stale(tmp_path):
+    fill(HistoryLog(tmp_path / "jobs.jsonl"), 12)
+    (tmp_path / "jobs.jsonl.idx").write_bytes(b"\0" * 5)
+    log = HistoryLog(tmp_path / "jobs.jsonl")
+    assert len(log) == 12 and log.page(0, 1) == [{"i": 11}]
+
+
+def test_keys_are_logged_once(tmp_path):
+    log = HistoryLog(tmp_path / "jobs.jsonl")
+    assert log.append({"i": 0}, key="job:1")
+    assert not log.append({"i": 0}, key="job:1")
+    assert len(log) == 1
+
+
+def test_compaction_keeps_the_newest_records(tmp_path):
+    log = HistoryLog(tmp_path / "jobs.jsonl", retention=10)
+    fill(log, 25)
+    assert len(log) == 15   # compacted to 10 at 20 records, then 5 more
+    assert [r["i"] for r in log.page(0, 100)] == list(range(24, 9, -1))
+    assert len(HistoryLog(tmp_path / "jobs.jsonl", retention=10)) == 15
@@ -0,0 +1,52 @@
+import pandas as pd
+import pytest
+
+from benchmarks.datagen import make_flipkart_frame
+from lake import LakeStore
+from lake.incremental import promote_incremental, run_incremental_pipeline
+from lake.processing import process_flipkart_data
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LakeStore(tmp_path)
+
+
+@pytest.fixture
+def crawl():
+    df = process_flipkart_data(make_flipkart_frame(400, duplicate_rate=0))
+    return df.sort_values("crawled_at", ignore_index=True)
+
+
+def test_source_is_read_above_the_watermark_only(store, crawl, monkeypatch):
+    first, second = crawl[:250], crawl[150:]
+    store.write("raw", "flip_20240101_000000", first)
+    promote_incremental(store, "raw", "flip_20240101_000000")
+    watermark = store.info("bronze", "bronze_flip")["incremental"]["watermark"]
+    assert pd.Timestamp(watermark) == first["crawled_at"].max()
+
+    reads = []
+    read = store.read
+
+    def spy(zone, name, columns=None, filters=None):
+        out = read(zone, name, columns=columns, filters=filters)
+        if zone == "raw":
+            reads.append((filters, out))
+        return out
+
+    monkeypatch.setattr(store, "read", spy)
+    store.write("raw", "flip_20240102_000000", second)
+    record, delta = promote_incremental(store, "raw", "flip_20240102_000000")
+    (filters, out), = reads
+    assert filters == [("crawled_at", ">", watermark)]
+    assert (out["crawled_at"] > pd.Timestamp(watermark)).all()
+    assert len(out) == (crawl["crawled_at"] > pd.Timestamp(watermark)).sum()
+    assert sorted(store.read("bronze", "bronze_flip")["pid"]) == sorted(crawl["pid"])
+
+
+def test_rerun_merges_nothing(store, crawl):
+    store.write("raw", "flip_20240101_000000", crawl)
+    run_incremental_pipeline(store, "flip_20240101_000000")
+    stages = run_incremental_pipeline(store, "flip_20240101_000000")
+    assert [stage["rows"] for stage in stages] == [0, 0, 0]
+    assert store.info("silver", "silver_flip")["rows"] == store.read("silver", "silver_flip")["pid"].nunique()
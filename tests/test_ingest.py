@@ -0,0 +1,50 @@
+import io
+
+import pandas as pd
+import pytest
+
+from lake import LakeStore
+from lake.ingest import stream_csv
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LakeStore(tmp_path)
+
+
+def stream(store, df, chunk_rows):
+    return stream_csv(io.StringIO(df.to_csv(index=False)), store, "t", chunk_rows=chunk_rows)
+
+
+def test_chunks_keep_the_first_chunks_plan(store):
+    df = pd.DataFrame({"flag": [True, None, False] * 4, "brand": ["a", "b", "a"] * 4, "n": range(12)})
+    manifest = stream(store, df, chunk_rows=6)
+    assert set(manifest["memory"]["converted"]) == {"flag", "brand"}
+    out = store.read("raw", "t")
+    assert out["flag"].dtype == "boolean" and isinstance(out["brand"].dtype, pd.CategoricalDtype)
+    assert out["flag"].tolist() == [True, pd.NA, False] * 4
+    assert out["brand"].tolist() == df["brand"].tolist()
+
+
+def test_boolean_plan_is_dropped_when_a_chunk_has_text(store):
+    df = pd.DataFrame({"flag": [True, None, False, "maybe", True, False], "n": range(6)})
+    manifest = stream(store, df, chunk_rows=3)
+    assert "flag" not in manifest["memory"]["converted"]
+    assert store.read("raw", "t")["flag"].tolist() == ["True", None, "False", "maybe", "True", "False"]
+
+
+def test_category_plan_is_dropped_when_a_chunk_turns_high_cardinality(store):
+    brands = ["a", "a", "b", "a", "c", "a", "d", "e", "f", "g", "h", "i"]
+    df = pd.DataFrame({"brand": brands, "n": range(12)})
+    manifest = stream(store, df, chunk_rows=6)
+    assert "brand" not in manifest["memory"]["converted"]
+    out = store.read("raw", "t")
+    assert out["brand"].tolist() == brands
+
+
+def test_category_meets_new_values(store):
+    brands = ["a", "a", "b"] * 2 + ["c", "c", "d"] * 2
+    df = pd.DataFrame({"brand": brands, "n": range(12)})
+    manifest = stream(store, df, chunk_rows=6)
+    assert "brand" in manifest["memory"]["converted"]
+    assert store.read("raw", "t")["brand"].tolist() == brands
@@ -0,0 +1,11 @@
+import pytest
+
+from lake import LakeStore
+from lake.jobs import run_pipeline
+
+
+def test_run_pipeline_needs_a_source(tmp_path):
+    with pytest.raises(ValueError):
+        run_pipeline(LakeStore(tmp_path), lambda fraction, message=None: None)
+    with pytest.raises(ValueError):
+        run_pipeline(LakeStore(tmp_path), lambda fraction, message=None: None, raw_names=[])
@@ -0,0 +1,57 @@
+import pytest
+
+from lake.lineage import LineageGraph
+from lake.records import make_lineage_event
+
+EDGES = [
+    ("file-upload-csv", "raw/flip"),
+    ("raw/flip", "bronze/bronze_flip"),
+    ("bronze/bronze_flip", "silver/silver_flip"),
+    ("silver/silver_flip", "gold/gold_flip"),
+    ("silver/silver_flip", "gold/gold_flip_category"),
+    ("raw/other", "bronze/bronze_other"),
+]
+
+
+@pytest.fixture
+def graph(tmp_path):
+    graph = LineageGraph(tmp_path / "lineage.db")
+    for src, dst in EDGES:
+        graph.record(make_lineage_event(src, dst, "PROMOTE", 10, 5))
+    return graph
+
+
+def nodes(df):
+    return dict(zip(df["node"], df["depth"]))
+
+
+def test_downstream_follows_every_path(graph):
+    assert nodes(graph.downstream("raw/flip")) == {
+        "bronze/bronze_flip": 1, "silver/silver_flip": 2, "gold/gold_flip": 3, "gold/gold_flip_category": 3,
+    }
+
+
+def test_upstream(graph):
+    assert nodes(graph.upstream("gold/gold_flip")) == {
+        "silver/silver_flip": 1, "bronze/bronze_flip": 2, "raw/flip": 3, "file-upload-csv": 4,
+    }
+    assert nodes(graph.upstream("gold/gold_flip", max_depth=2)) == {"silver/silver_flip": 1, "bronze/bronze_flip": 2}
+
+
+def test_impact(graph):
+    assert sorted(graph.impact("raw/flip")["node"]) == ["gold/gold_flip", "gold/gold_flip_category"]
+    assert graph.impact("raw/other").empty
+
+
+def test_cycles_terminate(graph):
+    graph.record(make_lineage_event("gold/gold_flip", "raw/flip", "BACKFILL", 1, 1))
+    assert set(nodes(graph.downstream("raw/flip"))) >= {"gold/gold_flip", "raw/flip"}
+
+
+def test_events_fold_into_edges(graph):
+    assert graph.record(make_lineage_event("raw/flip", "bronze/bronze_flip", "PROMOTE", 5, 1), key="job:1")
+    assert not graph.record(make_lineage_event("raw/flip", "bronze/bronze_flip", "PROMOTE", 5, 1), key="job:1")
+    edges = graph.edges()
+    edge = edges[(edges["source"] == "raw/flip") & (edges["destination"] == "bronze/bronze_flip")].iloc[0]
+    assert (edge["events"], edge["rows_processed"]) == (2, 15)
+    assert graph.count() == len(EDGES) + 1 and graph.retained() == len(EDGES) + 1
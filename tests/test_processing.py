@@ -0,0 +1,22 @@
+import numpy as np
+import pandas as pd
+
+from lake.processing import parse_crawled_at, parse_number
+
+
+def test_parse_number_strips_currency_and_off_suffix_only():
+    values = parse_number(pd.Series(["₹1,299", "34% off", "34%OFF", " 5 ", "office", "12 off", None]))
+    assert np.array_equal(values, [1299, 34, 34, 5, np.nan, 12, np.nan], equal_nan=True)
+
+
+def test_crawled_at_is_day_first():
+    stamps = parse_crawled_at(pd.Series(["02/03/2021, 01:00:00", "13/02/2021, 20:11:51"]))
+    assert list(stamps) == [pd.Timestamp("2021-03-02 01:00:00"), pd.Timestamp("2021-02-13 20:11:51")]
+
+
+def test_crawled_at_infers_only_values_the_format_misses():
+    raw = pd.Series(["10/02/2021, 20:11:51"] * 3 + ["2021-03-05 10:00", "junk", None])
+    stamps = parse_crawled_at(raw)
+    assert (stamps[:3] == pd.Timestamp("2021-02-10 20:11:51")).all()
+    assert stamps[3] == pd.Timestamp("2021-03-05 10:00")
+    assert stamps[4:].isna().all()
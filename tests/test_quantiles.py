@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from lake import LakeStore, analytics
+from lake.sketches import DEFAULT_QUANTILE_ALPHA
+
+QS = [0.25, 0.5, 0.75]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = LakeStore(tmp_path)
+    rng = np.random.default_rng(2)
+    df = pd.DataFrame({
+        "main_category": ["A"] * 2 + ["B"] * 4 + ["C"] * 3 + ["D"] * 501,
+        "selling_price_clean": np.concatenate([[100, 1000], [1, 2, 3, 4], [10, 20, 30], rng.lognormal(6, 1, 501)]),
+    })
+    store.write("raw", "prices", df)
+    return store
+
+
+def test_table_quantiles_match_exact(store):
+    sketched = store.quantiles("raw", "prices", "selling_price_clean", QS)
+    exact = store.quantiles("raw", "prices", "selling_price_clean", QS, exact=True)
+    assert np.allclose(sketched, exact, rtol=DEFAULT_QUANTILE_ALPHA)
+
+
+def test_category_quantiles_match_exact_on_small_groups(store):
+    by = "main_category"
+    sketched = store.quantiles("raw", "prices", "selling_price_clean", QS, by=by).sort_index()
+    exact = store.quantiles("raw", "prices", "selling_price_clean", QS, by=by, exact=True).sort_index()
+    assert list(sketched.index) == list(exact.index)
+    assert np.allclose(sketched.to_numpy(), exact.to_numpy(), rtol=DEFAULT_QUANTILE_ALPHA)
+
+
+def test_category_medians_match_exact(store):
+    sketched = analytics.category_summary(store, "raw", "prices", "main_category").set_index("main_category")
+    exact = analytics.category_summary(store, "raw", "prices", "main_category", exact=True).set_index("main_category")
+    medians = [col for col in sketched.columns if "median" in col.lower()]
+    assert medians
+    for col in medians:
+        assert np.allclose(sketched[col], exact.loc[sketched.index, col], rtol=DEFAULT_QUANTILE_ALPHA)
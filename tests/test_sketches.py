@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from lake.aggregate import aggregate_frame
+from lake.sketches import DEFAULT_QUANTILE_ALPHA, QuantileSketch
+
+SMALL_GROUPS = [[5], [100, 1000], [1, 2, 3], [1, 2, 3, 4], [39, 499, 1299, 2999, 19999], [7.5, 7.5, 8, 120, 121, 4000]]
+
+
+def sketch_of(values):
+    sketch = QuantileSketch()
+    sketch.add(np.asarray(values, dtype=np.float64))
+    return sketch
+
+
+@pytest.mark.parametrize("values", SMALL_GROUPS)
+def test_median_of_small_groups_matches_numpy(values):
+    assert sketch_of(values).quantile(0.5) == pytest.approx(np.median(values), rel=DEFAULT_QUANTILE_ALPHA)
+
+
+@pytest.mark.parametrize("q", [0.0, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 1.0])
+def test_quantiles_within_alpha(q):
+    values = np.random.default_rng(0).lognormal(6, 1.5, 10_001)
+    assert sketch_of(values).quantile(q) == pytest.approx(np.quantile(values, q), rel=DEFAULT_QUANTILE_ALPHA)
+
+
+def test_merge_equals_single_pass_and_subtract_reverses_it():
+    values = np.random.default_rng(1).uniform(-50, 5000, 5000)
+    left, right = sketch_of(values[:2000]), sketch_of(values[2000:])
+    merged = sketch_of(values[:2000]).merge(right)
+    whole = sketch_of(values)
+    assert np.array_equal(merged.pack(), whole.pack())
+    merged.subtract(right)
+    assert np.array_equal(merged.quantiles([0.1, 0.5, 0.9]), left.quantiles([0.1, 0.5, 0.9]))
+
+
+def test_pack_round_trip():
+    sketches = [sketch_of([1, 2, 3]), sketch_of([-4, 0, 9.5])]
+    packed = np.concatenate([s.pack() for s in sketches])
+    for before, after in zip(sketches, QuantileSketch.unpack(packed)):
+        assert np.array_equal(before.pack(), after.pack())
+
+
+def test_grouped_median_of_even_groups():
+    groups = {"a": [100, 1000], "b": [1, 2, 3, 4], "c": [10, 20, 30]}
+    df = pd.DataFrame([(g, v) for g, values in groups.items() for v in values], columns=["cat", "price"])
+    out = aggregate_frame(df, "cat", {"price": ["median"]}).set_index("cat")["price_median"]
+    for group, values in groups.items():
+        assert out[group] == pytest.approx(np.median(values), rel=DEFAULT_QUANTILE_ALPHA)
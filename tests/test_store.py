@@ -0,0 +1,112 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from lake import LakeStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LakeStore(tmp_path)
+
+
+def frame(rows=1000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "pid": [f"P{i:05d}" for i in range(rows)],
+        "category": pd.Categorical(rng.choice(["Clothing", "Footwear", "Bags"], rows)),
+        "price": rng.uniform(100, 5000, rows),
+        "stock": rng.integers(0, 50, rows),
+        "in_stock": pd.array(rng.choice([True, False, None], rows), dtype="boolean"),
+        "crawled_at": pd.Timestamp("2021-02-01") + pd.to_timedelta(rng.integers(0, 86400 * 20, rows), unit="s"),
+    })
+
+
+def test_round_trip(store):
+    df = frame()
+    manifest = store.write("raw", "t", df)
+    assert manifest["rows"] == len(df) and manifest["version"] == 1
+    pd.testing.assert_frame_equal(store.read("raw", "t"), df)
+    pd.testing.assert_frame_equal(store.read("raw", "t", columns=["pid", "price"]), df[["pid", "price"]])
+
+
+def test_round_trip_in_chunks(store):
+    df = frame()
+    with store.writer("raw", "t") as writer:
+        for start in range(0, len(df), 300):
+            writer.append(df[start:start + 300])
+    assert len(store.info("raw", "t")["parts"]) == 4
+    pd.testing.assert_frame_equal(store.read("raw", "t"), df)
+
+
+def test_filters_match_pandas(store):
+    df = frame()
+    store.write("raw", "t", df)
+    out = store.read("raw", "t", filters=[("price", ">", 2500), ("category", "in", ["Bags", "Footwear"])])
+    expected = df[(df["price"] > 2500) & df["category"].isin(["Bags", "Footwear"])]
+    assert sorted(out["pid"]) == sorted(expected["pid"])
+
+
+def test_rewrite_bumps_version(store):
+    store.write("raw", "t", frame(seed=0))
+    manifest = store.write("raw", "t", frame(seed=1))
+    assert manifest["version"] == 2
+    pd.testing.assert_frame_equal(store.read("raw", "t"), frame(seed=1))
+
+
+def test_reads_ride_out_concurrent_swaps(store):
+    frames = [frame(seed=0), frame(seed=1)]
+    store.write("raw", "t", frames[0])
+    errors, stop = [], threading.Event()
+
+    def rewrite():
+        i = 0
+        while not stop.is_set():
+            i += 1
+            store.write("raw", "t", frames[i % 2])
+
+    def read():
+        while not stop.is_set():
+            try:
+                out = store.read("raw", "t")
+                assert any(out.equals(f) for f in frames)
+                store.info("raw", "t")
+                store.row_groups("raw", "t")
+            except Exception as e:   # noqa: BLE001 — collected and reported below
+                errors.append(e)
+
+    threads = [threading.Thread(target=rewrite)] + [threading.Thread(target=read) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    time.sleep(1)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+
+def test_read_waits_out_the_gap_between_the_swaps_renames(store, monkeypatch):
+    old, new = frame(seed=0), frame(seed=1)
+    store.write("raw", "t", old)
+    live = store.table_path("raw", "t")
+    in_gap = threading.Event()
+    replace = os.replace
+
+    def slow_replace(src, dst):
+        replace(src, dst)
+        if os.fspath(src) == os.fspath(live):
+            # The live version is moved aside; the new one follows 0.3 s later
+            in_gap.set()
+            time.sleep(0.3)
+
+    monkeypatch.setattr(os, "replace", slow_replace)
+    writer = threading.Thread(target=store.write, args=("raw", "t", new))
+    writer.start()
+    assert in_gap.wait(5)
+    assert store.exists("raw", "t") and store.swapping()
+    pd.testing.assert_frame_equal(store.read("raw", "t"), new)
+    writer.join()
@@ -0,0 +1,40 @@
+import gc
+
+import pandas as pd
+import pytest
+
+from lake import LakeStore
+from lake.table_cache import TableCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    store = LakeStore(tmp_path)
+    store.write("raw", "t", pd.DataFrame({"pid": ["a", "b", "c"], "price": [1.0, 2.0, 3.0]}))
+    return TableCache(store)
+
+
+def test_sessions_share_one_load(cache):
+    with cache.acquire("raw", "t") as first, cache.acquire("raw", "t") as second:
+        assert first.frame.equals(second.frame)
+        assert cache.stats()["handles"] == 2
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["handles"], stats["entries"]) == (1, 1, 0, 1)
+
+
+def test_modified_copy_leaves_the_shared_frame_alone(cache):
+    with pd.option_context("mode.copy_on_write", True), cache.acquire("raw", "t") as handle:
+        frame = handle.frame
+        frame.loc[0, "price"] = 99.0
+        assert handle.frame.loc[0, "price"] == 1.0
+
+
+def test_rewrite_loads_the_new_version_and_drops_the_old(cache):
+    handle = cache.acquire("raw", "t")
+    cache.store.write("raw", "t", pd.DataFrame({"pid": ["d"], "price": [4.0]}))
+    assert handle.stale()
+    with cache.acquire("raw", "t") as fresh:
+        assert fresh.frame["pid"].tolist() == ["d"]
+    del handle
+    gc.collect()
+    assert cache.stats()["entries"] == 1
@@ -0,0 +1,60 @@
+import os
+
+import pandas as pd
+import pytest
+
+from lake import LakeStore
+from lake.store import TableWriter
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = LakeStore(tmp_path)
+    df = pd.DataFrame({"id": range(6), "price": [10.0, 20, 30, 40, 50, 60]})
+    for i, chunk in enumerate((df[:3], df[3:])):
+        if i == 0:
+            store.write("silver", "t", chunk)
+        else:
+            store.upsert("silver", "t", chunk, key="id")
+    return store
+
+
+def staging_dirs(store):
+    return [p for p in (store.root / "silver").iterdir() if p.name.endswith(".staging")]
+
+
+def test_upsert_inserts_updates_and_deletes(store):
+    manifest = store.upsert("silver", "t", pd.DataFrame({"id": [1, 9], "price": [21.0, 90]}), key="id", delete=[2])
+    assert manifest["last_upsert"] == {"inserted": 1, "updated": 1, "deleted": 1, "parts_kept": 1, "parts_rewritten": 1}
+    out = store.read("silver", "t").sort_values("id")
+    assert out["id"].tolist() == [0, 1, 3, 4, 5, 9]
+    assert out["price"].tolist() == [10, 21, 40, 50, 60, 90]
+
+
+def test_upsert_hard_links_untouched_parts(store):
+    before = store.info("silver", "t")["parts"]
+    path = store.table_path("silver", "t")
+    inode = os.stat(path / before[1]).st_ino
+    store.upsert("silver", "t", pd.DataFrame({"id": [0], "price": [11.0]}), key="id")
+    manifest = store.info("silver", "t")
+    assert manifest["last_upsert"]["parts_kept"] == 1
+    assert inode in {os.stat(path / part).st_ino for part in manifest["parts"]}
+
+
+def test_failed_upsert_leaves_no_staging(store, monkeypatch):
+    def fail(self, manifest, sketches):
+        raise RuntimeError("absorb failed")
+
+    monkeypatch.setattr(TableWriter, "absorb", fail)
+    with pytest.raises(RuntimeError):
+        store.upsert("silver", "t", pd.DataFrame({"id": [0], "price": [11.0]}), key="id")
+    assert staging_dirs(store) == []
+    assert store.read("silver", "t")["price"].tolist()[0] == 10
+
+
+def test_link_shares_part_files(store):
+    store.link("gold", "t", "silver", "t")
+    source, target = store.table_path("silver", "t"), store.table_path("gold", "t")
+    for part in store.info("gold", "t")["parts"]:
+        assert os.path.samefile(source / part, target / part)
+    pd.testing.assert_frame_equal(store.read("gold", "t"), store.read("silver", "t"))